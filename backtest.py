@@ -0,0 +1,571 @@
+# backtest.py - BACKTEST WALK-FORWARD VECTORIZADO
+# Filtros y scores del screener en cada día del histórico (ventanas deslizantes) y salidas SL/TP del TOP diario
+import os
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+import kernels
+from scoring import ScoringProfile
+
+# El screener exige 50 barras; ninguna ventana de sus indicadores pasa de 50, así que la columna t
+# reproduce el análisis con el histórico de 6 meses que terminaba ese día
+MIN_HISTORY = 50
+SWING_LOOKBACK = 40
+
+# Símbolos por bloque al calcular las ventanas (acota la memoria de las vistas deslizantes)
+BLOCK_SIZE = 128
+
+# Umbrales de los filtros del screener (STAGE 1 de precio, STAGE 2 y STAGE 3)
+DEFAULT_THRESHOLDS = {
+    'min_price': 5,
+    'max_price': 150,
+    'max_atr_pct': 8.0,
+    'min_avg_volume': 500_000,
+    'max_loss_pct': 10.0,
+    'min_relative_strength': -2.0,
+    'min_risk_reward': 2.0,
+    'min_volume_score': 15
+}
+
+EXIT_REASONS = ('stop', 'target', 'time', 'open')
+
+PRICE_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+FEATURES_FORMAT = 'backtest-features/1'
+
+class FeatureHistory:
+    """Indicadores del screener para cada símbolo y cada día: arrays símbolos × días alineados por fecha
+
+    La columna t contiene lo que el screener habría calculado con el histórico hasta ese día (sin mirar al futuro)."""
+
+    def __init__(self, symbols, dates, columns, spy_return_5d):
+        self.symbols = list(symbols)
+        self.dates = pd.DatetimeIndex(dates)
+        self.columns = columns
+        self.spy_return_5d = spy_return_5d
+
+    @classmethod
+    def from_frames(cls, frames, symbols=None, spy=None, block_size=BLOCK_SIZE):
+        """Desde {symbol: DataFrame OHLCV} y los cierres de SPY (Series; None = sin relative strength)"""
+        symbols = [symbol for symbol in (symbols if symbols is not None else frames) if symbol in frames]
+        dates = pd.DatetimeIndex(sorted(set().union(*(frames[symbol].index for symbol in symbols)))) if symbols else pd.DatetimeIndex([])
+
+        # Un día sin barra del símbolo queda en NaN: invalida sus ventanas y ese día no opera
+        prices = {field: np.full((len(symbols), len(dates)), np.nan) for field in ('open', 'high', 'low', 'close', 'volume')}
+        for row, symbol in enumerate(symbols):
+            df = frames[symbol].reindex(dates)
+            for field, column in zip(prices, PRICE_COLUMNS):
+                if column in df.columns:
+                    prices[field][row] = df[column].to_numpy(dtype=np.float64)
+
+        columns = {field: prices[field] for field in ('open', 'high', 'low', 'close')}
+        for start in range(0, len(symbols), block_size):
+            block = {field: values[start:start + block_size] for field, values in prices.items()}
+            for field, values in _block_features(block).items():
+                if field not in columns:
+                    columns[field] = np.empty((len(symbols), len(dates)), dtype=values.dtype)
+                columns[field][start:start + block_size] = values
+
+        spy_return_5d = np.full(len(dates), np.nan)
+        if spy is not None and len(spy) >= 6:
+            spy = spy.dropna()
+            # Mismo cálculo que calculate_spy_return_5d, con los datos disponibles cada día
+            spy_return_5d = (((spy / spy.shift(5)) - 1) * 100).reindex(dates).to_numpy(dtype=np.float64)
+
+        return cls(symbols, dates, columns, spy_return_5d)
+
+    def save(self, root):
+        """Guarda las features como columnas .npy + meta.json (reutilizables sin recalcular)"""
+        os.makedirs(root, exist_ok=True)
+        for field, values in self.columns.items():
+            np.save(os.path.join(root, f"{field}.npy"), values, allow_pickle=False)
+        np.save(os.path.join(root, "spy_return_5d.npy"), self.spy_return_5d, allow_pickle=False)
+        meta = {'format': FEATURES_FORMAT, 'symbols': self.symbols, 'dates': [day.strftime('%Y-%m-%d') for day in self.dates],
+                'columns': list(self.columns)}
+        # meta.json al final: un directorio a medio escribir no se puede cargar
+        tmp_path = os.path.join(root, "meta.json.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(root, "meta.json"))
+
+    @classmethod
+    def load(cls, root, mmap=True):
+        """Features guardadas con save(); con mmap las columnas se mapean desde disco (compartidas entre procesos)"""
+        with open(os.path.join(root, "meta.json"), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('format') != FEATURES_FORMAT:
+            raise ValueError(f"Formato de features desconocido en {root}: {meta.get('format')}")
+        mode = 'r' if mmap else None
+        columns = {field: np.load(os.path.join(root, f"{field}.npy"), mmap_mode=mode, allow_pickle=False)
+                   for field in meta['columns']}
+        spy_return_5d = np.load(os.path.join(root, "spy_return_5d.npy"), allow_pickle=False)
+        return cls(meta['symbols'], pd.DatetimeIndex(meta['dates']), columns, spy_return_5d)
+
+    def __getitem__(self, field):
+        return self.columns[field]
+
+    def __len__(self):
+        return len(self.symbols)
+
+# === INDICADORES EN VENTANAS DESLIZANTES (cada uno idéntico a su versión de SymbolFeatures) ===
+
+def _rolling(values, window, reducer):
+    """reducer() de cada ventana que termina en cada columna (NaN en las primeras window-1)"""
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] >= window:
+        out[:, window - 1:] = reducer(sliding_window_view(values, window, axis=1))
+    return out
+
+def _rolling_mean(values, window):
+    """Como values[-window:].mean(): NaN si falta algún dato de la ventana"""
+    return _rolling(values, window, lambda view: view.mean(axis=-1))
+
+def _rolling_nanmean(values, window):
+    """Media ignorando NaN como Series.mean()"""
+    def reducer(view):
+        mask = np.isnan(view)
+        count = window - mask.sum(axis=-1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(mask, 0.0, view).sum(axis=-1) / count
+        return np.where(count > 0, mean, np.nan)
+    return _rolling(values, window, reducer)
+
+def _rolling_nanstd(values, window):
+    """Desviación típica con ddof=1 ignorando NaN como Series.std()"""
+    def reducer(view):
+        mask = np.isnan(view)
+        count = window - mask.sum(axis=-1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(mask, 0.0, view).sum(axis=-1) / count
+            squares = np.where(mask, 0.0, (view - mean[..., None]) ** 2)
+            std = np.sqrt(squares.sum(axis=-1) / (count - 1))
+        return np.where(count >= 2, std, np.nan)
+    return _rolling(values, window, reducer)
+
+def _rolling_extreme(values, window, find_max):
+    """max/min de la ventana ignorando NaN (NaN si no hay datos)"""
+    fill = -np.inf if find_max else np.inf
+    filled = np.where(np.isnan(values), fill, values)
+    extreme = _rolling(filled, window, lambda view: view.max(axis=-1) if find_max else view.min(axis=-1))
+    return np.where(np.isinf(extreme), np.nan, extreme)
+
+def _swing_extremes(low, high, close, valid):
+    """Soporte y resistencia por swings de las últimas SWING_LOOKBACK barras de cada día
+
+    (máximo de los mínimos locales, mínimo de los máximos locales por encima de close * 1.02)."""
+    swing_low = np.zeros(low.shape, dtype=bool)
+    swing_high = np.zeros(high.shape, dtype=bool)
+    # Barras con dos barras propias por detrás y su vecina siguiente ya cerrada
+    swing_low[:, 1:-1] = (low[:, 1:-1] < low[:, :-2]) & (low[:, 1:-1] < low[:, 2:])
+    swing_high[:, 1:-1] = (high[:, 1:-1] > high[:, :-2]) & (high[:, 1:-1] > high[:, 2:])
+    swing_low &= valid
+    swing_high &= valid
+
+    lows = np.where(swing_low, low, -np.inf)
+    highs = np.where(swing_high, high, np.nan)
+    threshold = close * 1.02
+
+    support = np.full(low.shape, -np.inf)
+    resistance = np.full(high.shape, np.inf)
+    # El día t ve los swings de [t - lookback + 1, t - 2] (el screener necesita la barra siguiente al swing)
+    for lag in range(2, SWING_LOOKBACK):
+        support[:, lag:] = np.maximum(support[:, lag:], lows[:, :-lag])
+        candidate = highs[:, :-lag]
+        above = candidate > threshold[:, lag:]
+        resistance[:, lag:] = np.where(above, np.minimum(resistance[:, lag:], candidate), resistance[:, lag:])
+
+    return np.where(np.isinf(support), np.nan, support), np.where(np.isinf(resistance), np.nan, resistance)
+
+def _block_features(prices):
+    """Indicadores de un bloque de símbolos para todos los días"""
+    open_, high, low, close, volume = (prices[field] for field in ('open', 'high', 'low', 'close', 'volume'))
+    bars = np.cumsum(~np.isnan(close), axis=1)
+
+    true_range = kernels.true_range(high, low, close)
+    atr = _rolling_mean(true_range, 20)
+
+    delta = np.diff(close, axis=1, prepend=np.nan)
+    gains = np.where(delta > 0, delta, 0.0)
+    losses = -np.where(delta < 0, delta, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - (100 / (1 + _rolling_mean(gains, 14) / _rolling_mean(losses, 14)))
+
+    # Retornos como pct_change() con cierres rellenados hacia delante
+    columns = np.arange(close.shape[1])
+    last_valid = np.maximum.accumulate(np.where(np.isnan(close), 0, columns), axis=1)
+    filled = np.take_along_axis(close, last_valid, axis=1)
+    returns = np.full(close.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[:, 1:] = filled[:, 1:] / filled[:, :-1] - 1
+
+        close_5d_ago = np.full(close.shape, np.nan)
+        close_5d_ago[:, 5:] = close[:, :-5]
+        return_pct_5d = ((close / close_5d_ago) - 1) * 100
+
+        # Gaps |apertura - cierre previo|; la media recorre de la barra más reciente hacia atrás
+        gaps = np.full(close.shape, np.nan)
+        gaps[:, 1:] = np.abs((open_[:, 1:] - close[:, :-1]) / close[:, :-1]) * 100
+        gap_mean = _rolling(gaps, 10, lambda view: view[..., ::-1].mean(axis=-1))
+
+        volume_consistency = 1 - (_rolling_nanstd(volume, 20) / _rolling_nanmean(volume, 20))
+    quality = np.round(np.minimum(volume_consistency * 15, 15) + np.maximum(15 - gap_mean, 0), 1)
+
+    support, resistance = _swing_extremes(low, high, close, bars >= 3)
+
+    return {
+        'bars': bars.astype(np.int32),
+        'ma21': _rolling_mean(close, 21),
+        'ma50': _rolling_mean(close, 50),
+        'atr': np.where(atr > 0, atr, np.nan),
+        'rsi': rsi,
+        'returns_mean_5': _rolling_nanmean(returns, 5),
+        'returns_mean_10': _rolling_nanmean(returns, 10),
+        'return_pct_5d': np.where(bars >= 6, return_pct_5d, np.nan),
+        'volume_mean_5': _rolling_nanmean(volume, 5),
+        'volume_mean_50': _rolling_nanmean(volume, 50),
+        'high_max_20': _rolling_extreme(high, 20, True),
+        'high_max_15': _rolling_extreme(high, 15, True),
+        'low_min_15': _rolling_extreme(low, 15, False),
+        'quality': quality,
+        'swing_low_max': support,
+        'swing_high_min_above': resistance
+    }
+
+# === FILTROS Y SCORES DE CADA DÍA ===
+
+def _passes_price_basics(history, thresholds):
+    """Máscara símbolos × días de STAGE 1 (precio) y STAGE 2 (historia, tendencia, ATR%, volumen)"""
+    close, atr = history['close'], history['atr']
+    ma21, ma50 = history['ma21'], history['ma50']
+    with np.errstate(invalid='ignore'):
+        atr_percentage = (atr / close) * 100
+        return ((history['bars'] >= MIN_HISTORY) &
+                (close >= thresholds['min_price']) & (close <= thresholds['max_price']) &
+                (atr > 0) & (atr_percentage <= thresholds['max_atr_pct']) &
+                (close >= ma50) & (ma21 >= ma50) &
+                (history['volume_mean_50'] >= thresholds['min_avg_volume']))
+
+def trade_levels(current_price, support_swing, resistance_swing, high_20d, ma21, ma50, atr, max_loss_pct=10.0):
+    """Stop loss y take profit como _calculate_stop_loss_take_profit_silent, vectorizado
+
+    Devuelve (stop, stop %, target, target %, R:R numérico); `max_loss_pct` es el límite del stop (-10%)."""
+    floor = current_price * ((100 - max_loss_pct) / 100)
+
+    # _detect_support_level: swing más alto y MAs por debajo del precio dentro del límite
+    ma21_support = (ma21 < current_price) & (ma21 > floor)
+    ma50_support = (ma50 < current_price) & (ma50 > floor)
+    has_support = ~np.isnan(support_swing) | ma21_support | ma50_support
+    valid_swing = support_swing >= floor
+    best_support = np.max([np.where(valid_swing, support_swing, -np.inf), np.where(ma21_support, ma21, -np.inf),
+                           np.where(ma50_support, ma50, -np.inf)], axis=0)
+    technical_support = np.where(has_support, np.where(np.isfinite(best_support), best_support, floor),
+                                 current_price * 0.92)
+
+    # Stop: el más alto entre soporte, ATR y MA dentro del límite
+    atr_stop = current_price - (atr * 2.0)
+    ma_support = np.where(ma21_support, ma21, np.where(ma50_support, ma50, np.nan))
+    stop = np.max([np.where(technical_support >= floor, technical_support, -np.inf),
+                   np.where(atr_stop >= floor, atr_stop, -np.inf),
+                   np.where(ma_support >= floor, ma_support, -np.inf)], axis=0)
+    stop = np.round(np.where(np.isfinite(stop), stop, floor), 2)
+    stop_pct = np.round(((stop - current_price) / current_price) * 100, 1)
+
+    # _detect_resistance_level: swing o máximo de 20 días entre +5% y +40%
+    high_20d_valid = high_20d > current_price * 1.02
+    has_resistance = ~np.isnan(resistance_swing) | high_20d_valid
+    low_band, high_band = current_price * 1.05, current_price * 1.40
+    best_resistance = np.min([np.where((resistance_swing >= low_band) & (resistance_swing <= high_band), resistance_swing, np.inf),
+                              np.where(high_20d_valid & (high_20d >= low_band) & (high_20d <= high_band), high_20d, np.inf)], axis=0)
+    technical_resistance = np.where(has_resistance & np.isfinite(best_resistance), best_resistance, current_price * 1.18)
+
+    # Target: el más alto entre resistencia y proyección ATR, entre +10% y +40%
+    min_target, max_target = current_price * 1.10, current_price * 1.40
+    atr_target = current_price + (atr * 3.5)
+    target = np.max([np.where((technical_resistance >= min_target) & (technical_resistance <= max_target), technical_resistance, -np.inf),
+                     np.where((atr_target >= min_target) & (atr_target <= max_target), atr_target, -np.inf)], axis=0)
+    target = np.round(np.where(np.isfinite(target), target, current_price * 1.18), 2)
+    target_pct = np.round(((target - current_price) / current_price) * 100, 1)
+
+    risk = np.abs(stop_pct)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        risk_reward = np.round(np.where(risk > 0, target_pct / risk, 999), 1)
+    return stop, stop_pct, target, target_pct, risk_reward
+
+def screen(history, profile=None, thresholds=None):
+    """Candidatos de todos los días con sus scores -> dict de columnas 1D ordenadas por día y símbolo"""
+    profile = profile or ScoringProfile()
+    thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+
+    # STAGE 2 sobre todo el histórico; el resto solo sobre los supervivientes
+    days, rows = np.nonzero(_passes_price_basics(history, thresholds).T)
+    take = lambda field: history[field][rows, days]
+
+    current_price = take('close')
+    ma21, ma50, atr, rsi = take('ma21'), take('ma50'), take('atr'), take('rsi')
+    high_20d = take('high_max_20')
+
+    stop, stop_pct, target, target_pct, risk_reward = trade_levels(
+        current_price, take('swing_low_max'), take('swing_high_min_above'), high_20d, ma21, ma50, atr,
+        thresholds['max_loss_pct'])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative_strength = np.round(take('return_pct_5d') - history.spy_return_5d[days], 1)
+        volume_50d = take('volume_mean_50')
+        volume_ratio = np.where(volume_50d > 0, take('volume_mean_5') / volume_50d, 1)
+    volume_score = profile.volume_score(volume_ratio)
+
+    # STAGE 3: filtros estrictos (stop, relative strength, R:R, volumen)
+    keep = ~(stop_pct < -thresholds['max_loss_pct'])
+    keep &= ~(relative_strength < thresholds['min_relative_strength'])
+    keep &= ~(risk_reward < thresholds['min_risk_reward'])
+    keep &= ~(volume_score < thresholds['min_volume_score'])
+
+    # take() lee ya solo los supervivientes
+    days, rows = days[keep], rows[keep]
+    current_price, ma21, ma50, rsi, high_20d = (values[keep] for values in (current_price, ma21, ma50, rsi, high_20d))
+    stop, stop_pct, target, target_pct, risk_reward = (values[keep] for values in (stop, stop_pct, target, target_pct, risk_reward))
+    relative_strength, volume_ratio, volume_score = relative_strength[keep], volume_ratio[keep], volume_score[keep]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        price_vs_ma21 = ((current_price - ma21) / ma21) * 100
+        ma21_vs_ma50 = ((ma21 - ma50) / ma50) * 100
+        pullback_from_high = ((current_price - high_20d) / high_20d) * 100
+        range_15d = ((take('high_max_15') - take('low_min_15')) / current_price) * 100
+        distance_to_high = ((high_20d - current_price) / current_price) * 100
+
+    # Mismas entradas (y mismos redondeos) que _analyze_price_action
+    rsi_rounded, pullback_rounded = np.round(rsi, 1), np.round(pullback_from_high, 1)
+    proximity = profile.proximity_score(distance_to_high)
+    acceleration = profile.acceleration_score(take('returns_mean_5'), take('returns_mean_10'))
+    setup_type = ScoringProfile.setup_type(pullback_rounded, rsi_rounded)
+    profit_potential = profile.profit_potential_score(target_pct, risk_reward, acceleration, proximity,
+                                                      np.round(volume_ratio, 2), rsi_rounded)
+    components = {
+        'profit_potential': profit_potential,
+        'momentum': profile.momentum_score(rsi, price_vs_ma21, ma21_vs_ma50),
+        'relative_strength': profile.relative_strength_score(relative_strength),
+        'volume': volume_score,
+        'setup_type': profile.setup_score(setup_type, pullback_rounded),
+        'breakout_proximity': proximity,
+        'acceleration': acceleration,
+        'quality': take('quality')
+    }
+    total_score = np.round(profile.base_score(components), 1)
+
+    return {
+        'day': days, 'row': rows,
+        'current_price': current_price,
+        'total_score': total_score,
+        'profit_potential_score': profit_potential,
+        # profit_optimized_sort_key
+        'sort_key': profit_potential * 0.6 + total_score * 0.4,
+        'setup_type': setup_type,
+        'stop_loss_price': stop, 'stop_loss_percentage': stop_pct,
+        'take_profit_price': target, 'take_profit_percentage': target_pct,
+        'risk_reward_ratio_numeric': risk_reward
+    }
+
+def daily_top(candidates, top=10):
+    """Índices de los `top` mejores candidatos de cada día en el orden del ranking del screener
+
+    Ranking estable de mayor a menor clave: los empates conservan el orden del universo."""
+    order = np.lexsort((-candidates['sort_key'], candidates['day']))
+    days = candidates['day'][order]
+    _, starts, inverse = np.unique(days, return_index=True, return_inverse=True)
+    rank = np.arange(len(order)) - starts[inverse]
+    return order[rank < top], rank[rank < top] + 1
+
+# === SIMULACIÓN DE SALIDAS ===
+
+def simulate_exits(history, rows, days, stop, target, max_hold=15):
+    """Entrada en la apertura siguiente y salida por stop, target o tiempo (todas las operaciones a la vez)
+
+    Cada barra: gap por debajo del stop / por encima del target sale en la apertura; si la barra toca
+    ambos niveles cuenta el stop (conservador). Sin barras suficientes la operación queda 'open'."""
+    n, last_day = len(rows), len(history.dates) - 1
+    open_, high, low, close = history['open'], history['high'], history['low'], history['close']
+
+    entry_day = np.minimum(days + 1, last_day)
+    entry = np.where(days < last_day, open_[rows, entry_day], np.nan)
+    exit_price = np.full(n, np.nan)
+    exit_day = np.full(n, -1, dtype=np.int64)
+    reason = np.full(n, EXIT_REASONS.index('open'), dtype=np.int8)
+    alive = ~np.isnan(entry)
+    last_close = entry.copy()
+
+    for bar in range(1, max_hold + 1):
+        day = days + bar
+        alive &= day <= last_day
+        if not alive.any():
+            break
+        day = np.minimum(day, last_day)
+        o, h, l, c = open_[rows, day], high[rows, day], low[rows, day], close[rows, day]
+
+        gap_stop = alive & (o <= stop)
+        gap_target = alive & ~gap_stop & (o >= target)
+        hit_stop = alive & ~gap_stop & ~gap_target & (l <= stop)
+        hit_target = alive & ~gap_stop & ~gap_target & ~hit_stop & (h >= target)
+        for mask, price, code in ((gap_stop, o, 'stop'), (gap_target, o, 'target'),
+                                  (hit_stop, stop, 'stop'), (hit_target, target, 'target')):
+            exit_price[mask] = price[mask]
+            exit_day[mask] = day[mask]
+            reason[mask] = EXIT_REASONS.index(code)
+        alive &= ~(gap_stop | gap_target | hit_stop | hit_target)
+        last_close = np.where(alive & ~np.isnan(c), c, last_close)
+
+        if bar == max_hold:
+            exit_price[alive] = last_close[alive]
+            exit_day[alive] = day[alive]
+            reason[alive] = EXIT_REASONS.index('time')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return_pct = (exit_price / entry - 1) * 100
+    return {
+        'entry_price': entry, 'exit_price': exit_price, 'exit_day': exit_day,
+        'exit_reason': reason, 'holding_days': np.where(exit_day >= 0, exit_day - days, -1),
+        'return_pct': return_pct
+    }
+
+def summarize(trades):
+    """Resumen de las operaciones cerradas: acierto, retorno medio, profit factor, salidas"""
+    closed = trades[trades['exit_reason'] != 'open']
+    returns = closed['return_pct']
+    gains, losses = returns[returns > 0].sum(), -returns[returns < 0].sum()
+    return {
+        'trades': int(len(trades)),
+        'closed': int(len(closed)),
+        'signal_days': int(trades['date'].nunique()) if len(trades) else 0,
+        'win_rate': round(float((returns > 0).mean() * 100), 1) if len(closed) else None,
+        'avg_return_pct': round(float(returns.mean()), 2) if len(closed) else None,
+        'median_return_pct': round(float(returns.median()), 2) if len(closed) else None,
+        'profit_factor': round(float(gains / losses), 2) if losses > 0 else None,
+        'avg_holding_days': round(float(closed['holding_days'].mean()), 1) if len(closed) else None,
+        'exits': {reason: int((trades['exit_reason'] == reason).sum()) for reason in EXIT_REASONS}
+    }
+
+def run_backtest(history, profile=None, thresholds=None, top=10, max_hold=15, start=None, end=None):
+    """Screener de cada día + TOP diario + salidas -> (DataFrame de operaciones, resumen)"""
+    candidates = screen(history, profile, thresholds)
+
+    # Solo señales dentro de [start, end]; los días anteriores sirven de calentamiento de las ventanas
+    dates = history.dates
+    in_range = np.ones(len(candidates['day']), dtype=bool)
+    if start is not None:
+        in_range &= dates[candidates['day']] >= pd.Timestamp(start)
+    if end is not None:
+        in_range &= dates[candidates['day']] <= pd.Timestamp(end)
+    candidates = {field: values[in_range] for field, values in candidates.items()}
+
+    picks, rank = daily_top(candidates, top)
+    picked = {field: values[picks] for field, values in candidates.items()}
+    exits = simulate_exits(history, picked['row'], picked['day'], picked['stop_loss_price'],
+                           picked['take_profit_price'], max_hold)
+
+    trades = pd.DataFrame({
+        'date': dates[picked['day']],
+        'symbol': np.array(history.symbols, dtype=object)[picked['row']] if len(history) else np.array([], dtype=object),
+        'rank': rank,
+        'total_score': picked['total_score'],
+        'profit_potential_score': picked['profit_potential_score'],
+        'setup_type': picked['setup_type'],
+        'signal_price': picked['current_price'],
+        'stop_loss_price': picked['stop_loss_price'],
+        'take_profit_price': picked['take_profit_price'],
+        'risk_reward_ratio_numeric': picked['risk_reward_ratio_numeric'],
+        'entry_price': exits['entry_price'],
+        'exit_price': exits['exit_price'],
+        'exit_reason': np.array(EXIT_REASONS, dtype=object)[exits['exit_reason']],
+        'holding_days': exits['holding_days'],
+        'return_pct': exits['return_pct']
+    })
+    summary = summarize(trades)
+    summary['candidates'] = int(len(candidates['day']))
+    return trades, summary
+
+# === LÍNEA DE COMANDOS ===
+
+def load_history_frames(args):
+    """{symbol: DataFrame} y cierres de SPY desde el almacén local, una descarga o datos sintéticos"""
+    if args.synthetic:
+        from benchmark_screener import make_synthetic_frames
+        frames = make_synthetic_frames(args.synthetic, args.bars)
+        spy = make_synthetic_frames(1, args.bars, seed=1)['SYN0000']['Close']
+        return frames, spy
+
+    symbols = [symbol.strip().upper() for symbol in (args.symbols or '').split(',') if symbol.strip()]
+    if not symbols and os.path.isdir(args.price_store):
+        symbols = sorted(name[:-4] for name in os.listdir(args.price_store) if name.endswith('.npz'))
+
+    if args.download:
+        from speculative_screener_automated import BatchPriceDownloader
+        frames = BatchPriceDownloader(period=args.download).download(symbols + ['SPY'] if symbols else [])
+    else:
+        from price_store import PriceStore
+        store = PriceStore(args.price_store)
+        frames = {symbol: df for symbol in dict.fromkeys(symbols + ['SPY']) if (df := store.load(symbol)) is not None}
+
+    spy = frames.pop('SPY', None)
+    return frames, (spy['Close'] if spy is not None else None)
+
+def add_history_arguments(parser):
+    """Opciones comunes de origen del histórico y de la simulación (backtest y sweep)"""
+    parser.add_argument('--price-store', default='data/price_store',
+                        help="Histórico del almacén local (todos los símbolos guardados)")
+    parser.add_argument('--symbols', default=None, help="Lista de símbolos separada por comas (por defecto todo el almacén)")
+    parser.add_argument('--download', default=None, metavar='PERIOD',
+                        help="Descargar el histórico de --symbols (p.ej. 5y) en lugar de usar el almacén")
+    parser.add_argument('--synthetic', type=int, default=0, metavar='N',
+                        help="Backtest sobre N símbolos sintéticos (sin red)")
+    parser.add_argument('--bars', type=int, default=756, help="Barras por símbolo sintético (~3 años)")
+    parser.add_argument('--start', default=None, help="Primera fecha de señales (AAAA-MM-DD)")
+    parser.add_argument('--end', default=None, help="Última fecha de señales (AAAA-MM-DD)")
+    parser.add_argument('--top', type=int, default=10, help="Picks por día (TOP del ranking)")
+    parser.add_argument('--max-hold', type=int, default=15, help="Días máximos en posición antes de salir a cierre")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest walk-forward del screener (filtros + scores de cada día)")
+    add_history_arguments(parser)
+    parser.add_argument('--scoring-profile', default=None, metavar='PATH',
+                        help="Perfil de scoring JSON (por defecto el del screener)")
+    parser.add_argument('--output', default='data/backtest', help="Directorio de operaciones y resumen")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    profile = ScoringProfile.from_json(args.scoring_profile) if args.scoring_profile else ScoringProfile()
+
+    started = time.perf_counter()
+    frames, spy = load_history_frames(args)
+    if not frames:
+        print("❌ Sin históricos para el backtest")
+        return 1
+    if spy is None:
+        print("⚠️ Sin histórico de SPY: relative strength neutro")
+
+    history = FeatureHistory.from_frames(frames, spy=spy)
+    features_s = time.perf_counter() - started
+    print(f"📊 Features: {len(history)} símbolos x {len(history.dates)} días en {features_s:.1f}s")
+
+    trades, summary = run_backtest(history, profile, top=args.top, max_hold=args.max_hold, start=args.start, end=args.end)
+    print(f"⏱️ Backtest completo en {time.perf_counter() - started:.1f}s")
+
+    os.makedirs(args.output, exist_ok=True)
+    trades.to_csv(os.path.join(args.output, 'backtest_trades.csv'), index=False)
+    with open(os.path.join(args.output, 'backtest_summary.json'), 'w', encoding='utf-8') as f:
+        json.dump({'profile': profile.name, 'top': args.top, 'max_hold': args.max_hold, **summary}, f, indent=2)
+
+    print(f"=== 📈 BACKTEST TOP {args.top} ===")
+    print(f"   Candidatos: {summary['candidates']} | Operaciones: {summary['trades']} ({summary['closed']} cerradas) "
+          f"en {summary['signal_days']} días")
+    if summary['closed']:
+        print(f"   Acierto: {summary['win_rate']}% | Retorno medio: {summary['avg_return_pct']:+.2f}% | "
+              f"Mediana: {summary['median_return_pct']:+.2f}% | Profit factor: {summary['profit_factor']}")
+        print(f"   Salidas: {summary['exits']} | Días en posición: {summary['avg_holding_days']}")
+    print(f"💾 Operaciones en {args.output}/backtest_trades.csv")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
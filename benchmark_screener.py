@@ -0,0 +1,224 @@
+# benchmark_screener.py - BENCHMARK OFFLINE DEL ANÁLISIS POR SÍMBOLO
+# Datos OHLCV sintéticos (sin red): pandas repetido por método vs SymbolFeatures vs panel vectorizado
+import argparse
+import time
+import numpy as np
+import pandas as pd
+import kernels
+from symbol_features import SymbolFeatures
+from panel_engine import PricePanel
+from speculative_screener_automated import OptimizedSpeculativeSwingScreener
+
+def make_synthetic_frames(symbols=300, bars=126, seed=42):
+    """Históricos diarios aleatorios con forma de yfinance (random walk con tendencia)"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end="2025-06-30", periods=bars)
+    frames = {}
+
+    for k in range(symbols):
+        volatility = rng.uniform(0.01, 0.04)
+        close = 30 * np.exp(np.cumsum(rng.normal(rng.normal(0.002, 0.003), volatility, bars)))
+        open_ = close * (1 + rng.normal(0, volatility / 3, bars))
+        high = np.maximum(close, open_) * (1 + np.abs(rng.normal(0, volatility / 2, bars)))
+        low = np.minimum(close, open_) * (1 - np.abs(rng.normal(0, volatility / 2, bars)))
+        volume = (rng.uniform(3e5, 3e6) * rng.lognormal(0, 0.4, bars)).round()
+        frames[f"SYN{k:04d}"] = pd.DataFrame(
+            {'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume}, index=index)
+
+    return frames
+
+def legacy_indicator_pass(df):
+    """Indicadores como los calculaba cada método con pandas (una vez por llamada)"""
+    def atr():
+        true_range = np.maximum(df['High'] - df['Low'], np.maximum(
+            np.abs(df['High'] - df['Close'].shift()), np.abs(df['Low'] - df['Close'].shift())))
+        return true_range.rolling(window=20).mean().iloc[-1]
+
+    def mas():
+        return df['Close'].rolling(21).mean().iloc[-1], df['Close'].rolling(50).mean().iloc[-1]
+
+    def returns_mean(bars):
+        return df['Close'].pct_change().tail(bars).mean()
+
+    # Filtros básicos, momentum, stop loss y soporte calculaban las MAs cada uno; el ATR tres veces
+    for _ in range(3):
+        atr_20 = atr()
+    for _ in range(4):
+        ma21, ma50 = mas()
+
+    delta = df['Close'].diff()
+    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    rsi = (100 - (100 / (1 + gain / loss))).iloc[-1]
+
+    for _ in range(3):
+        high_20d = df['High'].tail(20).max()
+    for _ in range(2):
+        volume_50d = df['Volume'].tail(50).mean()
+        returns_5d = returns_mean(5)
+
+    gaps = [abs((df['Open'].iloc[-i] - df['Close'].iloc[-i-1]) / df['Close'].iloc[-i-1]) * 100
+            for i in range(1, min(11, len(df)))]
+
+    return {
+        'atr_20': atr_20, 'ma21': ma21, 'ma50': ma50, 'rsi': rsi,
+        'returns_5d': returns_5d, 'returns_10d': returns_mean(10),
+        'high_20d': high_20d, 'high_15d': df['High'].tail(15).max(), 'low_15d': df['Low'].tail(15).min(),
+        'volume_50d': volume_50d, 'volume_5d': df['Volume'].tail(5).mean(),
+        'volume_std_20d': df['Volume'].tail(20).std(), 'gap_mean': np.mean(gaps)
+    }
+
+def features_pass(df):
+    """Los mismos indicadores desde un único SymbolFeatures"""
+    features = SymbolFeatures.from_frame(df)
+    return {
+        'atr_20': features.atr(20), 'ma21': features.ma21, 'ma50': features.ma50, 'rsi': features.rsi(14),
+        'returns_5d': features.returns_mean(5), 'returns_10d': features.returns_mean(10),
+        'high_20d': features.high_max(20), 'high_15d': features.high_max(15), 'low_15d': features.low_min(15),
+        'volume_50d': features.volume_mean(50), 'volume_5d': features.volume_mean(5),
+        'volume_std_20d': features.volume_std(20), 'gap_mean': features.gap_mean(10)
+    }
+
+def time_per_symbol(function, frames, repeat):
+    """Mejor tiempo medio por símbolo (ms) de `repeat` pasadas sobre todos los históricos"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for df in frames.values():
+            function(df)
+        best = min(best, time.perf_counter() - started)
+    return best / len(frames) * 1000
+
+def check_indicator_equivalence(frames):
+    """Compara indicador a indicador pandas vs SymbolFeatures; devuelve los símbolos que difieren"""
+    mismatches = []
+    for symbol, df in frames.items():
+        legacy, fast = legacy_indicator_pass(df), features_pass(df)
+        if not all(np.isclose(legacy[key], fast[key], rtol=1e-12, equal_nan=True) for key in legacy):
+            mismatches.append(symbol)
+    return mismatches
+
+def per_symbol_sweep(df, screener):
+    """Filtros básicos y componentes de score de un símbolo por la vía SymbolFeatures"""
+    features = SymbolFeatures.from_frame(df)
+    return (screener._passes_price_basics(features),
+            screener._analyze_momentum(features)['score'],
+            screener._analyze_breakout_potential(features)['score'],
+            screener._analyze_volume(features)['score'],
+            screener._calculate_breakout_proximity_score(features, features.current_price),
+            screener._calculate_momentum_acceleration_score(features),
+            screener._calculate_relative_strength_score(screener._calculate_relative_strength(features)))
+
+def time_panel_sweep(frames, spy_return_5d, repeat):
+    """Mejor tiempo (s) de construir el panel y evaluar filtros básicos + componentes de todo el universo"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        panel = PricePanel.from_frames(frames)
+        panel.passes_price_basics()
+        panel.score_components(spy_return_5d)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def check_panel_equivalence(frames, screener):
+    """Compara las máscaras del panel con la evaluación símbolo a símbolo; devuelve los que difieren"""
+    panel = PricePanel.from_frames(frames)
+    passes = panel.passes_price_basics()
+    components = panel.score_components(screener.spy_return_5d)
+    keys = ('momentum_score', 'breakout_score', 'volume_score', 'proximity_score',
+            'acceleration_score', 'relative_strength_score')
+
+    mismatches = []
+    for row, (symbol, df) in enumerate(frames.items()):
+        expected = per_symbol_sweep(df, screener)
+        vectorized = (bool(passes[row]),) + tuple(components[key][row] for key in keys)
+        if expected != vectorized:
+            mismatches.append(symbol)
+    return mismatches
+
+def kernel_workloads(panel):
+    """Llamadas a cada kernel con los argumentos que usa el panel (RSI de Wilder, ATR, extremos, swings)"""
+    delta = np.diff(panel.close, axis=1, prepend=np.nan)
+    gains = np.where(delta > 0, delta, 0.0)
+    first_bar = panel.bars - panel.lengths
+    return {
+        'true_range': lambda: kernels.true_range(panel.high, panel.low, panel.close),
+        'wilder_average': lambda: kernels.wilder_average(gains, first_bar + 14, 14),
+        'tail_extreme': lambda: kernels.tail_extreme(panel.high, 20, True),
+        'swing_mask': lambda: kernels.swing_mask(panel.low, 40, first_bar, False)
+    }
+
+def benchmark_kernels(frames, repeat):
+    """Micro-benchmark de cada kernel en todos los backends disponibles; comprueba resultados idénticos"""
+    panel = PricePanel.from_frames(frames)
+    original = kernels.get_backend()
+    timings, outputs = {}, {}
+
+    try:
+        for backend in kernels.available_backends():
+            kernels.set_backend(backend)
+            for name, call in kernel_workloads(panel).items():
+                outputs[(backend, name)] = call()  # primera llamada: compilación JIT fuera de la medida
+                best = float('inf')
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    call()
+                    best = min(best, time.perf_counter() - started)
+                timings[(backend, name)] = best * 1000
+    finally:
+        kernels.set_backend(original)
+
+    mismatches = [key for key, output in outputs.items()
+                  if not np.array_equal(output, outputs[('numpy', key[1])], equal_nan=True)]
+    return timings, mismatches
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline del análisis por símbolo")
+    parser.add_argument('--symbols', type=int, default=300, help="Número de símbolos sintéticos")
+    parser.add_argument('--bars', type=int, default=126, help="Barras diarias por símbolo (~6 meses)")
+    parser.add_argument('--repeat', type=int, default=3, help="Repeticiones (se toma la mejor)")
+    args = parser.parse_args(argv)
+
+    frames = make_synthetic_frames(args.symbols, args.bars)
+    screener = OptimizedSpeculativeSwingScreener()
+    screener.spy_return_5d = 0.5
+
+    print(f"=== ⏱️ BENCHMARK: {args.symbols} símbolos x {args.bars} barras ===")
+
+    mismatches = check_indicator_equivalence(frames)
+    print(f"🔍 Indicadores pandas vs SymbolFeatures: {'idénticos' if not mismatches else f'{len(mismatches)} diferencias'}")
+
+    legacy_ms = time_per_symbol(legacy_indicator_pass, frames, args.repeat)
+    features_ms = time_per_symbol(features_pass, frames, args.repeat)
+    print(f"📊 Indicadores por símbolo: pandas {legacy_ms:.3f} ms | SymbolFeatures {features_ms:.3f} ms "
+          f"({legacy_ms / features_ms:.1f}x)")
+
+    def full_analysis(df):
+        features = SymbolFeatures.from_frame(df)
+        if screener._passes_price_basics(features):
+            screener._analyze_price_action(features)
+
+    analysis_ms = time_per_symbol(full_analysis, frames, args.repeat)
+    print(f"📊 Filtros + análisis completo por símbolo: {analysis_ms:.3f} ms")
+
+    panel_mismatches = check_panel_equivalence(frames, screener)
+    print(f"🔍 Panel vs por símbolo (filtros básicos + componentes): {'idénticos' if not panel_mismatches else f'{len(panel_mismatches)} diferencias'}")
+
+    per_symbol_s = time_per_symbol(lambda df: per_symbol_sweep(df, screener), frames, args.repeat) * len(frames) / 1000
+    panel_s = time_panel_sweep(frames, screener.spy_return_5d, args.repeat)
+    print(f"📊 Universo completo ({len(frames)} símbolos), filtros básicos + componentes: "
+          f"por símbolo {per_symbol_s:.3f} s | panel {panel_s:.3f} s ({per_symbol_s / panel_s:.1f}x)")
+
+    print(f"⚙️ Kernels activos: {kernels.describe()}")
+    timings, kernel_mismatches = benchmark_kernels(frames, args.repeat)
+    for name in kernel_workloads(PricePanel.from_frames({})):
+        row = " | ".join(f"{backend} {timings[(backend, name)]:.3f} ms" for backend in kernels.available_backends())
+        print(f"   {name:15s} {row}")
+    if 'numba' not in kernels.available_backends():
+        print("   (instala numba para comparar con el backend compilado)")
+    print(f"🔍 Kernels entre backends: {'idénticos' if not kernel_mismatches else f'diferencias en {kernel_mismatches}'}")
+
+    return 1 if mismatches or panel_mismatches or kernel_mismatches else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
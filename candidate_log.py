@@ -0,0 +1,65 @@
+# candidate_log.py - LOG DE CANDIDATOS DE SOLO AÑADIR
+# Cada candidato se escribe (JSONL) en cuanto pasa los filtros: una ejecución cortada conserva lo encontrado
+import os
+import json
+from result_records import CandidateRecord
+from run_journal import json_default
+
+class CandidateLog:
+    """Una línea por candidato con su posición en el universo; los resultados finales se derivan del log"""
+
+    def __init__(self, path="data/candidate_log.jsonl"):
+        self.path = path
+        self.count = 0
+        self._file = None
+
+    def open(self, offset=0, count=0):
+        """Abre el log para añadir, descartando lo escrito tras `offset` bytes (candidatos sin checkpoint)"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'ab')
+        self._file.truncate(offset)
+        self._file.seek(offset)
+        self.count = count
+
+    def can_resume(self, offset):
+        """True si el log conserva al menos lo que registró el checkpoint"""
+        try:
+            return os.path.getsize(self.path) >= offset
+        except OSError:
+            return False
+
+    @property
+    def offset(self):
+        """Bytes escritos hasta ahora (se guarda en el diario en cada checkpoint)"""
+        return self._file.tell() if self._file else 0
+
+    def append(self, candidate, position):
+        """Añade un candidato y lo vuelca al sistema de ficheros de inmediato"""
+        line = json.dumps({'position': position, 'candidate': candidate}, default=json_default, ensure_ascii=False)
+        self._file.write(line.encode('utf-8') + b'\n')
+        self._file.flush()
+        self.count += 1
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def read(self):
+        """(posición, CandidateRecord) de cada línea completa; una última línea cortada se ignora"""
+        try:
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    entry = json.loads(line)
+                    yield entry['position'], CandidateRecord.from_mapping(entry['candidate'])
+        except FileNotFoundError:
+            return
+
+    def candidates(self):
+        """Candidatos del log en el orden del universo (mismo orden que una ejecución sin cortes)"""
+        positioned = sorted(self.read(), key=lambda item: item[0])
+        return [candidate for _, candidate in positioned]
@@ -5,6 +5,49 @@ import json
 import glob
 import os
 from datetime import datetime
+from run_manifest import RunManifest
+from dashboard_assets import publish_dashboard
+from run_archive import RunArchive
+
+def load_latest_results(runs_dir="data/runs"):
+    """(top 10, todos) de la última ejecución según data/runs/latest.json, sin buscar ficheros por fecha"""
+    runs = RunManifest(runs_dir)
+    manifest = runs.latest()
+    if manifest is None:
+        print("⚠️ Sin manifiesto de ejecución: se usan los CSV más recientes")
+        return load_latest_csv_results()
+    
+    print(f"Procesando ejecución {manifest['run_id']}: {manifest['rows']} candidatos")
+    columns = runs.load_columns(manifest)
+    signals = columns.pop('entry_signals')
+    # Columnas ya tipadas y mapeadas desde disco: sin parseo ni inferencia de tipos
+    all_df = pd.DataFrame(columns, copy=False)
+    all_df['entry_signals'] = [[str(signal) for signal in row if signal] for row in signals]
+    top10_df = all_df.take(runs.load_ranking(manifest)[:10]).reset_index(drop=True)
+    return top10_df, all_df
+
+def load_latest_csv_results():
+    """(top 10, todos) desde los CSV más recientes (ejecuciones sin manifiesto)"""
+    top10_files = glob.glob("speculative_top10_*.csv")
+    all_files = glob.glob("speculative_screening_results_*.csv")
+    
+    print(f"Archivos TOP10 encontrados: {len(top10_files)}")
+    print(f"Archivos RESULTS encontrados: {len(all_files)}")
+    
+    if not top10_files:
+        return None, None
+    
+    latest_top10 = max(top10_files, key=os.path.getctime)
+    latest_all = max(all_files, key=os.path.getctime) if all_files else None
+    print(f"Procesando TOP10: {latest_top10}")
+    
+    top10_df = pd.read_csv(latest_top10)
+    try:
+        all_df = pd.read_csv(latest_all) if latest_all else pd.DataFrame()
+    except Exception as e:
+        print(f"⚠️ Error leyendo ALL_RESULTS: {e}")
+        all_df = pd.DataFrame()
+    return top10_df, all_df
 
 def create_speculative_dashboard():
     """Genera dashboard con métricas de profit potential"""
@@ -12,52 +55,31 @@ def create_speculative_dashboard():
     print("=== CREATE DASHBOARD CON PROFIT METRICS ===")
     
     try:
-        # Buscar archivos de resultados más recientes
-        top10_files = glob.glob("speculative_top10_*.csv")
-        all_files = glob.glob("speculative_screening_results_*.csv")
-        
-        print(f"Archivos TOP10 encontrados: {len(top10_files)}")
-        print(f"Archivos RESULTS encontrados: {len(all_files)}")
+        # Última ejecución: manifiesto con columnas tipadas (CSV más reciente si no hay manifiesto)
+        try:
+            top10_df, all_df = load_latest_results()
+        except Exception as e:
+            print(f"❌ Error leyendo resultados: {e}")
+            return create_fallback_dashboard()
         
-        if not top10_files:
-            print("❌ No se encontraron archivos de top 10")
+        if top10_df is None or top10_df.empty:
+            print("❌ No se encontraron candidatos top 10")
             return create_fallback_dashboard()
         
-        # Obtener archivos más recientes
-        latest_top10 = max(top10_files, key=os.path.getctime)
-        latest_all = max(all_files, key=os.path.getctime) if all_files else None
+        print(f"✓ TOP10: {len(top10_df)} filas | ALL_RESULTS: {len(all_df)} filas")
+        print(f"✓ Columnas disponibles: {list(top10_df.columns)}")
         
-        print(f"Procesando TOP10: {latest_top10}")
+        # Verificar que tenemos los campos separados
+        required_fields = ['stop_loss_price', 'stop_loss_percentage', 'stop_loss_method',
+                         'take_profit_price', 'take_profit_percentage', 'take_profit_method',
+                         'profit_potential_score', 'expected_days_to_target', 'expected_gain_per_day']
+        missing_fields = [field for field in required_fields if field not in top10_df.columns]
         
-        # Leer datos del Top 10
-        try:
-            top10_df = pd.read_csv(latest_top10)
-            print(f"✓ TOP10 leído: {len(top10_df)} filas")
-            print(f"✓ Columnas disponibles: {list(top10_df.columns)}")
-            
-            # Verificar que tenemos los campos separados
-            required_fields = ['stop_loss_price', 'stop_loss_percentage', 'stop_loss_method',
-                             'take_profit_price', 'take_profit_percentage', 'take_profit_method',
-                             'profit_potential_score', 'expected_days_to_target', 'expected_gain_per_day']
-            missing_fields = [field for field in required_fields if field not in top10_df.columns]
-            
-            if missing_fields:
-                print(f"⚠️ Faltan campos nuevos: {missing_fields}")
-                print("💡 Ejecuta primero el screener optimizado para profit metrics")
-            
-            print("✅ Campos técnicos verificados")
-            
-        except Exception as e:
-            print(f"❌ Error leyendo CSV: {e}")
-            return create_fallback_dashboard()
+        if missing_fields:
+            print(f"⚠️ Faltan campos nuevos: {missing_fields}")
+            print("💡 Ejecuta primero el screener optimizado para profit metrics")
         
-        # Leer todos los resultados si existe
-        try:
-            all_df = pd.read_csv(latest_all) if latest_all else pd.DataFrame()
-            print(f"✓ ALL_RESULTS leído: {len(all_df)} filas")
-        except Exception as e:
-            print(f"⚠️ Error leyendo ALL_RESULTS: {e}")
-            all_df = pd.DataFrame()
+        print("✅ Campos técnicos verificados")
         
         # Crear estructura optimizada del dashboard
         dashboard_data = {
@@ -263,6 +285,15 @@ def create_speculative_dashboard():
             
             print(f"✅ {len(dashboard_data['top_picks'])} acciones procesadas con profit metrics")
             
+            # Tendencia de cada pick desde el histórico de ejecuciones (sin releer CSVs antiguos)
+            try:
+                archive = RunArchive()
+                for pick in dashboard_data["top_picks"]:
+                    pick["trend"] = archive.trend(pick["symbol"], days=90)
+                print(f"✓ Tendencias de 90 días desde el histórico ({len(archive.dates(90))} ejecuciones)")
+            except Exception as e:
+                print(f"⚠️ Error leyendo el histórico de ejecuciones: {e}")
+            
             # Análisis del mercado con profit metrics
             if dashboard_data["top_picks"]:
                 try:
@@ -353,22 +384,23 @@ def create_speculative_dashboard():
                 "suggestion": "Los filtros están optimizados para máximas ganancias con riesgo controlado"
             }
         
-        # Crear directorio y guardar JSON
+        # Guardar JSON minificado: resumen + detalle con hash en el nombre
         print("\n💾 Guardando JSON con profit metrics...")
-        os.makedirs('docs', exist_ok=True)
         
         json_path = 'docs/data.json'
         
         try:
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(dashboard_data, f, indent=2, ensure_ascii=False)
+            published = publish_dashboard(dashboard_data, 'docs', candidates=all_df)
+            
+            print(f"✅ Dashboard JSON creado: docs/dashboard.json -> {published['summary']} + {published['picks']}")
             
-            print(f"✅ Dashboard JSON creado: {json_path}")
+            index = published['candidates']
+            print(f"✅ Listado completo: {index['total']} candidatos en páginas de {index['page_size']} por {len(index['sorts'])} criterios")
             
             # Verificar contenido
             if os.path.exists(json_path):
-                size = os.path.getsize(json_path)
-                print(f"✅ Archivo verificado - Tamaño: {size} bytes")
+                for filename in (published['summary'], published['picks']):
+                    print(f"✅ {filename} - {published['sizes'][filename]} bytes")
                 
                 # Mostrar muestra de profit metrics
                 if dashboard_data["top_picks"]:
@@ -462,11 +494,8 @@ def create_fallback_dashboard():
         }
     }
     
-    os.makedirs('docs', exist_ok=True)
-    
     try:
-        with open('docs/data.json', 'w', encoding='utf-8') as f:
-            json.dump(fallback_data, f, indent=2, ensure_ascii=False)
+        publish_dashboard(fallback_data, 'docs')
         
         print("✅ Dashboard de fallback optimizado creado")
         return True
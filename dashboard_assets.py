@@ -0,0 +1,128 @@
+# dashboard_assets.py - DOCUMENTOS DEL DASHBOARD LISTOS PARA SERVIR
+# JSON minificado y dividido (resumen para el primer render + detalle de los picks) con hash en el nombre
+import os
+import re
+import json
+import hashlib
+
+# Único fichero con nombre fijo: apunta a los documentos con hash de la última versión
+ENTRY_FILE = 'dashboard.json'
+LEGACY_FILE = 'data.json'
+HASHED_FILE = re.compile(r'^(summary|picks|candidates-[a-z_]+-\d+)\.[0-9a-f]{12}\.json(\.gz|\.br)?$')
+# GitHub Pages no sirve variantes precomprimidas con Content-Encoding (comprime él mismo al servir):
+# las .gz/.br de versiones anteriores se borran siempre
+
+# Claves del documento completo que necesita el primer render; el resto va al detalle
+SUMMARY_KEYS = ('timestamp', 'market_date', 'summary', 'screening_criteria')
+
+# Listado completo de candidatos: páginas fijas ya ordenadas por cada criterio (de mayor a menor)
+PAGE_SIZE = 50
+CANDIDATE_SORTS = {
+    'total_score': 'Score total',
+    'profit_potential_score': 'Profit Score',
+    'risk_reward_ratio_numeric': 'R:R',
+    'expected_gain_per_day': 'Ganancia/día'
+}
+CANDIDATE_COLUMNS = ('symbol', 'company_name', 'sector', 'setup_type', 'current_price', 'total_score',
+                     'profit_potential_score', 'stop_loss_percentage', 'take_profit_percentage', 'risk_reward_ratio',
+                     'risk_reward_ratio_numeric', 'expected_days_to_target', 'expected_gain_per_day')
+
+def minify(data):
+    """JSON en UTF-8 sin espacios ni sangría"""
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def split_dashboard(data):
+    """(resumen, detalle) de un documento completo del dashboard"""
+    summary = {key: data[key] for key in SUMMARY_KEYS if key in data}
+    details = {key: value for key, value in data.items() if key not in SUMMARY_KEYS}
+    return summary, details
+
+def candidate_pages(candidates, page_size=PAGE_SIZE):
+    """{criterio: [página, ...]} del DataFrame de candidatos; cada página trae sus filas ya ordenadas
+
+    Los empates conservan el orden de las filas del screener (orden estable)."""
+    columns = [column for column in CANDIDATE_COLUMNS if column in candidates.columns]
+    pages = {}
+    for key in CANDIDATE_SORTS:
+        if key not in candidates.columns:
+            continue
+        ordered = candidates.sort_values(key, ascending=False, kind='stable', na_position='last')[columns]
+        # astype(object) + where: NaN como None (null en JSON) y escalares nativos de Python
+        rows = ordered.astype(object).where(ordered.notna(), None).values.tolist()
+        pages[key] = [{'sort': key, 'page': number + 1, 'offset': start, 'columns': columns,
+                       'rows': rows[start:start + page_size]}
+                      for number, start in enumerate(range(0, len(rows), page_size))]
+    return pages
+
+def write_asset(docs_dir, name, data):
+    """Escribe <name>.<hash>.json -> (nombre, bytes escritos)"""
+    payload = minify(data)
+    filename = f"{name}.{hashlib.sha256(payload).hexdigest()[:12]}.json"
+    _write_bytes(os.path.join(docs_dir, filename), payload)
+    return filename, len(payload)
+
+def publish_dashboard(data, docs_dir='docs', candidates=None, page_size=PAGE_SIZE):
+    """Publica resumen, detalle y páginas de candidatos con hash, el punto de entrada dashboard.json y data.json completo
+
+    `candidates` es el DataFrame con todos los candidatos de la ejecución (None = sin listado completo)."""
+    os.makedirs(docs_dir, exist_ok=True)
+    summary, details = split_dashboard(data)
+
+    sizes = {}
+    summary_file, sizes_written = write_asset(docs_dir, 'summary', summary)
+    sizes[summary_file] = sizes_written
+    picks_file, sizes_written = write_asset(docs_dir, 'picks', details)
+    sizes[picks_file] = sizes_written
+
+    index = {'total': 0, 'page_size': page_size, 'sorts': {}}
+    if candidates is not None and not candidates.empty:
+        index['total'] = len(candidates)
+        for key, pages in candidate_pages(candidates, page_size).items():
+            files = []
+            for page in pages:
+                filename, sizes_written = write_asset(docs_dir, f"candidates-{key}-{page['page']}", page)
+                sizes[filename] = sizes_written
+                files.append(filename)
+            index['sorts'][key] = {'label': CANDIDATE_SORTS[key], 'pages': files}
+    entry = {'timestamp': data.get('timestamp'), 'summary': summary_file, 'picks': picks_file, 'candidates': index}
+
+    # Documentos del punto de entrada anterior: un cliente (o una caché del CDN) puede tenerlo aún
+    previous = entry_files(read_entry(docs_dir))
+
+    # El punto de entrada se escribe al final: nunca apunta a documentos que aún no existen
+    _write_bytes(os.path.join(docs_dir, LEGACY_FILE), minify(data))
+    _write_bytes(os.path.join(docs_dir, ENTRY_FILE), minify(entry))
+    prune_assets(docs_dir, keep=set(sizes) | previous)
+
+    return {**entry, 'sizes': sizes}
+
+def read_entry(docs_dir):
+    """dashboard.json publicado (None si no existe o no se puede leer)"""
+    try:
+        with open(os.path.join(docs_dir, ENTRY_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def entry_files(entry):
+    """Documentos con hash a los que apunta un punto de entrada"""
+    if not isinstance(entry, dict):
+        return set()
+    files = {entry.get('summary'), entry.get('picks')}
+    for sort in (entry.get('candidates') or {}).get('sorts', {}).values():
+        files.update(sort.get('pages', []))
+    return {filename for filename in files if isinstance(filename, str)}
+
+def prune_assets(docs_dir, keep):
+    """Borra los documentos con hash que no están en `keep` (versión actual y la anterior)"""
+    for filename in os.listdir(docs_dir):
+        match = HASHED_FILE.match(filename)
+        if match and (match.group(2) or filename not in keep):
+            os.remove(os.path.join(docs_dir, filename))
+
+def _write_bytes(path, content):
+    """Escritura atómica"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
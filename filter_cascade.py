@@ -0,0 +1,202 @@
+# filter_cascade.py - CASCADA DE FILTROS AUTO-AJUSTABLE
+# Cada filtro mide su coste por llamada y su tasa de rechazo; los más baratos y selectivos pasan delante
+# El coste de los valores compartidos del contexto se mide aparte y se reparte entre los filtros que los usan
+import os
+import json
+import time
+import threading
+
+class CascadeFilter:
+    """Predicado puro de una etapa con su motivo de rechazo; `requires` obliga a ir detrás de otros filtros
+    y `uses` declara los valores del LazyContext que lee (su coste se reparte entre quienes los usan)"""
+
+    def __init__(self, name, predicate, reason, requires=(), uses=()):
+        self.name = name
+        self.predicate = predicate
+        self.reason = reason
+        self.requires = tuple(requires)
+        self.uses = tuple(uses)
+
+class LazyContext:
+    """Valores por símbolo que se calculan la primera vez que un filtro o un score los pide"""
+
+    def __init__(self, **factories):
+        self._factories = factories
+        self._values = {}
+        # Segundos de CPU de cada valor calculado, en orden de cálculo
+        self.timings = {}
+
+    def __getitem__(self, key):
+        if key not in self._values:
+            started = time.thread_time()
+            self._values[key] = self._factories[key]()
+            self.timings[key] = time.thread_time() - started
+        return self._values[key]
+
+class FilterCascade:
+    """Filtros de una etapa reordenados por coste / tasa de rechazo medidos (mismo pasa/no pasa en cualquier orden)"""
+
+    # Con menos llamadas el filtro se considera sin medir y se adelanta para medirlo
+    MIN_SAMPLES = 20
+
+    def __init__(self, stage, filters, adaptive=True):
+        self.stage = stage
+        self.filters = {f.name: f for f in filters}
+        self.canonical = [f.name for f in filters]
+        self.adaptive = adaptive
+        self.stats = {name: {'calls': 0, 'passed': 0, 'timed': 0, 'seconds': 0.0} for name in self.canonical}
+        # Coste de los valores del contexto, fuera del coste propio del filtro que los pidió primero
+        self.context_stats = {key: {'calls': 0, 'timed': 0, 'seconds': 0.0} for f in filters for key in f.uses}
+        self.users = {key: sum(key in f.uses for f in filters) for key in self.context_stats}
+        self.order = list(self.canonical)
+        self.reorders = 0
+        self._lock = threading.Lock()
+
+        unknown = {dep for f in filters for dep in f.requires} - set(self.filters)
+        if unknown:
+            raise ValueError(f"Dependencias de filtros desconocidas en '{stage}': {sorted(unknown)}")
+
+    def first_rejection(self, subject):
+        """Primer filtro (en el orden vigente) que rechaza `subject`, o None si pasa todos
+
+        Una excepción en un predicado cuenta como rechazo y se propaga para que el llamador la informe."""
+        for name in self.order:
+            cascade_filter = self.filters[name]
+            # CPU del hilo: con el pool de análisis el tiempo de pared incluiría esperas por el GIL
+            timings = subject.timings if isinstance(subject, LazyContext) else None
+            computed = len(timings) if timings is not None else 0
+            started = time.thread_time()
+            passed = False
+            try:
+                passed = bool(cascade_filter.predicate(subject))
+            finally:
+                seconds = time.thread_time() - started
+                if timings is not None and len(timings) > computed:
+                    # Los valores del contexto calculados aquí no son coste propio de este filtro
+                    for key, factory_seconds in list(timings.items())[computed:]:
+                        seconds -= factory_seconds
+                        self._record_context(key, factory_seconds)
+                self._record(name, passed, max(seconds, 0.0))
+            if not passed:
+                return cascade_filter
+        return None
+
+    def rank(self, name):
+        """Coste esperado por rechazo (s): menor = antes; sin medir = 0"""
+        stats = self.stats[name]
+        if stats['calls'] < self.MIN_SAMPLES:
+            return 0.0
+        cost = stats['seconds'] / max(stats['timed'], 1)
+        # Parte proporcional de los valores compartidos: no depende de qué filtro los calculó primero
+        for key in self.filters[name].uses:
+            context = self.context_stats[key]
+            cost += context['seconds'] / max(context['timed'], 1) / self.users[key]
+        rejection_rate = 1 - stats['passed'] / stats['calls']
+        return cost / max(rejection_rate, 1e-3)
+
+    def retune(self):
+        """Recalcula el orden respetando `requires`; devuelve True si cambió"""
+        if not self.adaptive:
+            return False
+
+        with self._lock:
+            ranks = {name: self.rank(name) for name in self.canonical}
+
+        # Las dependencias heredan el mejor rango de quien las necesita (se adelantan con él)
+        changed = True
+        while changed:
+            changed = False
+            for name in self.canonical:
+                for dependency in self.filters[name].requires:
+                    if ranks[name] < ranks[dependency]:
+                        ranks[dependency] = ranks[name]
+                        changed = True
+
+        placed, order = set(), []
+        remaining = sorted(self.canonical, key=lambda name: (ranks[name], self.canonical.index(name)))
+        while remaining:
+            name = next(name for name in remaining if set(self.filters[name].requires) <= placed)
+            remaining.remove(name)
+            placed.add(name)
+            order.append(name)
+
+        changed = order != self.order
+        self.order = order
+        self.reorders += changed
+        return changed
+
+    def summary(self):
+        """Orden vigente con coste medio (µs) y tasa de rechazo de cada filtro"""
+        parts = []
+        with self._lock:
+            for name in self.order:
+                stats = self.stats[name]
+                if stats['calls']:
+                    cost_us = stats['seconds'] / max(stats['timed'], 1) * 1e6
+                    rejected = (1 - stats['passed'] / stats['calls']) * 100
+                    parts.append(f"{name} ({cost_us:.0f}µs, {rejected:.0f}% rech.)")
+                else:
+                    parts.append(f"{name} (sin medir)")
+            shared = [f"{key} ({stats['seconds'] / stats['timed'] * 1e6:.0f}µs)"
+                      for key, stats in self.context_stats.items() if stats['timed']]
+        return " → ".join(parts) + (f" | contexto: {', '.join(shared)}" if shared else "")
+
+    def to_json(self):
+        with self._lock:
+            return {'order': list(self.order), 'stats': {name: dict(stats) for name, stats in self.stats.items()},
+                    'context': {key: dict(stats) for key, stats in self.context_stats.items()}}
+
+    def load_json(self, data, decay=0.5):
+        """Estadísticas de ejecuciones anteriores, atenuadas para que pese más la ejecución actual"""
+        for name, stats in data.get('stats', {}).items():
+            if name in self.stats:
+                self.stats[name] = {key: stats.get(key, 0) * decay for key in ('calls', 'passed', 'timed', 'seconds')}
+        for name, stats in data.get('context', {}).items():
+            if name in self.context_stats:
+                self.context_stats[name] = {key: stats.get(key, 0) * decay for key in ('calls', 'timed', 'seconds')}
+        self.retune()
+
+    def _record(self, name, passed, seconds):
+        with self._lock:
+            stats = self.stats[name]
+            # La primera llamada no cuenta para el coste (compilación JIT, cachés frías)
+            if stats['calls'] >= 1:
+                stats['timed'] += 1
+                stats['seconds'] += seconds
+            stats['calls'] += 1
+            stats['passed'] += passed
+
+    def _record_context(self, key, seconds):
+        with self._lock:
+            stats = self.context_stats.setdefault(key, {'calls': 0, 'timed': 0, 'seconds': 0.0})
+            if stats['calls'] >= 1:
+                stats['timed'] += 1
+                stats['seconds'] += seconds
+            stats['calls'] += 1
+
+class FilterStatsStore:
+    """Persistencia de las estadísticas de las cascadas entre ejecuciones (JSON)"""
+
+    def __init__(self, path="data/filter_stats.json"):
+        self.path = path
+
+    def load(self, cascades):
+        """Aplica las estadísticas guardadas a cada cascada (por nombre de etapa)"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for cascade in cascades:
+            if isinstance(data.get(cascade.stage), dict):
+                cascade.load_json(data[cascade.stage])
+
+    def save(self, cascades):
+        """Escribe las estadísticas y el orden elegido de forma atómica"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({cascade.stage: cascade.to_json() for cascade in cascades}, f, indent=2)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,205 @@
+# kernels.py - KERNELS DE INDICADORES CON BACKEND COMPILADO OPCIONAL
+# True range, media de Wilder, extremos recientes y swings: compilados con numba si está instalado, NumPy si no
+import os
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+BACKENDS = ('numpy', 'numba')
+
+class NumpyKernels:
+    """Implementaciones NumPy vectorizadas (referencia y fallback); arrays símbolos × días"""
+
+    name = 'numpy'
+
+    @staticmethod
+    def true_range(high, low, close):
+        """True range por barra; NaN en la primera columna y donde falte algún dato"""
+        prev_close = np.concatenate((np.full((close.shape[0], 1), np.nan), close[:, :-1]), axis=1)
+        high_low = high - low
+        high_close_prev = np.abs(high - prev_close)
+        low_close_prev = np.abs(low - prev_close)
+        return np.maximum(high_low, np.maximum(high_close_prev, low_close_prev))
+
+    @staticmethod
+    def wilder_average(values, seed_column, period):
+        """Media de Wilder por fila: media simple hasta seed_column y luego (media*(p-1) + valor)/p"""
+        rows, columns = values.shape
+        cumulative = np.cumsum(values, axis=1)
+
+        average = np.full(rows, np.nan)
+        for column in range(columns):
+            running = seed_column < column
+            average[running] = (average[running] * (period - 1) + values[running, column]) / period
+
+            seeding = seed_column == column
+            if seeding.any():
+                average[seeding] = (cumulative[seeding, column] - cumulative[seeding, column - period]) / period
+        return average
+
+    @staticmethod
+    def tail_extreme(values, bars, find_max):
+        """Máximo/mínimo por fila de las últimas `bars` columnas ignorando NaN (NaN si no hay datos)"""
+        window = values[:, max(0, values.shape[1] - bars):]
+        if window.shape[1] == 0:
+            return np.full(values.shape[0], np.nan)
+        mask = np.isnan(window)
+        if find_max:
+            extreme = np.where(mask, -np.inf, window).max(axis=1)
+        else:
+            extreme = np.where(mask, np.inf, window).min(axis=1)
+        return np.where(mask.all(axis=1), np.nan, extreme)
+
+    @staticmethod
+    def swing_mask(values, lookback, first_bar, find_max):
+        """Extremos locales estrictos en [max(2, n - lookback), n - 3] con dos barras propias por detrás"""
+        columns = values.shape[1]
+        mask = np.zeros(values.shape, dtype=bool)
+        start, stop = max(2, columns - lookback), columns - 2
+        if stop <= start:
+            return mask
+
+        compare = np.greater if find_max else np.less
+        middle = values[:, start:stop]
+        mask[:, start:stop] = compare(middle, values[:, start - 1:stop - 1]) & compare(middle, values[:, start + 1:stop + 1])
+        mask &= np.arange(columns) >= (first_bar + 2)[:, None]
+        return mask
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _true_range_compiled(high, low, close):
+        rows, columns = close.shape
+        out = np.empty((rows, columns))
+        for row in range(rows):
+            out[row, 0] = np.nan
+            for column in range(1, columns):
+                high_low = high[row, column] - low[row, column]
+                high_close_prev = abs(high[row, column] - close[row, column - 1])
+                low_close_prev = abs(low[row, column] - close[row, column - 1])
+                if np.isnan(high_low) or np.isnan(high_close_prev) or np.isnan(low_close_prev):
+                    out[row, column] = np.nan
+                else:
+                    out[row, column] = max(high_low, max(high_close_prev, low_close_prev))
+        return out
+
+    @numba.njit(cache=True)
+    def _wilder_average_compiled(values, seed_column, period):
+        rows, columns = values.shape
+        out = np.full(rows, np.nan)
+        for row in range(rows):
+            seed = seed_column[row]
+            if seed >= columns:
+                continue
+            # Misma suma secuencial que np.cumsum para que la semilla sea idéntica
+            cumulative = 0.0
+            window_start = 0.0
+            for column in range(seed + 1):
+                cumulative += values[row, column]
+                if column == seed - period:
+                    window_start = cumulative
+            average = (cumulative - window_start) / period
+            for column in range(seed + 1, columns):
+                average = (average * (period - 1) + values[row, column]) / period
+            out[row] = average
+        return out
+
+    @numba.njit(cache=True)
+    def _tail_extreme_compiled(values, bars, find_max):
+        rows, columns = values.shape
+        out = np.full(rows, np.nan)
+        for row in range(rows):
+            found = False
+            extreme = 0.0
+            for column in range(max(0, columns - bars), columns):
+                value = values[row, column]
+                if np.isnan(value):
+                    continue
+                if not found or (value > extreme if find_max else value < extreme):
+                    extreme = value
+                    found = True
+            if found:
+                out[row] = extreme
+        return out
+
+    @numba.njit(cache=True)
+    def _swing_mask_compiled(values, lookback, first_bar, find_max):
+        rows, columns = values.shape
+        mask = np.zeros((rows, columns), dtype=np.bool_)
+        start, stop = max(2, columns - lookback), columns - 2
+        for row in range(rows):
+            for column in range(max(start, first_bar[row] + 2), stop):
+                middle = values[row, column]
+                if find_max:
+                    mask[row, column] = middle > values[row, column - 1] and middle > values[row, column + 1]
+                else:
+                    mask[row, column] = middle < values[row, column - 1] and middle < values[row, column + 1]
+        return mask
+
+    class NumbaKernels:
+        """Mismos kernels compilados con numba sobre arrays float64 contiguos"""
+
+        name = 'numba'
+
+        @staticmethod
+        def true_range(high, low, close):
+            return _true_range_compiled(*(np.ascontiguousarray(a, dtype=np.float64) for a in (high, low, close)))
+
+        @staticmethod
+        def wilder_average(values, seed_column, period):
+            return _wilder_average_compiled(np.ascontiguousarray(values, dtype=np.float64),
+                                            np.ascontiguousarray(seed_column, dtype=np.int64), period)
+
+        @staticmethod
+        def tail_extreme(values, bars, find_max):
+            return _tail_extreme_compiled(np.ascontiguousarray(values, dtype=np.float64), bars, find_max)
+
+        @staticmethod
+        def swing_mask(values, lookback, first_bar, find_max):
+            return _swing_mask_compiled(np.ascontiguousarray(values, dtype=np.float64), lookback,
+                                        np.ascontiguousarray(first_bar, dtype=np.int64), find_max)
+
+def available_backends():
+    """Backends utilizables en este entorno"""
+    return ('numpy', 'numba') if numba is not None else ('numpy',)
+
+def set_backend(name=None):
+    """Activa un backend ('numpy', 'numba' o None = el mejor disponible); devuelve el activado"""
+    global _active
+    if name not in (None,) + BACKENDS:
+        raise ValueError(f"Backend de kernels desconocido: {name} (opciones: {', '.join(BACKENDS)})")
+
+    if name == 'numba' and numba is None:
+        print("⚠️ numba no está instalado: kernels en NumPy")
+        name = 'numpy'
+
+    _active = NumbaKernels if (name or available_backends()[-1]) == 'numba' else NumpyKernels
+    return _active.name
+
+def get_backend():
+    """Nombre del backend activo"""
+    return _active.name
+
+def describe():
+    """Descripción del backend activo para el log de la ejecución"""
+    if _active.name == 'numba':
+        return f"numba {numba.__version__} (compilado)"
+    return "NumPy (instala numba para kernels compilados)"
+
+def true_range(high, low, close):
+    return _active.true_range(high, low, close)
+
+def wilder_average(values, seed_column, period):
+    return _active.wilder_average(values, seed_column, period)
+
+def tail_extreme(values, bars, find_max):
+    return _active.tail_extreme(values, bars, find_max)
+
+def swing_mask(values, lookback, first_bar, find_max):
+    return _active.swing_mask(values, lookback, first_bar, find_max)
+
+# SCREENER_KERNELS=numpy fuerza el fallback aunque numba esté instalado
+_active = NumpyKernels
+set_backend(os.environ.get('SCREENER_KERNELS') or None)
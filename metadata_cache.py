@@ -0,0 +1,120 @@
+# metadata_cache.py - CACHÉ PERSISTENTE DE ticker.info CON TTL POR CAMPO
+# beta, sector, marketCap y nombres cambian en semanas: la mayoría de noches se sirven sin red
+import os
+import json
+import time
+import threading
+
+# TTL en días por campo de ticker.info que usa el screener
+DEFAULT_FIELD_TTLS_DAYS = {
+    'beta': 14,
+    'sector': 90,
+    'marketCap': 7,
+    'longName': 90,
+    'shortName': 90
+}
+
+REFRESH_POLICIES = ('auto', 'force', 'never')
+
+class MetadataCache:
+    """Caché de metadatos por símbolo con caducidad independiente por campo
+
+    El TTL de cada campo decide cuándo hay que volver a pedir ticker.info; la respuesta trae todos los campos,
+    así que en cada refresco se actualizan todos los que vienen con valor (en la práctica el símbolo se refresca
+    al ritmo del TTL más corto). Una respuesta vacía o fallida nunca se guarda."""
+
+    def __init__(self, path="data/metadata_cache.json", field_ttls_days=None, refresh_policy='auto'):
+        if refresh_policy not in REFRESH_POLICIES:
+            raise ValueError(f"refresh_policy debe ser uno de {REFRESH_POLICIES}")
+
+        self.path = path
+        self.field_ttls = {field: days * 86400 for field, days in (field_ttls_days or DEFAULT_FIELD_TTLS_DAYS).items()}
+        self.refresh_policy = refresh_policy
+        self.stats = {'hits': 0, 'refreshes': 0, 'stale_fallbacks': 0, 'misses': 0}
+        self._entries = self._load()
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    def get(self, symbol, fetcher):
+        """Campos cacheados del símbolo; llama a fetcher() (ticker.info) solo si alguno caducó"""
+        with self._lock:
+            entry = dict(self._entries.get(symbol, {}))
+
+        if not self._needs_refresh(entry):
+            with self._lock:
+                self.stats['hits'] += 1
+            return self._values(entry)
+
+        try:
+            info = fetcher() or {}
+        except Exception:
+            if not entry:
+                raise
+            info = {}
+
+        if not any(info.get(field) is not None for field in self.field_ttls):
+            # Respuesta vacía (fallo transitorio de Yahoo): no se guarda para que no dure semanas
+            with self._lock:
+                self.stats['stale_fallbacks' if entry else 'misses'] += 1
+            # Sin datos nuevos: mejor metadatos caducados que los valores por defecto
+            return self._values(entry)
+
+        now = time.time()
+        for field, ttl in self.field_ttls.items():
+            cached = entry.get(field)
+            # Un campo que falta en la respuesta conserva su valor mientras no caduque
+            if info.get(field) is None and cached and cached.get('value') is not None and now - cached.get('fetched_at', 0) <= ttl:
+                continue
+            entry[field] = {'value': info.get(field), 'fetched_at': now}
+
+        with self._lock:
+            self._entries[symbol] = entry
+            self.stats['refreshes'] += 1
+            self._dirty = True
+
+        return self._values(entry)
+
+    def save(self):
+        """Persiste la caché si hubo cambios (escritura atómica)"""
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = json.dumps(self._entries, separators=(',', ':'))
+            self._dirty = False
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(snapshot)
+        os.replace(tmp_path, self.path)
+
+    def _needs_refresh(self, entry):
+        """Política de refresco: force = siempre, never = solo si no hay nada, auto = por TTL"""
+        if self.refresh_policy == 'force' or not entry:
+            return True
+        if self.refresh_policy == 'never':
+            return False
+
+        now = time.time()
+        for field, ttl in self.field_ttls.items():
+            cached = entry.get(field)
+            if not cached or now - cached.get('fetched_at', 0) > ttl:
+                return True
+        return False
+
+    def _values(self, entry):
+        """Dict estilo ticker.info solo con los campos que tienen valor"""
+        return {field: cached['value'] for field, cached in entry.items()
+                if cached and cached.get('value') is not None}
+
+    def _load(self):
+        """Lee la caché de disco (vacía si no existe o está corrupta)"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            return entries if isinstance(entries, dict) else {}
+        except (OSError, ValueError):
+            return {}
@@ -0,0 +1,376 @@
+# panel_engine.py - MOTOR DE PANEL: TODO EL LOTE/UNIVERSO EN UN SOLO BARRIDO VECTORIZADO
+# OHLCV de todos los símbolos en arrays símbolos × días; indicadores, filtros y scores como máscaras NumPy
+import numpy as np
+import kernels
+from scoring import ScoringProfile
+from symbol_features import SymbolFeatures
+
+class PricePanel:
+    """Panel OHLCV alineado a la derecha (última barra en la última columna, relleno NaN a la izquierda)"""
+
+    COLUMNS = SymbolFeatures.COLUMNS
+
+    # Indicadores escalares con la misma clave y el mismo cálculo en SymbolFeatures
+    SEEDABLE = ('sma', 'atr', 'volume_mean', 'volume_std', 'volume_consistency', 'returns_mean',
+                'high_max', 'low_min', 'gap_mean')
+
+    def __init__(self, symbols, open_, high, low, close, volume, lengths, has_ohlcv):
+        self.symbols = list(symbols)
+        self.row = {symbol: idx for idx, symbol in enumerate(self.symbols)}
+        self.open, self.high, self.low, self.close, self.volume = open_, high, low, close, volume
+        self.lengths = lengths
+        self.has_ohlcv = has_ohlcv
+        self.bars = close.shape[1]
+        self._cache = {}
+
+    @classmethod
+    def from_frames(cls, frames, symbols=None):
+        """Construye el panel desde {symbol: DataFrame}; alinear por la derecha conserva la semántica de tail(n)"""
+        symbols = [symbol for symbol in (symbols if symbols is not None else frames) if symbol in frames]
+        lengths = np.array([len(frames[symbol]) for symbol in symbols], dtype=np.int64)
+        bars = int(lengths.max()) if len(lengths) else 0
+
+        arrays = {col: np.full((len(symbols), bars), np.nan) for col in cls.COLUMNS}
+        has_ohlcv = np.zeros(len(symbols), dtype=bool)
+
+        for idx, symbol in enumerate(symbols):
+            df = frames[symbol]
+            length = lengths[idx]
+            has_ohlcv[idx] = all(col in df.columns for col in cls.COLUMNS)
+            if length == 0:
+                continue
+            for col in cls.COLUMNS:
+                if col in df.columns:
+                    arrays[col][idx, bars - length:] = df[col].to_numpy(dtype=np.float64)
+
+        return cls(symbols, arrays['Open'], arrays['High'], arrays['Low'], arrays['Close'], arrays['Volume'],
+                   lengths, has_ohlcv)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    # === INDICADORES (un valor por símbolo) ===
+
+    @property
+    def current_price(self):
+        """Último cierre de cada símbolo"""
+        return self._memo('current_price', lambda: self._last_column(self.close))
+
+    def close_ago(self, bars):
+        """Cierre de hace `bars` barras (NaN si el símbolo no tiene tantas)"""
+        return self._memo(('close_ago', bars), lambda: self._where_length(
+            bars + 1, self.close[:, -bars - 1] if self.bars > bars else np.full(len(self), np.nan)))
+
+    def sma(self, period):
+        """Última media móvil simple del cierre (NaN si falta algún dato de la ventana)"""
+        return self._memo(('sma', period), lambda: self._window_mean(self.close, period))
+
+    @property
+    def ma21(self):
+        return self.sma(21)
+
+    @property
+    def ma50(self):
+        return self.sma(50)
+
+    def atr(self, period=20):
+        """Average True Range (NaN donde la versión por símbolo devuelve None)"""
+        return self._memo(('atr', period), lambda: self._compute_atr(period))
+
+    def rsi(self, period=14, method='simple'):
+        """Último RSI: 'simple' (medias simples, el del screener) o 'wilder' (suavizado exponencial)"""
+        if method not in ('simple', 'wilder'):
+            raise ValueError("method debe ser 'simple' o 'wilder'")
+        return self._memo(('rsi', period, method), lambda: self._compute_rsi(period, method))
+
+    @property
+    def returns(self):
+        """Retornos diarios como pct_change() (cierres rellenados hacia delante)"""
+        return self._memo('returns', self._compute_returns)
+
+    def returns_mean(self, bars):
+        """Media de los últimos retornos ignorando NaN"""
+        return self._memo(('returns_mean', bars), lambda: self._nanmean(self.returns[:, -bars:]))
+
+    def return_pct(self, bars=5):
+        """Rentabilidad (%) de las últimas `bars` barras"""
+        return self._memo(('return_pct', bars), lambda: ((self.current_price / self.close_ago(bars)) - 1) * 100)
+
+    def volume_mean(self, bars):
+        """Volumen medio de las últimas barras ignorando NaN"""
+        return self._memo(('volume_mean', bars), lambda: self._nanmean(self.volume[:, -bars:]))
+
+    def volume_std(self, bars):
+        """Desviación típica muestral del volumen de las últimas barras ignorando NaN"""
+        return self._memo(('volume_std', bars), lambda: self._nanstd(self.volume[:, -bars:]))
+
+    def volume_consistency(self, bars=20):
+        """1 - coeficiente de variación del volumen de las últimas barras"""
+        def compute():
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return 1 - (self.volume_std(bars) / self.volume_mean(bars))
+        return self._memo(('volume_consistency', bars), compute)
+
+    def gaps(self, bars=10):
+        """Gaps (%) de las últimas barras, de la más reciente hacia atrás (NaN donde el símbolo no llega)"""
+        return self._memo(('gaps', bars), lambda: self._compute_gaps(bars))
+
+    def gap_mean(self, bars=10):
+        """Gap medio (%) apertura vs cierre previo (0 si el símbolo no tiene ninguno)"""
+        def compute():
+            gaps = self.gaps(bars)
+            count = np.clip(self.lengths - 1, 0, gaps.shape[1])
+            valid = np.arange(gaps.shape[1]) < count[:, None]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                mean = np.where(valid, gaps, 0.0).sum(axis=1) / count
+            return np.where(count > 0, mean, 0.0)
+        return self._memo(('gap_mean', bars), compute)
+
+    def quality_score(self):
+        """Score de calidad técnica (consistencia de volumen + gaps) como _calculate_quality_score"""
+        def compute():
+            volume_score = np.minimum(self.volume_consistency(20) * 15, 15)
+            gap_score = np.maximum(15 - self.gap_mean(10), 0)
+            return np.round(volume_score + gap_score, 1)
+        return self._memo('quality_score', compute)
+
+    def volume_ratio(self, recent=5, base=50):
+        """Volumen medio reciente / volumen medio base (1 si no hay volumen base)"""
+        def compute():
+            base_volume = self.volume_mean(base)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratio = self.volume_mean(recent) / base_volume
+            return np.where(base_volume > 0, ratio, 1.0)
+        return self._memo(('volume_ratio', recent, base), compute)
+
+    def high_max(self, bars):
+        """Máximo de los últimos highs ignorando NaN"""
+        return self._memo(('high_max', bars), lambda: kernels.tail_extreme(self.high, bars, True))
+
+    def low_min(self, bars):
+        """Mínimo de los últimos lows ignorando NaN"""
+        return self._memo(('low_min', bars), lambda: kernels.tail_extreme(self.low, bars, False))
+
+    def swing_mask(self, kind, lookback=40):
+        """Máscara símbolos × días de mínimos (kind='low') o máximos ('high') locales en las últimas barras"""
+        if kind not in ('low', 'high'):
+            raise ValueError("kind debe ser 'low' o 'high'")
+        return self._memo(('swing_mask', kind, lookback), lambda: self._compute_swing_mask(kind, lookback))
+
+    def swing_low_max(self, lookback=40):
+        """Mínimo local más alto de cada símbolo (NaN si no tiene ninguno): candidato a soporte"""
+        mask = self.swing_mask('low', lookback)
+        return self._masked_extreme(self.low, mask, np.max, -np.inf)
+
+    def swing_high_min_above(self, threshold, lookback=40):
+        """Máximo local más bajo por encima de `threshold` (array por símbolo): candidato a resistencia"""
+        mask = self.swing_mask('high', lookback) & (self.high > np.asarray(threshold, dtype=np.float64)[:, None])
+        return self._masked_extreme(self.high, mask, np.min, np.inf)
+
+    # === FILTROS Y SCORES COMO MÁSCARAS ===
+
+    def passes_price_basics(self):
+        """Máscara de _passes_price_basics para todo el panel (tendencia, ATR%, volumen)"""
+        current_price = self.current_price
+        atr_20 = self.atr(20)
+        ma21, ma50 = self.ma21, self.ma50
+        avg_volume = self.volume_mean(50)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            atr_percentage = (atr_20 / current_price) * 100
+
+        # Las comparaciones con NaN son False: cada NaN rechaza igual que en la versión por símbolo
+        return (self.has_ohlcv & (self.lengths >= 50) &
+                (current_price > 0) &
+                (atr_20 > 0) & (atr_percentage <= 8.0) &
+                (current_price >= ma50) & (ma21 >= ma50) &
+                (avg_volume >= 500_000))
+
+    def score_components(self, spy_return_5d=None, profile=None):
+        """Componentes de score que solo dependen del precio, con las tablas del perfil de scoring"""
+        profile = profile or ScoringProfile()
+        current_price = self.current_price
+        rsi = self.rsi(14)
+        ma21, ma50 = self.ma21, self.ma50
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            price_vs_ma21 = ((current_price - ma21) / ma21) * 100
+            ma21_vs_ma50 = ((ma21 - ma50) / ma50) * 100
+
+            high_20d = self.high_max(20)
+            pullback_from_high = ((current_price - high_20d) / high_20d) * 100
+            range_15d = ((self.high_max(15) - self.low_min(15)) / current_price) * 100
+            distance_to_high = ((high_20d - current_price) / current_price) * 100
+
+        momentum_score = profile.momentum_score(rsi, price_vs_ma21, ma21_vs_ma50)
+        breakout_score = profile.breakout_score(pullback_from_high, range_15d)
+
+        volume_ratio = self.volume_ratio(5, 50)
+        volume_score = profile.volume_score(volume_ratio)
+        proximity_score = profile.proximity_score(distance_to_high)
+        acceleration_score = profile.acceleration_score(self.returns_mean(5), self.returns_mean(10))
+
+        # Relative strength redondeada como en _calculate_relative_strength (NaN = sin dato)
+        if spy_return_5d is None:
+            relative_strength = np.full(len(self), np.nan)
+            has_relative_strength = np.zeros(len(self), dtype=bool)
+        else:
+            relative_strength = np.round(self.return_pct(5) - spy_return_5d, 1)
+            has_relative_strength = self.lengths >= 6
+            relative_strength = np.where(has_relative_strength, relative_strength, np.nan)
+        relative_strength_score = profile.relative_strength_score(relative_strength, has_relative_strength)
+
+        return {
+            'momentum_score': momentum_score,
+            'rsi': rsi,
+            'price_vs_ma21': price_vs_ma21,
+            'ma21_vs_ma50': ma21_vs_ma50,
+            'breakout_score': breakout_score,
+            'pullback_from_high': pullback_from_high,
+            'consolidation_range': range_15d,
+            'volume_score': volume_score,
+            'recent_volume_ratio': volume_ratio,
+            'proximity_score': proximity_score,
+            'acceleration_score': acceleration_score,
+            'relative_strength': relative_strength,
+            'relative_strength_score': relative_strength_score,
+            'quality_score': self.quality_score()
+        }
+
+    def features(self, symbol):
+        """SymbolFeatures del símbolo (sin relleno) con los indicadores del panel ya precargados"""
+        idx = self.row[symbol]
+        start = self.bars - self.lengths[idx]
+        columns = self.COLUMNS if self.has_ohlcv[idx] else ()
+
+        features = SymbolFeatures(self.open[idx, start:], self.high[idx, start:], self.low[idx, start:],
+                                  self.close[idx, start:], self.volume[idx, start:], columns=columns)
+
+        seeded = {}
+        for key, values in self._cache.items():
+            if key == 'returns':
+                seeded[key] = values[idx, start:]
+            elif key[0] in self.SEEDABLE:
+                seeded[key] = values[idx]
+            elif key[0] == 'rsi' and key[2] == 'simple':
+                seeded[('rsi', key[1])] = values[idx]
+            elif key[0] == 'swing_mask':
+                source = self.low if key[1] == 'low' else self.high
+                seeded[(f'swing_{key[1]}s', key[2])] = source[idx, start:][values[idx, start:]]
+
+        # SymbolFeatures.atr devuelve None donde el panel tiene NaN
+        for key in [key for key in seeded if key[0] == 'atr' and np.isnan(seeded[key])]:
+            seeded[key] = None
+        return features.seed(seeded)
+
+    # === CÁLCULOS INTERNOS ===
+
+    def _memo(self, key, compute):
+        """Cada indicador se calcula una sola vez para todo el panel"""
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def _where_length(self, min_length, values):
+        """NaN en los símbolos con menos barras de las necesarias"""
+        return np.where(self.lengths >= min_length, values, np.nan)
+
+    def _last_column(self, values):
+        if self.bars == 0:
+            return np.full(len(self), np.nan)
+        return values[:, -1]
+
+    def _window_mean(self, values, period):
+        """Última ventana de rolling(period).mean() por símbolo"""
+        if self.bars < period:
+            return np.full(len(self), np.nan)
+        return self._where_length(period, values[:, -period:].mean(axis=1))
+
+    def _compute_atr(self, period):
+        if self.bars < period + 1:
+            return np.full(len(self), np.nan)
+
+        # True range NaN sin cierre previo: la primera barra de cada símbolo invalida su ventana
+        true_range = kernels.true_range(self.high, self.low, self.close)
+        atr = self._where_length(period + 1, self._window_mean(true_range, period))
+        return np.where(atr > 0, atr, np.nan)
+
+    def _compute_rsi(self, period, method):
+        if self.bars < period + 1 and method == 'wilder':
+            return np.full(len(self), np.nan)
+
+        # Como delta.where(delta > 0, 0): relleno y NaN cuentan como 0
+        delta = np.diff(self.close, axis=1, prepend=np.nan)
+        gains = np.where(delta > 0, delta, 0.0)
+        losses = -np.where(delta < 0, delta, 0.0)
+
+        if method == 'simple':
+            if self.bars < period:
+                return np.full(len(self), np.nan)
+            gain = gains[:, -period:].mean(axis=1)
+            loss = losses[:, -period:].mean(axis=1)
+            min_length = period
+        else:
+            # La primera barra real de cada símbolo no tiene delta: la media arranca `period` barras después
+            seed_column = (self.bars - self.lengths) + period
+            gain = kernels.wilder_average(gains, seed_column, period)
+            loss = kernels.wilder_average(losses, seed_column, period)
+            min_length = period + 1
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = 100 - (100 / (1 + gain / loss))
+        return self._where_length(min_length, rsi)
+
+    def _compute_gaps(self, bars):
+        bars = max(0, min(bars, self.bars - 1))
+        opens = self.open[:, self.bars - bars:][:, ::-1]
+        prev_closes = self.close[:, self.bars - bars - 1:self.bars - 1][:, ::-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.abs((opens - prev_closes) / prev_closes) * 100
+
+    def _compute_swing_mask(self, kind, lookback):
+        values = self.low if kind == 'low' else self.high
+        # Cada símbolo necesita dos barras propias por detrás (el relleno no cuenta)
+        return kernels.swing_mask(values, lookback, self.bars - self.lengths, kind == 'high')
+
+    @staticmethod
+    def _masked_extreme(values, mask, reducer, fill):
+        """Extremo por fila de los valores marcados (NaN si la fila no tiene ninguno)"""
+        if values.shape[1] == 0:
+            return np.full(values.shape[0], np.nan)
+        extreme = reducer(np.where(mask, values, fill), axis=1)
+        return np.where(mask.any(axis=1), extreme, np.nan)
+
+    def _compute_returns(self):
+        if self.bars == 0:
+            return self.close
+
+        # Forward fill por símbolo como pct_change(fill_method='pad'); el relleno inicial se mantiene NaN
+        columns = np.arange(self.bars)
+        last_valid = np.maximum.accumulate(np.where(np.isnan(self.close), 0, columns), axis=1)
+        filled = np.take_along_axis(self.close, last_valid, axis=1)
+
+        returns = np.full(self.close.shape, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns[:, 1:] = filled[:, 1:] / filled[:, :-1] - 1
+        return returns
+
+    @staticmethod
+    def _nanmean(values):
+        """Media por fila ignorando NaN como Series.mean()"""
+        mask = np.isnan(values)
+        count = values.shape[1] - mask.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(mask, 0.0, values).sum(axis=1) / count
+        return np.where(count > 0, mean, np.nan)
+
+    @staticmethod
+    def _nanstd(values):
+        """Desviación típica por fila con ddof=1 ignorando NaN como Series.std()"""
+        mask = np.isnan(values)
+        count = values.shape[1] - mask.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(mask, 0.0, values).sum(axis=1) / count
+            squares = np.where(mask, 0.0, (values - mean[:, None]) ** 2)
+            std = np.sqrt(squares.sum(axis=1) / (count - 1))
+        return np.where(count >= 2, std, np.nan)
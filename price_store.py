@@ -0,0 +1,198 @@
+# price_store.py - ALMACÉN LOCAL INCREMENTAL DE OHLCV
+# Guarda el histórico diario por símbolo y en cada ejecución solo descarga las barras nuevas
+import os
+import time
+import numpy as np
+import pandas as pd
+
+class PriceStore:
+    """Almacén OHLCV por símbolo en disco (columnar, comprimido) con actualizaciones append-only
+
+    Cada fichero se recorta al guardar a los últimos `retention_months` (por defecto la ventana de análisis
+    más un mes de margen) y los símbolos que no se piden en `max_age_days` días se borran: el mtime del
+    fichero hace de fecha de último uso y update() lo renueva en cada símbolo pedido.
+    """
+
+    COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+    def __init__(self, root="data/price_store", history_months=6, overlap_bars=2, adjustment_tolerance=1e-4,
+                 retention_months=None, max_age_days=30):
+        self.root = root
+        self.history_months = history_months
+        self.overlap_bars = max(1, int(overlap_bars))
+        self.adjustment_tolerance = adjustment_tolerance
+        self.retention_months = max(history_months, retention_months or history_months + 1)
+        self.max_age_days = max_age_days
+        self.stats = {'appended': 0, 'full_downloads': 0, 'adjusted': 0, 'trimmed': 0, 'evicted': 0}
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, symbol):
+        """Ruta del fichero de un símbolo"""
+        return os.path.join(self.root, f"{symbol}.npz")
+
+    def load(self, symbol):
+        """Lee el histórico completo guardado de un símbolo (None si no existe)"""
+        path = self.path(symbol)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with np.load(path) as stored:
+                dates = stored['date'].astype('datetime64[D]')
+                data = {col: stored[col] for col in self.COLUMNS}
+            return pd.DataFrame(data, index=pd.DatetimeIndex(dates, name='Date'))
+        except Exception:
+            # Fichero corrupto o de formato antiguo: se tratará como ausente
+            return None
+
+    def save(self, symbol, df):
+        """Escribe el histórico de un símbolo de forma atómica, recortado a la ventana de retención"""
+        df = self._normalize(df)
+        retained = self._window(df, self.retention_months)
+        if len(retained) < len(df):
+            self.stats['trimmed'] += 1
+        df = retained
+        if df.empty:
+            return
+
+        tmp_path = self.path(symbol) + ".tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            date=df.index.values.astype('datetime64[D]').astype(np.int64),
+            **{col: df[col].to_numpy(dtype=np.float64) for col in self.COLUMNS}
+        )
+        os.replace(tmp_path, self.path(symbol))
+
+    def update(self, symbols, downloader):
+        """Sincroniza los símbolos con el proveedor y devuelve {symbol: DataFrame} con la ventana de análisis"""
+        stored_frames = {}
+        incremental_groups = {}
+        full_download = []
+        today = pd.Timestamp.today().normalize()
+
+        for symbol in symbols:
+            self._touch(symbol)
+            stored = self.load(symbol)
+
+            if stored is None or len(stored) < self.overlap_bars:
+                full_download.append(symbol)
+                continue
+
+            stored_frames[symbol] = stored
+            if stored.index[-1] >= today:
+                continue
+
+            # Pedir desde unas barras antes del final para verificar que no hubo split/ajuste
+            start = stored.index[-self.overlap_bars].strftime("%Y-%m-%d")
+            incremental_groups.setdefault(start, []).append(symbol)
+
+        latest_session = None
+        for start, group in incremental_groups.items():
+            fresh_data = downloader.download(group, start=start)
+
+            for symbol in group:
+                fresh = fresh_data.get(symbol)
+                if fresh is None or fresh.empty:
+                    # Descarga fallida o vacía: lo guardado sería de ayer, mejor re-descargar completo
+                    del stored_frames[symbol]
+                    full_download.append(symbol)
+                    continue
+
+                fresh = self._normalize(fresh)
+                if not fresh.empty and (latest_session is None or fresh.index[-1] > latest_session):
+                    latest_session = fresh.index[-1]
+
+                merged = self._merge(stored_frames[symbol], fresh)
+                if merged is None:
+                    # Los precios históricos cambiaron: re-descargar solo este símbolo
+                    self.stats['adjusted'] += 1
+                    del stored_frames[symbol]
+                    full_download.append(symbol)
+                    continue
+
+                if len(merged) > len(stored_frames[symbol]):
+                    self.save(symbol, merged)
+                    self.stats['appended'] += 1
+                stored_frames[symbol] = merged
+
+        # Sin barras nuevas aunque otros símbolos sí recibieron la última sesión: histórico desfasado
+        if latest_session is not None:
+            for group in incremental_groups.values():
+                for symbol in group:
+                    if symbol in stored_frames and stored_frames[symbol].index[-1] < latest_session:
+                        del stored_frames[symbol]
+                        full_download.append(symbol)
+
+        if full_download:
+            fresh_data = downloader.download(full_download)
+            for symbol in full_download:
+                fresh = fresh_data.get(symbol)
+                if fresh is None or fresh.empty:
+                    continue
+                self.save(symbol, fresh)
+                stored_frames[symbol] = self._normalize(fresh)
+                self.stats['full_downloads'] += 1
+
+        self.evict_unseen()
+        return {symbol: self._analysis_window(df) for symbol, df in stored_frames.items()}
+
+    def evict_unseen(self):
+        """Borra los símbolos que no se han pedido en max_age_days días (deslistados, fuera del universo)"""
+        if not self.max_age_days:
+            return
+
+        cutoff = time.time() - self.max_age_days * 86400
+        for filename in os.listdir(self.root):
+            path = os.path.join(self.root, filename)
+            if not filename.endswith('.npz'):
+                continue
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    self.stats['evicted'] += 1
+            except OSError as e:
+                print(f"⚠️ No se pudo purgar {filename} del almacén: {e}")
+
+    def _touch(self, symbol):
+        """Marca el símbolo como visto hoy (mtime) aunque no reciba barras nuevas"""
+        try:
+            os.utime(self.path(symbol))
+        except OSError:
+            pass
+
+    def _merge(self, stored, fresh):
+        """Añade barras nuevas; devuelve None si las barras solapadas no coinciden (split/ajuste)"""
+        overlap = fresh.index.intersection(stored.index)
+
+        if len(overlap) == 0:
+            # Hueco entre lo guardado y lo nuevo: no se puede verificar, mejor re-descargar
+            return None
+
+        stored_close = stored.loc[overlap, 'Close'].to_numpy()
+        fresh_close = fresh.loc[overlap, 'Close'].to_numpy()
+        if not np.allclose(stored_close, fresh_close, rtol=self.adjustment_tolerance, equal_nan=True):
+            return None
+
+        new_bars = fresh[fresh.index > stored.index[-1]]
+        if new_bars.empty:
+            return stored
+
+        return pd.concat([stored, new_bars])
+
+    def _analysis_window(self, df):
+        """Últimos N meses, equivalente a history(period='6mo')"""
+        return self._window(df, self.history_months)
+
+    def _window(self, df, months):
+        """Barras desde hoy menos `months` meses"""
+        start = pd.Timestamp.today().normalize() - pd.DateOffset(months=months)
+        return df[df.index >= start]
+
+    def _normalize(self, df):
+        """Columnas OHLCV e índice diario sin zona horaria"""
+        df = df[self.COLUMNS].dropna(how='all')
+        index = pd.DatetimeIndex(df.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        df = df.set_axis(index.normalize().rename('Date'), axis=0)
+        return df[~df.index.duplicated(keep='last')].sort_index()
@@ -0,0 +1,167 @@
+# rate_limiter.py - LIMITADOR COMPARTIDO CON CONTROL AIMD
+# Token bucket único para NASDAQ y Yahoo: sube el ritmo poco a poco y lo recorta a la mitad ante un 429
+import re
+import time
+import threading
+from contextlib import contextmanager
+
+try:
+    from yfinance.exceptions import YFRateLimitError
+except ImportError:
+    # yfinance antiguo sin excepciones tipadas: basta con el mensaje
+    YFRateLimitError = None
+
+# HTTP 429 como número suelto ("429 Client Error", "HTTP Error 429") o el texto estándar de la respuesta;
+# nada de subcadenas como "rate", que también aparecen en "generate" o "accurate"
+RATE_LIMIT_PATTERN = re.compile(r'\b429\b|too many requests')
+
+def is_rate_limit_error(error):
+    """True si la excepción (o el mensaje de error de yf.download) corresponde a un rate limit del proveedor"""
+    if YFRateLimitError is not None and isinstance(error, YFRateLimitError):
+        return True
+    return RATE_LIMIT_PATTERN.search(str(error).lower()) is not None
+
+class RequestTicket:
+    """Permiso para una petición; permite marcar un 429 recibido sin excepción"""
+
+    def __init__(self, cost):
+        self.cost = cost
+        self.throttled = False
+
+class AdaptiveRateLimiter:
+    """Token bucket compartido con additive-increase/multiplicative-decrease de ritmo y concurrencia"""
+
+    def __init__(self, rate=4.0, min_rate=0.5, max_rate=25.0, burst=10,
+                 concurrency=8, min_concurrency=1, max_concurrency=8,
+                 additive_rate=0.5, decrease_factor=0.5, latency_target=3.0,
+                 success_window=20, base_cooldown=2.0, max_cooldown=60.0, clock=time.monotonic):
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.rate = max(self.min_rate, min(float(rate), self.max_rate))
+        self.burst = float(burst)
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.min_concurrency = max(1, min(int(min_concurrency), self.max_concurrency))
+        self.concurrency = max(self.min_concurrency, min(int(concurrency), self.max_concurrency))
+        self.additive_rate = additive_rate
+        self.decrease_factor = decrease_factor
+        self.latency_target = latency_target
+        self.success_window = success_window
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        # Reloj monotónico en segundos (inyectable para tests deterministas)
+        self._clock = clock
+
+        self.stats = {'requests': 0, 'throttled': 0, 'slow': 0, 'wait_seconds': 0.0}
+
+        self._tokens = self.burst
+        self._last_refill = self._clock()
+        self._in_flight = 0
+        self._successes = 0
+        self._consecutive_throttles = 0
+        self._cooldown_until = 0.0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def request(self, cost=1):
+        """Bloquea hasta tener token y hueco de concurrencia; registra latencia y 429 al salir"""
+        ticket = self.acquire(cost)
+        started = self._clock()
+        try:
+            yield ticket
+        except Exception as e:
+            if is_rate_limit_error(e):
+                ticket.throttled = True
+            self.release(ticket, None)
+            raise
+        self.release(ticket, self._clock() - started)
+
+    def acquire(self, cost=1):
+        """Espera a que haya tokens, concurrencia libre y no haya cooldown activo"""
+        wait_started = self._clock()
+
+        with self._condition:
+            while True:
+                now = self._clock()
+                self._refill(now)
+
+                # Peticiones por lotes más caras que el burst: basta con el bucket lleno (queda en deuda)
+                needed = min(cost, self.burst)
+                if now >= self._cooldown_until and self._in_flight < self.concurrency and self._tokens >= needed:
+                    self._tokens -= cost
+                    self._in_flight += 1
+                    self.stats['requests'] += 1
+                    self.stats['wait_seconds'] += now - wait_started
+                    return RequestTicket(cost)
+
+                if now < self._cooldown_until:
+                    timeout = self._cooldown_until - now
+                elif self._tokens < needed:
+                    timeout = (needed - self._tokens) / self.rate
+                else:
+                    timeout = None  # esperar a que termine otra petición
+                self._condition.wait(timeout)
+
+    def release(self, ticket, latency):
+        """Devuelve el hueco y ajusta ritmo/concurrencia según el resultado"""
+        with self._condition:
+            self._in_flight -= 1
+
+            if ticket.throttled:
+                self._on_throttle()
+            elif latency is not None:
+                self._on_success(latency, ticket.cost)
+
+            self._condition.notify_all()
+
+    def has_spare_capacity(self):
+        """True si ahora mismo se podría lanzar una petición sin esperar"""
+        with self._condition:
+            now = self._clock()
+            self._refill(now)
+            return (now >= self._cooldown_until and
+                    self._in_flight < self.concurrency and
+                    self._tokens >= 1)
+
+    def summary(self):
+        """Estado actual para el resumen de la ejecución"""
+        with self._condition:
+            return (f"{self.stats['requests']} peticiones | {self.stats['throttled']} 429 | "
+                    f"{self.rate:.1f} req/s | concurrencia {self.concurrency} | "
+                    f"espera total {self.stats['wait_seconds']:.0f}s")
+
+    def _on_success(self, latency, cost):
+        """Additive increase tras una ventana de éxitos rápidos; latencia alta cuenta como congestión"""
+        self._consecutive_throttles = 0
+
+        # En peticiones por lotes la latencia se reparte entre las descargas en paralelo
+        latency_per_call = latency / max(1.0, cost / self.concurrency)
+        if latency_per_call > self.latency_target:
+            self.stats['slow'] += 1
+            self._successes = 0
+            self.rate = max(self.min_rate, self.rate * (1 - (1 - self.decrease_factor) / 2))
+            return
+
+        self._successes += cost
+        if self._successes >= self.success_window:
+            self._successes = 0
+            self.rate = min(self.max_rate, self.rate + self.additive_rate)
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+
+    def _on_throttle(self):
+        """Multiplicative decrease y cooldown exponencial ante un 429"""
+        self.stats['throttled'] += 1
+        self._successes = 0
+        self._consecutive_throttles += 1
+
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        self.concurrency = max(self.min_concurrency, int(self.concurrency * self.decrease_factor))
+        self._tokens = min(self._tokens, 0.0)
+
+        cooldown = min(self.max_cooldown, self.base_cooldown * 2 ** (self._consecutive_throttles - 1))
+        self._cooldown_until = max(self._cooldown_until, self._clock() + cooldown)
+
+    def _refill(self, now):
+        """Recarga tokens según el ritmo actual"""
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
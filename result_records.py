@@ -0,0 +1,186 @@
+# result_records.py - RESULTADOS COMPACTOS DEL SCREENER
+# Candidatos como registros con __slots__ y esquema de tipos fijo; rechazos como códigos de motivo internados
+import csv
+import json
+import math
+import threading
+from collections.abc import Mapping
+import numpy as np
+
+# Esquema de un candidato: (campo, tipo) en el orden de las columnas de los CSV
+CANDIDATE_SCHEMA = (
+    # Datos básicos
+    ('symbol', str),
+    ('company_name', str),
+    ('sector', str),
+    ('current_price', float),
+    ('market_cap_millions', float),
+    # Scores
+    ('total_score', float),
+    ('profit_potential_score', float),
+    ('momentum_score', int),
+    ('relative_strength_score', int),
+    ('volume_score', int),
+    ('setup_score', int),
+    ('proximity_score', int),
+    ('acceleration_score', int),
+    ('quality_score', float),
+    ('breakout_score', int),
+    # Stop loss / take profit
+    ('stop_loss_price', float),
+    ('stop_loss_percentage', float),
+    ('stop_loss_method', str),
+    ('take_profit_price', float),
+    ('take_profit_percentage', float),
+    ('take_profit_method', str),
+    ('risk_reward_ratio', str),
+    ('risk_reward_ratio_numeric', float),
+    # Métricas de ganancia rápida
+    ('expected_days_to_target', int),
+    ('expected_gain_per_day', float),
+    # Datos técnicos
+    ('relative_strength_5d', float),
+    ('setup_type', str),
+    ('rsi', float),
+    ('pullback_pct', float),
+    ('volume_spike', float),
+    ('atr_pct', float),
+    ('breakout_proximity_pct', int),
+    ('entry_signals', str),
+    ('passes_all_filters', bool)
+)
+
+CANDIDATE_FIELDS = tuple(field for field, _ in CANDIDATE_SCHEMA)
+
+# Tipo NumPy de cada tipo del esquema para los ficheros en columnas
+COLUMN_DTYPES = {float: np.float64, int: np.int64, bool: np.bool_, str: np.str_}
+
+# entry_signals se guarda como matriz (n, ENTRY_SIGNAL_SLOTS) de textos en lugar de JSON
+ENTRY_SIGNAL_SLOTS = 3
+
+class CandidateRecord(Mapping):
+    """Candidato que pasa todos los filtros: atributos fijos sin __dict__, se lee como un dict"""
+
+    __slots__ = CANDIDATE_FIELDS
+
+    def __init__(self, **values):
+        for field in CANDIDATE_FIELDS:
+            setattr(self, field, values.get(field))
+        self.passes_all_filters = True
+
+    @classmethod
+    def from_mapping(cls, values):
+        """Registro desde un dict (diario de --resume, parciales de shards)"""
+        return values if isinstance(values, cls) else cls(**values)
+
+    def __getitem__(self, key):
+        if key not in CANDIDATE_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(CANDIDATE_FIELDS)
+
+    def __len__(self):
+        return len(CANDIDATE_FIELDS)
+
+    def __repr__(self):
+        return f"CandidateRecord({self.symbol!r}, total_score={self.total_score!r})"
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in CANDIDATE_FIELDS}
+
+class Rejection(Mapping):
+    """Rechazo con código de motivo internado: un único objeto compartido por motivo"""
+
+    __slots__ = ('code', 'reason', 'retryable')
+
+    def __init__(self, code, reason, retryable):
+        self.code = code
+        self.reason = reason
+        self.retryable = retryable
+
+    def __getitem__(self, key):
+        if key == 'passes_all_filters':
+            return False
+        if key == 'filter_reasons':
+            return [self.reason]
+        if key == 'retryable' and self.retryable:
+            return True
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(('passes_all_filters', 'filter_reasons', 'retryable') if self.retryable
+                    else ('passes_all_filters', 'filter_reasons'))
+
+    def __len__(self):
+        return 3 if self.retryable else 2
+
+    def __repr__(self):
+        return f"Rejection({self.code}, {self.reason!r})"
+
+# Motivos conocidos con código estable; los dinámicos (tipo de excepción) se añaden al vuelo
+REASON_CODES = {
+    'Datos insuficientes': 1,
+    'Filtros técnicos básicos': 2,
+    'Stop loss > 10%': 3,
+    'Underperform SPY significativo': 4,
+    'R:R < 2:1': 5,
+    'Volume insuficiente': 6,
+    'Error análisis': 7,
+    'Rate limit': 8
+}
+
+_rejections = {}
+_rejections_lock = threading.Lock()
+
+def rejection(reason, retryable=False):
+    """Rechazo compartido para `reason` (se crea una sola vez por motivo)"""
+    key = (reason, retryable)
+    cached = _rejections.get(key)
+    if cached is not None:
+        return cached
+    with _rejections_lock:
+        if key not in _rejections:
+            code = REASON_CODES.setdefault(reason, len(REASON_CODES) + 1)
+            _rejections[key] = Rejection(code, reason, retryable)
+        return _rejections[key]
+
+def reason_name(code):
+    """Texto de un código de motivo"""
+    return next((reason for reason, known in REASON_CODES.items() if known == code), None)
+
+def _csv_value(value, kind):
+    """Valor con el formato de DataFrame.to_csv para una columna del tipo del esquema"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    if kind is float:
+        return repr(float(value))
+    if kind is int:
+        return str(int(value))
+    return str(value)
+
+def write_candidates_csv(path, candidates):
+    """CSV de candidatos directamente desde los registros (mismas columnas y formato que vía DataFrame)"""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(CANDIDATE_FIELDS)
+        for candidate in candidates:
+            writer.writerow([_csv_value(candidate.get(field), kind) for field, kind in CANDIDATE_SCHEMA])
+
+def candidate_columns(candidates):
+    """{campo: array} con el tipo del esquema; entry_signals como matriz de textos ('' = hueco)"""
+    columns = {}
+    for field, kind in CANDIDATE_SCHEMA:
+        values = [candidate.get(field) for candidate in candidates]
+        if field == 'entry_signals':
+            signals = [json.loads(value)[:ENTRY_SIGNAL_SLOTS] if value else [] for value in values]
+            values = [row + [''] * (ENTRY_SIGNAL_SLOTS - len(row)) for row in signals]
+            columns[field] = np.array(values, dtype=np.str_).reshape(len(values), ENTRY_SIGNAL_SLOTS)
+            continue
+        if kind is float:
+            values = [np.nan if value is None else value for value in values]
+        elif kind is str:
+            values = ['' if value is None else value for value in values]
+        columns[field] = np.array(values, dtype=COLUMN_DTYPES[kind])
+    return columns
@@ -0,0 +1,83 @@
+# retry_queue.py - COLA DE REINTENTOS DIFERIDOS
+# Los símbolos con rate limit o fallos transitorios se reintentan más tarde en vez de perderse
+import time
+import random
+from rate_limiter import is_rate_limit_error
+
+TRANSIENT_ERROR_MARKERS = ('timed out', 'timeout', 'connection', 'temporarily', '502', '503', '504')
+
+def is_transient_error(error):
+    """True si el error merece reintento diferido (rate limit, red, 5xx)"""
+    if is_rate_limit_error(error) or isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    error_msg = str(error).lower()
+    return any(marker in error_msg for marker in TRANSIENT_ERROR_MARKERS)
+
+class DeferredRetryQueue:
+    """Cola de reintentos con tope de intentos por símbolo y backoff exponencial con jitter"""
+
+    def __init__(self, max_attempts=4, base_delay=5.0, max_delay=300.0, jitter=0.5):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.stats = {'deferred': 0, 'recovered': 0, 'lost': 0}
+        self._pending = {}
+        self._attempts = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def push(self, symbol, payload=None):
+        """Programa un reintento; devuelve False si el símbolo agotó sus intentos (perdido)"""
+        attempts = self._attempts.get(symbol, 0) + 1
+        self._attempts[symbol] = attempts
+
+        if attempts > self.max_attempts:
+            self.stats['lost'] += 1
+            return False
+
+        if attempts == 1:
+            self.stats['deferred'] += 1
+
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        self._pending[symbol] = (time.monotonic() + delay, payload)
+        return True
+
+    def pop_ready(self):
+        """Saca los símbolos cuyo backoff ya venció: lista de (symbol, payload) en orden de llegada"""
+        now = time.monotonic()
+        ready = [(symbol, payload) for symbol, (ready_at, payload) in self._pending.items() if ready_at <= now]
+        for symbol, _ in ready:
+            del self._pending[symbol]
+        return ready
+
+    def seconds_until_next(self):
+        """Segundos hasta el próximo reintento disponible (0 si ya hay alguno)"""
+        if not self._pending:
+            return 0.0
+        next_ready = min(ready_at for ready_at, _ in self._pending.values())
+        return max(0.0, next_ready - time.monotonic())
+
+    def resolve(self, symbol):
+        """Marca como recuperado un símbolo diferido que ya obtuvo un resultado definitivo"""
+        if self._attempts.get(symbol, 0) > 0:
+            self.stats['recovered'] += 1
+
+    def snapshot(self, payload_to_json=None):
+        """Estado serializable para el diario de la ejecución"""
+        payload_to_json = payload_to_json or (lambda payload: payload)
+        return {
+            'pending': [[symbol, payload_to_json(payload)] for symbol, (_, payload) in self._pending.items()],
+            'attempts': dict(self._attempts),
+            'stats': dict(self.stats)
+        }
+
+    def restore(self, snapshot, payload_from_json=None):
+        """Recupera un estado guardado con snapshot(); los pendientes quedan listos para reintento"""
+        payload_from_json = payload_from_json or (lambda payload: payload)
+        now = time.monotonic()
+        self._attempts = dict(snapshot.get('attempts', {}))
+        self.stats.update(snapshot.get('stats', {}))
+        self._pending = {symbol: (now, payload_from_json(payload)) for symbol, payload in snapshot.get('pending', [])}
@@ -0,0 +1,125 @@
+# run_archive.py - ARCHIVO HISTÓRICO DE EJECUCIONES
+# Candidatos y scores de cada ejecución en columnas .npy particionadas por fecha, con índice por símbolo
+import os
+import json
+import shutil
+from datetime import date, timedelta
+import numpy as np
+from result_records import candidate_columns
+
+# Columnas archivadas de cada candidato (además de 'rank', su posición en el ranking de la ejecución)
+ARCHIVE_FIELDS = ('symbol', 'current_price', 'total_score', 'profit_potential_score', 'momentum_score',
+                  'relative_strength_score', 'volume_score', 'setup_score', 'proximity_score',
+                  'acceleration_score', 'quality_score', 'breakout_score', 'stop_loss_percentage',
+                  'take_profit_percentage', 'risk_reward_ratio_numeric', 'expected_gain_per_day')
+
+class RunArchive:
+    """Histórico <root>/date=AAAA-MM-DD/ (columnas) + <root>/index.json ({símbolo: {fecha: fila}})
+
+    Cada fecha se escribe una vez; una reejecución del mismo día sustituye su partición."""
+
+    def __init__(self, root="data/run_archive"):
+        self.root = root
+        self._index = None
+        self._columns = {}
+
+    def append(self, run_id, candidates, ranking):
+        """Archiva los candidatos de una ejecución (run_id = AAAAMMDD_HHMMSS) con su posición en el ranking"""
+        run_date = f"{run_id[:4]}-{run_id[4:6]}-{run_id[6:8]}"
+        columns = candidate_columns(candidates)
+        rank = np.zeros(len(candidates), dtype=np.int32)
+        rank[np.asarray(ranking, dtype=np.int64)] = np.arange(1, len(ranking) + 1, dtype=np.int32)
+
+        # Partición completa en un directorio temporal y luego en su sitio
+        partition = self._partition_path(run_date)
+        tmp_path = partition + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for field in ARCHIVE_FIELDS:
+            np.save(os.path.join(tmp_path, f"{field}.npy"), columns[field], allow_pickle=False)
+        np.save(os.path.join(tmp_path, "rank.npy"), rank, allow_pickle=False)
+        with open(os.path.join(tmp_path, "run.json"), 'w', encoding='utf-8') as f:
+            json.dump({'run_id': run_id, 'rows': len(candidates)}, f)
+        shutil.rmtree(partition, ignore_errors=True)
+        os.replace(tmp_path, partition)
+        self._columns = {key: values for key, values in self._columns.items() if key[0] != run_date}
+
+        index = self.index()
+        for dates in index['symbols'].values():
+            dates.pop(run_date, None)
+        for row, symbol in enumerate(columns['symbol'].tolist()):
+            index['symbols'].setdefault(symbol, {})[run_date] = row
+        index['symbols'] = {symbol: dates for symbol, dates in index['symbols'].items() if dates}
+        index['dates'] = sorted(set(index['dates']) | {run_date})
+        self._write_index(index)
+
+    def index(self):
+        """Índice {'dates': [fechas archivadas], 'symbols': {símbolo: {fecha: fila}}}"""
+        if self._index is None:
+            try:
+                with open(os.path.join(self.root, "index.json"), 'r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {'dates': [], 'symbols': {}}
+        return self._index
+
+    def dates(self, days=None, end=None):
+        """Fechas archivadas en los últimos `days` días hasta `end` (por defecto la última archivada)"""
+        dates = self.index()['dates']
+        start = self._window_start(days, end)
+        return [day for day in dates if start <= day <= (end or '9999-12-31')]
+
+    def history(self, symbol, days=90, fields=('total_score',), end=None):
+        """[{'date', 'rank', campo: valor}] de un símbolo en los últimos `days` días, de más antiguo a más reciente"""
+        start = self._window_start(days, end)
+        history = []
+        for day, row in sorted(self.index()['symbols'].get(symbol, {}).items()):
+            if day < start or (end and day > end):
+                continue
+            entry = {'date': day, 'rank': int(self._column(day, 'rank')[row])}
+            entry.update({field: self._column(day, field)[row].item() for field in fields})
+            history.append(entry)
+        return history
+
+    def top_pick_count(self, symbol, top=10, days=None, end=None):
+        """(veces en el TOP `top`, veces candidato, ejecuciones archivadas) en la ventana"""
+        history = self.history(symbol, days=days, fields=(), end=end)
+        return sum(entry['rank'] <= top for entry in history), len(history), len(self.dates(days, end))
+
+    def trend(self, symbol, days=90, top=10):
+        """Resumen para el dashboard: historial de score y frecuencia en el TOP"""
+        history = self.history(symbol, days=days)
+        top_picks, candidate_runs, runs = self.top_pick_count(symbol, top=top, days=days)
+        return {
+            'days': days,
+            'score_history': [[entry['date'], entry['total_score']] for entry in history],
+            'top_picks': top_picks,
+            'candidate_runs': candidate_runs,
+            'runs': runs
+        }
+
+    def _window_start(self, days, end):
+        if days is None:
+            return ''
+        dates = self.index()['dates']
+        last = end or (dates[-1] if dates else date.today().isoformat())
+        return (date.fromisoformat(last) - timedelta(days=days - 1)).isoformat()
+
+    def _partition_path(self, day):
+        return os.path.join(self.root, f"date={day}")
+
+    def _column(self, day, field):
+        """Columna de una fecha mapeada desde disco (solo las que se consultan, una vez por instancia)"""
+        key = (day, field)
+        if key not in self._columns:
+            path = os.path.join(self._partition_path(day), f"{field}.npy")
+            self._columns[key] = np.load(path, mmap_mode='r', allow_pickle=False)
+        return self._columns[key]
+
+    def _write_index(self, index):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = os.path.join(self.root, "index.json.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, separators=(',', ':'))
+        os.replace(tmp_path, os.path.join(self.root, "index.json"))
+        self._index = index
@@ -0,0 +1,67 @@
+# run_journal.py - DIARIO DURABLE DE LA EJECUCIÓN (CHECKPOINT / RESUME)
+# Se reescribe al final de cada lote para que una ejecución cancelada pueda reanudarse con --resume
+import os
+import json
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+import numpy as np
+
+def json_default(value):
+    """Convierte escalares numpy y registros de resultados a tipos nativos de Python"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+class RunJournal:
+    """Checkpoint de una ejecución: universo, SPY, lotes completados, contadores y posición del log de candidatos"""
+
+    VERSION = 2
+
+    def __init__(self, path="data/run_journal.json"):
+        self.path = path
+
+    def load_resumable(self, max_age_hours=12):
+        """Estado de una ejecución sin terminar y reciente (None si no hay nada que reanudar)"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if state.get('version') != self.VERSION or state.get('completed'):
+            return None
+
+        # Un diario de otro día tendría otro universo y otro SPY: mejor empezar de cero
+        try:
+            started_at = datetime.fromisoformat(state['started_at'])
+        except (KeyError, TypeError, ValueError):
+            return None
+        if datetime.now() - started_at > timedelta(hours=max_age_hours):
+            return None
+
+        return state
+
+    def save(self, state):
+        """Escritura atómica del estado completo"""
+        state = dict(state, version=self.VERSION, updated_at=datetime.now().isoformat())
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, default=json_default, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def mark_completed(self):
+        """Marca la ejecución como terminada para que --resume no la reutilice"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        state['completed'] = True
+        self.save(state)
@@ -0,0 +1,74 @@
+# run_manifest.py - MANIFIESTO DE EJECUCIÓN Y RESULTADOS EN COLUMNAS
+# Cada ejecución guarda sus candidatos como columnas .npy tipadas; latest.json apunta siempre a la última
+import os
+import json
+from datetime import datetime
+import numpy as np
+from result_records import candidate_columns
+
+MANIFEST_FORMAT = 'npy-columns/1'
+
+class RunManifest:
+    """Ejecuciones en <root>/<run_id>/ (columnas + manifest.json) y un puntero fijo <root>/latest.json"""
+
+    def __init__(self, root="data/runs"):
+        self.root = root
+
+    def write(self, run_id, candidates, ranking, files=None):
+        """Guarda los candidatos en columnas y publica la ejecución como la última
+
+        `ranking` son los índices de fila de los candidatos en el orden del ranking (el TOP primero)."""
+        run_dir = os.path.join(self.root, run_id)
+        os.makedirs(run_dir, exist_ok=True)
+
+        columns = {}
+        for field, values in candidate_columns(candidates).items():
+            filename = f"{field}.npy"
+            np.save(os.path.join(run_dir, filename), values, allow_pickle=False)
+            columns[field] = {'file': filename, 'dtype': values.dtype.str, 'shape': list(values.shape)}
+        np.save(os.path.join(run_dir, 'ranking.npy'), np.asarray(ranking, dtype=np.int32), allow_pickle=False)
+
+        manifest = {
+            'format': MANIFEST_FORMAT,
+            'run_id': run_id,
+            'created_at': datetime.now().isoformat(),
+            'rows': len(candidates),
+            'columns': columns,
+            'ranking': 'ranking.npy',
+            'files': files or {}
+        }
+        _write_json(os.path.join(run_dir, 'manifest.json'), manifest)
+        # El puntero se reemplaza al final: un lector nunca ve una ejecución a medio escribir
+        _write_json(os.path.join(self.root, 'latest.json'), {'run_id': run_id, 'manifest': f"{run_id}/manifest.json"})
+        return manifest
+
+    def latest(self):
+        """Manifiesto de la última ejecución (None si no hay ninguna o está corrupto)"""
+        try:
+            with open(os.path.join(self.root, 'latest.json'), 'r', encoding='utf-8') as f:
+                pointer = json.load(f)
+            with open(os.path.join(self.root, pointer['manifest']), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if manifest.get('format') != MANIFEST_FORMAT:
+            return None
+        manifest['path'] = os.path.join(self.root, manifest['run_id'])
+        return manifest
+
+    def load_columns(self, manifest, mmap=True):
+        """{campo: array} de una ejecución; con mmap las columnas se mapean desde disco sin copiarlas"""
+        mode = 'r' if mmap else None
+        return {field: np.load(os.path.join(manifest['path'], spec['file']), mmap_mode=mode, allow_pickle=False)
+                for field, spec in manifest['columns'].items()}
+
+    def load_ranking(self, manifest):
+        """Índices de fila en el orden del ranking"""
+        return np.load(os.path.join(manifest['path'], manifest['ranking']), allow_pickle=False)
+
+def _write_json(path, data):
+    """Escritura atómica de un JSON"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
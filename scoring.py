@@ -0,0 +1,248 @@
+# scoring.py - MOTOR DE SCORING POR TABLAS
+# Umbrales, escalones y pesos como datos; se aplican vectorizados (searchsorted/select) a columnas de candidatos
+import copy
+import json
+import operator
+import numpy as np
+
+OPERATORS = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le}
+
+# Perfil por defecto: exactamente los umbrales históricos del screener
+DEFAULT_PROFILE = {
+    'tables': {
+        'momentum_rsi': {'bands': [[45, 65, 30], [40, 70, 20]], 'default': 5},
+        'momentum_ma21': {'bands': [[-5, 3, 25], [0, 8, 15]], 'default': 5},
+        'momentum_trend': {'op': '>', 'thresholds': [2, 0], 'scores': [25, 15], 'default': 0},
+        'breakout_pullback': {'bands': [[-8, -2, 30], [-12, 0, 20]], 'default': 5},
+        'breakout_consolidation': {'op': '<', 'thresholds': [12, 20], 'scores': [20, 10], 'default': 0},
+        'volume_ratio': {'op': '>', 'thresholds': [1.5, 1.2], 'scores': [30, 20], 'default': 10},
+        'breakout_proximity': {'op': '<=', 'thresholds': [2, 5, 8, 12], 'scores': [100, 80, 60, 40], 'default': 20},
+        # Aceleración: retorno medio 5d frente al de 10d multiplicado por cada umbral
+        'acceleration': {'op': '>', 'thresholds': [1.5, 1.2, 1.0], 'scores': [100, 80, 60], 'default': 30},
+        'relative_strength': {'op': '>', 'thresholds': [10, 5, 2, 0, -2], 'scores': [100, 85, 70, 55, 40], 'default': 0},
+        'take_profit': {'op': '>=', 'thresholds': [20, 15, 12, 10], 'scores': [100, 85, 70, 55], 'default': 30},
+        'risk_reward': {'op': '>=', 'thresholds': [3.0, 2.5, 2.0, 1.5], 'scores': [100, 85, 70, 50], 'default': 20},
+        'speed_rsi': {'op': '>', 'thresholds': [60], 'scores': [100], 'default': 50}
+    },
+    # Sin relative strength (o exactamente 0) el score es neutro
+    'relative_strength_neutral': 50,
+    'setup': {
+        'scores': {"Breakout Anticipation": 90, "Momentum Pullback": 80, "Mixed Setup": 60, "Oversold Bounce": 30},
+        'default': 50,
+        # +bonus si el pullback cae en la banda del setup
+        'pullback_bonus': {"Breakout Anticipation": [-3, 1], "Momentum Pullback": [-8, -3]},
+        'bonus': 10,
+        'cap': 100
+    },
+    'profit_potential': {
+        'weights': {'take_profit': 0.40, 'risk_reward': 0.30, 'speed': 0.30},
+        'speed_weights': {'acceleration': 0.4, 'proximity': 0.3, 'volume_ratio': 15, 'rsi': 0.15},
+        'speed_cap': 100
+    },
+    # Score final para ganancias rápidas: suma ponderada x scale
+    'weights': {
+        'profit_potential': 0.30,
+        'momentum': 0.20,
+        'relative_strength': 0.15,
+        'volume': 0.15,
+        'setup_type': 0.10,
+        'breakout_proximity': 0.05,
+        'acceleration': 0.03,
+        'quality': 0.02
+    },
+    'scale': 2
+}
+
+class StepTable:
+    """Escalones monótonos: score del primer umbral que cumple `valor op umbral` (default si ninguno o NaN)"""
+
+    def __init__(self, op, thresholds, scores, default):
+        if op not in OPERATORS:
+            raise ValueError(f"Operador de tabla desconocido: {op}")
+        if len(thresholds) != len(scores) or not thresholds:
+            raise ValueError("Cada umbral necesita su score")
+        descending = op in ('>', '>=')
+        ordered = sorted(thresholds, reverse=descending)
+        if list(thresholds) != ordered or len(set(thresholds)) != len(thresholds):
+            raise ValueError(f"Umbrales de '{op}' deben ser estrictamente {'decrecientes' if descending else 'crecientes'}: {thresholds}")
+
+        self.op = op
+        self.thresholds = list(thresholds)
+        self.scores = list(scores)
+        self.default = default
+
+        # searchsorted sobre los umbrales ascendentes: nº de umbrales por debajo -> posición en `lookup`
+        self._edges = np.array(sorted(thresholds), dtype=np.float64)
+        self._side = 'left' if op in ('>', '<=') else 'right'
+        self._lookup = np.array([default] + self.scores[::-1] if descending else self.scores + [default])
+
+    def apply(self, values, reference=None):
+        """Scores de un array; con `reference` compara contra umbral * reference (np.select)"""
+        values = np.asarray(values, dtype=np.float64)
+        if reference is not None:
+            compare = OPERATORS[self.op]
+            return np.select([compare(values, threshold * reference) for threshold in self.thresholds],
+                             self.scores, self.default)
+
+        positions = np.searchsorted(self._edges, values, side=self._side)
+        return np.where(np.isnan(values), self.default, self._lookup[positions])
+
+class BandTable:
+    """Bandas cerradas [min, max] evaluadas en orden: score de la primera que contiene el valor"""
+
+    def __init__(self, bands, default):
+        self.bands = [tuple(band) for band in bands]
+        self.default = default
+
+    def apply(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        return np.select([(values >= low) & (values <= high) for low, high, _ in self.bands],
+                         [score for _, _, score in self.bands], self.default)
+
+def make_table(spec):
+    """Tabla desde su especificación ({'bands': ...} o {'op', 'thresholds', 'scores'})"""
+    if 'bands' in spec:
+        return BandTable(spec['bands'], spec['default'])
+    return StepTable(spec['op'], spec['thresholds'], spec['scores'], spec['default'])
+
+def python_round(values, digits):
+    """round() de Python sobre floats nativos (np.round y round(np.float64) difieren en empates x.x5)"""
+    values = np.asarray(values, dtype=np.float64)
+    return np.array([round(value, digits) for value in values.ravel().tolist()]).reshape(values.shape)
+
+def _merge(base, overrides):
+    """Mezcla recursiva de un perfil parcial sobre otro (las claves nuevas se añaden al final)"""
+    merged = copy.deepcopy(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+class ScoringProfile:
+    """Tablas y pesos de scoring; cada método puntúa columnas enteras de candidatos"""
+
+    def __init__(self, spec=None, name="default"):
+        self.spec = _merge(DEFAULT_PROFILE, spec or {})
+        self.name = name
+        self.tables = {table: make_table(table_spec) for table, table_spec in self.spec['tables'].items()}
+        self.weights = self.spec['weights']
+
+    @classmethod
+    def from_json(cls, path):
+        """Perfil desde un JSON parcial: solo hace falta indicar lo que cambia respecto al por defecto"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), name=path)
+
+    def momentum_score(self, rsi, price_vs_ma21, ma21_vs_ma50):
+        return (self.tables['momentum_rsi'].apply(rsi) +
+                self.tables['momentum_ma21'].apply(price_vs_ma21) +
+                self.tables['momentum_trend'].apply(ma21_vs_ma50))
+
+    def breakout_score(self, pullback_from_high, consolidation_range):
+        return (self.tables['breakout_pullback'].apply(pullback_from_high) +
+                self.tables['breakout_consolidation'].apply(consolidation_range))
+
+    def volume_score(self, volume_ratio):
+        return self.tables['volume_ratio'].apply(volume_ratio)
+
+    def proximity_score(self, distance_to_high):
+        return self.tables['breakout_proximity'].apply(distance_to_high)
+
+    def acceleration_score(self, recent_avg, longer_avg):
+        return self.tables['acceleration'].apply(recent_avg, reference=np.asarray(longer_avg, dtype=np.float64))
+
+    def relative_strength_score(self, relative_strength, available=None):
+        """Sin dato (por defecto NaN) o exactamente 0 puntúa neutro"""
+        relative_strength = np.asarray(relative_strength, dtype=np.float64)
+        available = ~np.isnan(relative_strength) if available is None else np.asarray(available, dtype=bool)
+        neutral = ~available | (relative_strength == 0)
+        return np.where(neutral, self.spec['relative_strength_neutral'],
+                        self.tables['relative_strength'].apply(relative_strength))
+
+    @staticmethod
+    def setup_type(pullback, rsi):
+        """Clasificación del setup por pullback desde máximos y RSI (ambos redondeados a 1 decimal)"""
+        pullback = np.asarray(pullback, dtype=np.float64)
+        rsi = np.asarray(rsi, dtype=np.float64)
+        return np.select(
+            [(pullback >= -8) & (pullback <= -2) & (rsi >= 50) & (rsi <= 65),
+             (pullback >= -3) & (pullback <= 1) & (rsi > 60),
+             (pullback < -8) & (rsi < 50)],
+            ["Momentum Pullback", "Breakout Anticipation", "Oversold Bounce"], "Mixed Setup").astype(object)
+
+    def setup_score(self, setup_type, pullback):
+        setup = self.spec['setup']
+        setup_type = np.asarray(setup_type, dtype=object)
+        pullback = np.asarray(pullback, dtype=np.float64)
+
+        names = list(setup['scores'])
+        score = np.select([setup_type == name for name in names], [setup['scores'][name] for name in names], setup['default'])
+        for name, (low, high) in setup['pullback_bonus'].items():
+            score = score + np.where((setup_type == name) & (pullback >= low) & (pullback <= high), setup['bonus'], 0)
+        return np.minimum(score, setup['cap'])
+
+    def profit_potential_score(self, take_profit_pct, risk_reward, acceleration_score, proximity_score, volume_ratio, rsi):
+        """Potencial de ganancia rápida: take profit, R:R y velocidad esperada (redondeado a 1 decimal)"""
+        profit = self.spec['profit_potential']
+        speed_weights = profit['speed_weights']
+
+        speed_components = {
+            'acceleration': np.asarray(acceleration_score, dtype=np.float64),
+            'proximity': np.asarray(proximity_score, dtype=np.float64),
+            'volume_ratio': np.asarray(volume_ratio, dtype=np.float64),
+            'rsi': self.tables['speed_rsi'].apply(rsi)
+        }
+        speed = self._weighted_sum(speed_components, speed_weights)
+        capped = speed > profit['speed_cap']
+        speed = np.minimum(speed, profit['speed_cap'])
+
+        components = {
+            'take_profit': self.tables['take_profit'].apply(take_profit_pct),
+            'risk_reward': self.tables['risk_reward'].apply(risk_reward),
+            'speed': speed
+        }
+        # El round() original actuaba sobre np.float64 (como np.round) salvo con la velocidad topada,
+        # donde la suma era un float de Python: se replica para no mover empates x.x5
+        total = self._weighted_sum(components, profit['weights'])
+        return np.where(capped, python_round(total, 1), np.round(total, 1))
+
+    def base_score(self, components):
+        """Score total: suma ponderada de los componentes (claves de `weights`) por `scale`"""
+        return self._weighted_sum(components, self.weights) * self.spec['scale']
+
+    def score_candidates(self, columns):
+        """Todos los scores de un lote a partir de columnas de métricas (un array por métrica)"""
+        momentum = self.momentum_score(columns['rsi'], columns['price_vs_ma21'], columns['ma21_vs_ma50'])
+        volume = self.volume_score(columns['volume_ratio'])
+        proximity = self.proximity_score(columns['distance_to_high'])
+        acceleration = self.acceleration_score(columns['recent_return_mean'], columns['longer_return_mean'])
+        relative_strength = self.relative_strength_score(columns['relative_strength'])
+        setup_type = self.setup_type(columns['pullback_from_high'], columns['rsi'])
+        setup = self.setup_score(setup_type, columns['pullback_from_high'])
+        profit_potential = self.profit_potential_score(
+            columns['take_profit_pct'], columns['risk_reward'], acceleration, proximity,
+            columns['volume_ratio'], columns['rsi'])
+
+        scores = {
+            'profit_potential': profit_potential,
+            'momentum': momentum,
+            'relative_strength': relative_strength,
+            'volume': volume,
+            'setup_type': setup,
+            'breakout_proximity': proximity,
+            'acceleration': acceleration,
+            'quality': np.asarray(columns['quality'], dtype=np.float64)
+        }
+        scores['base_score'] = self.base_score(scores)
+        scores['setup_type_name'] = setup_type
+        return scores
+
+    @staticmethod
+    def _weighted_sum(components, weights):
+        # Mismo orden de sumas que la expresión original (resultado idéntico en coma flotante)
+        total = 0
+        for key, weight in weights.items():
+            total = total + components[key] * weight
+        return total
@@ -9,19 +9,42 @@ from datetime import datetime, timedelta
 import json
 from io import StringIO
 import logging
+import argparse
+import glob
+import zlib
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from price_store import PriceStore
+from scoring import ScoringProfile
+from filter_cascade import CascadeFilter, FilterCascade, FilterStatsStore, LazyContext
+from result_records import CandidateRecord, rejection, write_candidates_csv
+from candidate_log import CandidateLog
+from metadata_cache import MetadataCache, REFRESH_POLICIES
+from rate_limiter import AdaptiveRateLimiter, is_rate_limit_error
+from retry_queue import DeferredRetryQueue, is_transient_error
+from run_journal import RunJournal, json_default
+from run_manifest import RunManifest
+from run_archive import RunArchive
+from symbol_features import SymbolFeatures
+from panel_engine import PricePanel
+import kernels
 
 # Configurar logging más silencioso
 logging.getLogger('yfinance').setLevel(logging.WARNING)
 logging.getLogger('urllib3').setLevel(logging.WARNING)
 
+# Workers por defecto para el análisis concurrente (el trabajo es I/O-bound)
+DEFAULT_MAX_WORKERS = 8
+
 class DynamicUniverseBuilder:
     """Construye universo de acciones completamente dinámico"""
     
-    def __init__(self):
+    def __init__(self, rate_limiter=None):
         self.nasdaq_api_url = "https://api.nasdaq.com/api/screener/stocks"
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
     
     def get_all_tradeable_stocks(self):
         """Obtiene TODOS los tickers sin hardcode"""
@@ -45,7 +68,13 @@ class DynamicUniverseBuilder:
                 'exchange': exchange
             }
             
-            response = requests.get(self.nasdaq_api_url, headers=self.headers, params=params)
+            # Reintentar los 429: el limitador compartido aplica el cooldown antes del siguiente intento
+            for attempt in range(3):
+                with self.rate_limiter.request() as ticket:
+                    response = requests.get(self.nasdaq_api_url, headers=self.headers, params=params)
+                    ticket.throttled = response.status_code == 429
+                if not ticket.throttled:
+                    break
             
             if response.status_code == 200:
                 data = response.json()
@@ -135,11 +164,106 @@ class DynamicUniverseBuilder:
         except:
             return 0
 
+class BatchPriceDownloader:
+    """Descarga OHLCV de grupos de símbolos con una sola llamada multi-ticker"""
+    
+    OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+    
+    def __init__(self, period="6mo", chunk_size=100, rate_limiter=None):
+        self.period = period
+        self.chunk_size = max(1, int(chunk_size))
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+    
+    def download(self, symbols, start=None):
+        """Devuelve {symbol: DataFrame OHLCV}; los símbolos sin datos no aparecen"""
+        price_data = {}
+        
+        for start_idx in range(0, len(symbols), self.chunk_size):
+            chunk = list(symbols[start_idx:start_idx + self.chunk_size])
+            combined = self._download_chunk(chunk, start)
+            if combined is not None:
+                price_data.update(self._split_frame(combined, chunk))
+        
+        return price_data
+    
+    def _download_chunk(self, chunk, start=None):
+        """Una petición multi-ticker con reintentos ante rate limit (start = solo barras desde esa fecha)"""
+        max_retries = 2
+        retry_count = 0
+        range_kwargs = {'start': start} if start else {'period': self.period}
+        
+        while retry_count < max_retries:
+            try:
+                # Cada símbolo es una petición a Yahoo: coste = tamaño del grupo
+                with self.rate_limiter.request(cost=len(chunk)) as ticket:
+                    combined = yf.download(
+                        chunk,
+                        **range_kwargs,
+                        group_by='ticker',
+                        auto_adjust=True,
+                        threads=self.rate_limiter.concurrency,
+                        progress=False
+                    )
+                    # yf.download no lanza los 429 por símbolo: los deja en su registro de errores
+                    ticket.throttled = any(is_rate_limit_error(error) for error in self._download_errors())
+                return combined
+            except Exception as e:
+                if is_rate_limit_error(e):
+                    retry_count += 1
+                    if retry_count < max_retries:
+                        continue
+                
+                print(f"⚠️ Descarga por lotes fallida ({len(chunk)} símbolos): {str(e)[:30]}...")
+                return None
+        
+        return None
+    
+    def _download_errors(self):
+        """Errores por símbolo de la última llamada a yf.download"""
+        errors = getattr(getattr(yf, 'shared', None), '_ERRORS', None)
+        return list(errors.values()) if isinstance(errors, dict) else []
+    
+    def _split_frame(self, combined, chunk):
+        """Separa el frame combinado en vistas OHLCV por símbolo"""
+        frames = {}
+        
+        if combined is None or combined.empty:
+            return frames
+        
+        if isinstance(combined.columns, pd.MultiIndex):
+            available = set(combined.columns.get_level_values(0))
+            for symbol in chunk:
+                if symbol in available:
+                    frames[symbol] = combined[symbol]
+        elif len(chunk) == 1:
+            frames[chunk[0]] = combined
+        
+        clean_frames = {}
+        for symbol, df in frames.items():
+            if not all(col in df.columns for col in self.OHLCV_COLUMNS):
+                continue
+            
+            # El índice combinado es la unión de fechas: quitar filas vacías de este símbolo
+            df = df[self.OHLCV_COLUMNS].dropna(how='all')
+            if not df.empty:
+                clean_frames[symbol] = df
+        
+        return clean_frames
+
 class OptimizedSpeculativeSwingScreener:
     """Screener optimizado para maximizar ganancias rápidas con stop loss máximo -10%"""
     
-    def __init__(self):
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, metadata_cache=None, rate_limiter=None, panel_mode=False,
+                 scoring_profile=None, adaptive_filters=True):
         self.spy_return_5d = None
+        self.max_workers = max(1, int(max_workers))
+        self.metadata_cache = metadata_cache
+        self.panel_mode = panel_mode
+        self.scoring = scoring_profile or ScoringProfile()
+        self.price_filters = FilterCascade('price_basics', self._price_basics_filters(), adaptive=adaptive_filters)
+        self.price_action_filters = FilterCascade('price_action', self._price_action_filters(), adaptive=adaptive_filters)
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter(concurrency=self.max_workers,
+                                                                max_concurrency=self.max_workers)
         
     def calculate_spy_return_5d(self):
         """Calcula rendimiento de SPY en 5 días"""
@@ -151,7 +275,8 @@ class OptimizedSpeculativeSwingScreener:
         while retry_count < max_retries:
             try:
                 spy_ticker = yf.Ticker("SPY")
-                spy_data = spy_ticker.history(period="1mo")
+                with self.rate_limiter.request():
+                    spy_data = spy_ticker.history(period="1mo")
                 
                 if len(spy_data) >= 6:
                     spy_current = spy_data['Close'].iloc[-1]
@@ -168,9 +293,13 @@ class OptimizedSpeculativeSwingScreener:
             except Exception as e:
                 retry_count += 1
                 if retry_count < max_retries:
-                    wait_time = 2 ** retry_count
-                    print(f"⏳ SPY retry {retry_count}/{max_retries} en {wait_time}s")
-                    time.sleep(wait_time)
+                    if is_rate_limit_error(e):
+                        # El cooldown lo aplica el limitador compartido en el siguiente acquire
+                        print(f"⏳ SPY retry {retry_count}/{max_retries} (rate limit)")
+                    else:
+                        wait_time = 2 ** retry_count
+                        print(f"⏳ SPY retry {retry_count}/{max_retries} en {wait_time}s")
+                        time.sleep(wait_time)
                 else:
                     print(f"❌ SPY error: {str(e)[:30]}...")
                     return None
@@ -197,93 +326,167 @@ class OptimizedSpeculativeSwingScreener:
         except Exception as e:
             return False
     
-    def analyze_stock_optimized(self, symbol):
-        """STAGE 2 & 3: Análisis optimizado completo"""
-        max_retries = 2
-        retry_count = 0
-        
-        while retry_count < max_retries:
+    def analyze_stock_optimized(self, symbol, hist=None, features=None):
+        """STAGE 2 & 3: Análisis optimizado completo (hist/features opcionales si ya se calcularon por lotes)"""
+        try:
+            ticker = yf.Ticker(symbol)
+            if hist is None:
+                with self.rate_limiter.request():
+                    hist = ticker.history(period="6mo")
+            
+            if hist.empty or len(hist) < 50:
+                return rejection('Datos insuficientes')
+            
+            # Arrays e indicadores del símbolo, calculados una sola vez para todos los filtros y scores
+            if features is None:
+                features = SymbolFeatures.from_frame(hist)
+            
+            # STAGE 2: filtros de precio y volumen (sin red)
+            if not self._passes_price_basics(features):
+                return rejection('Filtros técnicos básicos')
+            
+            # STAGE 3: scoring y filtros que solo dependen del precio
+            analysis, rejected = self._analyze_price_action(features)
+            if rejected:
+                return rejected
+            
+            # Metadatos solo para los supervivientes (ticker.info es la llamada más lenta)
+            ticker_info = {}
             try:
-                ticker = yf.Ticker(symbol)
-                hist = ticker.history(period="6mo")
-                
-                if hist.empty or len(hist) < 50:
-                    return {'passes_all_filters': False, 'filter_reasons': ['Datos insuficientes']}
-                
-                ticker_info = {}
+                ticker_info = self._get_ticker_info(ticker, symbol)
+                if not ticker_info:
+                    ticker_info = {}
+            except Exception:
+                ticker_info = {
+                    'marketCap': 1_000_000_000,
+                    'beta': 1.5,
+                    'sector': 'Technology'
+                }
+            
+            if not self._passes_metadata_basics(ticker_info):
+                return rejection('Filtros técnicos básicos')
+            
+            result = self._build_result(analysis, ticker_info, symbol)
+            
+            return result if result else rejection('Error análisis')
+            
+        except Exception as e:
+            # Rate limit y fallos de red no se reintentan aquí (bloquearían el worker):
+            # se marcan como reintentables para la cola diferida
+            if is_rate_limit_error(e):
+                return rejection('Rate limit', retryable=True)
+            if is_transient_error(e):
+                return rejection(f'Error transitorio: {type(e).__name__}', retryable=True)
+            return rejection(f'Error: {type(e).__name__}')
+    
+    def _get_ticker_info(self, ticker, symbol):
+        """ticker.info a través de la caché de metadatos si está configurada"""
+        if self.metadata_cache is None:
+            return self._fetch_ticker_info(ticker)
+        return self.metadata_cache.get(symbol, lambda: self._fetch_ticker_info(ticker))
+    
+    def _fetch_ticker_info(self, ticker):
+        """ticker.info pasando por el limitador compartido"""
+        with self.rate_limiter.request():
+            return ticker.info
+    
+    def analyze_stocks_concurrently(self, symbols, max_workers=None, price_data=None):
+        """Analiza varios símbolos en paralelo devolviendo (resultado, error) en el orden de entrada"""
+        workers = self.max_workers if max_workers is None else max(1, int(max_workers))
+        price_data = price_data or {}
+        
+        # Modo panel: STAGE 2 de todo el lote en un barrido vectorizado; solo los supervivientes siguen
+        prescreened, panel_features = {}, {}
+        if self.panel_mode and price_data:
+            prescreened, panel_features = self._prescreen_panel(symbols, price_data)
+        pending = [symbol for symbol in symbols if symbol not in prescreened]
+        
+        # Con 1 worker se ejecuta en serie, sin pool (útil para debug)
+        if workers == 1 or len(pending) <= 1:
+            analyzed = {}
+            for symbol in pending:
                 try:
-                    ticker_info = ticker.info
-                    if not ticker_info:
-                        ticker_info = {}
-                except Exception:
-                    ticker_info = {
-                        'marketCap': 1_000_000_000,
-                        'beta': 1.5,
-                        'sector': 'Technology'
-                    }
-                
-                if not self._passes_technical_basics(hist, ticker_info):
-                    return {'passes_all_filters': False, 'filter_reasons': ['Filtros técnicos básicos']}
-                
-                result = self._complete_analysis_optimized_for_quick_gains(hist, ticker_info, symbol)
-                
-                return result if result else {'passes_all_filters': False, 'filter_reasons': ['Error análisis']}
-                
-            except Exception as e:
-                error_msg = str(e).lower()
+                    analyzed[symbol] = (self.analyze_stock_optimized(symbol, price_data.get(symbol), panel_features.get(symbol)), None)
+                except Exception as e:
+                    analyzed[symbol] = (None, e)
+        else:
+            with ThreadPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+                futures = {symbol: executor.submit(self.analyze_stock_optimized, symbol, price_data.get(symbol), panel_features.get(symbol))
+                           for symbol in pending}
                 
-                if "rate" in error_msg or "429" in error_msg or "too many requests" in error_msg:
-                    retry_count += 1
-                    if retry_count < max_retries:
-                        time.sleep(2 ** retry_count)
-                        continue
-                    else:
-                        return {'passes_all_filters': False, 'filter_reasons': ['Rate limit']}
-                else:
-                    return {'passes_all_filters': False, 'filter_reasons': [f'Error: {type(e).__name__}']}
+                analyzed = {}
+                for symbol, future in futures.items():
+                    error = future.exception()
+                    analyzed[symbol] = (None, error) if error else (future.result(), None)
+        
+        # Recoger en orden de entrada para que candidatos y CSVs coincidan con una ejecución serie
+        return [(prescreened[symbol], None) if symbol in prescreened else analyzed[symbol] for symbol in symbols]
+    
+    def _prescreen_panel(self, symbols, price_data):
+        """Filtros de precio vectorizados sobre el panel del lote -> (rechazos, features precargadas de los supervivientes)"""
+        panel = PricePanel.from_frames(price_data, symbols)
+        passes = panel.passes_price_basics()
+        
+        # Swing highs/lows y calidad de todo el lote para el análisis completo de los supervivientes
+        if passes.any():
+            panel.swing_mask('low')
+            panel.swing_mask('high')
+            panel.quality_score()
+        
+        rejections, features = {}, {}
+        for row, symbol in enumerate(panel.symbols):
+            if panel.lengths[row] < 50:
+                rejections[symbol] = rejection('Datos insuficientes')
+            elif not passes[row]:
+                rejections[symbol] = rejection('Filtros técnicos básicos')
+            else:
+                features[symbol] = panel.features(symbol)
+        
+        return rejections, features
     
     def _passes_technical_basics(self, df, ticker_info):
         """STAGE 2: Filtros técnicos básicos"""
+        features = SymbolFeatures.of(df)
+        return self._passes_price_basics(features) and self._passes_metadata_basics(ticker_info)
+    
+    def _passes_price_basics(self, df):
+        """STAGE 2: Filtros básicos que solo necesitan OHLCV (tendencia, ATR%, volumen)"""
+        try:
+            return self.price_filters.first_rejection(SymbolFeatures.of(df)) is None
+        except Exception:
+            return False
+    
+    def _price_basics_filters(self):
+        """Filtros de STAGE 2 en su orden original; la cascada los reordena por coste y selectividad"""
+        def atr_valid(features):
+            atr_20 = features.atr(20)
+            return bool(atr_20) and not pd.isna(atr_20) and atr_20 > 0
+        
+        def average_volume(features):
+            avg_volume = features.volume_mean(50)
+            return not pd.isna(avg_volume) and avg_volume >= 500_000
+        
+        reason = 'Filtros técnicos básicos'
+        return [
+            CascadeFilter('history', lambda features: features.length >= 50, reason),
+            CascadeFilter('ohlcv', lambda features: features.has_ohlcv, reason),
+            CascadeFilter('price', lambda features: not pd.isna(features.current_price) and features.current_price > 0, reason),
+            CascadeFilter('atr', atr_valid, reason),
+            CascadeFilter('atr_pct', lambda features: (features.atr(20) / features.current_price) * 100 <= 8.0, reason,
+                          requires=('price', 'atr')),
+            CascadeFilter('mas', lambda features: not pd.isna(features.ma21) and not pd.isna(features.ma50), reason),
+            CascadeFilter('trend', lambda features: not (features.current_price < features.ma50 or features.ma21 < features.ma50),
+                          reason, requires=('mas',)),
+            CascadeFilter('volume', average_volume, reason)
+        ]
+    
+    def _passes_metadata_basics(self, ticker_info):
+        """STAGE 2: Filtros que necesitan ticker.info (beta)"""
         try:
-            if df.empty or len(df) < 50:
-                return False
-            
-            required_columns = ['Close', 'High', 'Low', 'Volume', 'Open']
-            if not all(col in df.columns for col in required_columns):
-                return False
-            
-            current_price = df['Close'].iloc[-1]
-            if pd.isna(current_price) or current_price <= 0:
-                return False
-            
-            atr_20 = self._calculate_atr(df, 20)
-            if not atr_20 or pd.isna(atr_20) or atr_20 <= 0:
-                return False
-                
-            atr_percentage = (atr_20 / current_price) * 100
-            if atr_percentage > 8.0:
-                return False
-            
             beta = ticker_info.get('beta', 1.5)
             if beta and beta > 3.0:
                 return False
             
-            if len(df) < 50:
-                return False
-                
-            ma21 = df['Close'].rolling(21).mean().iloc[-1]
-            ma50 = df['Close'].rolling(50).mean().iloc[-1]
-            
-            if pd.isna(ma21) or pd.isna(ma50):
-                return False
-            
-            if current_price < ma50 or ma21 < ma50:
-                return False
-            
-            avg_volume = df['Volume'].tail(50).mean()
-            if pd.isna(avg_volume) or avg_volume < 500_000:
-                return False
-                
             return True
             
         except Exception:
@@ -291,29 +494,43 @@ class OptimizedSpeculativeSwingScreener:
     
     def _complete_analysis_optimized_for_quick_gains(self, df, ticker_info, symbol):
         """Análisis optimizado para MAXIMIZAR GANANCIAS RÁPIDAS"""
+        analysis, rejected = self._analyze_price_action(SymbolFeatures.of(df))
+        if rejected:
+            return rejected
+        
+        return self._build_result(analysis, ticker_info, symbol)
+    
+    def _analyze_price_action(self, df):
+        """STAGE 3 solo con precio: scores y filtros estrictos -> (análisis, rechazo)"""
         try:
-            current_price = df['Close'].iloc[-1]
+            features = SymbolFeatures.of(df)
+            current_price = features.current_price
+            
+            # Filtros estrictos primero (cascada: los baratos y selectivos antes que soportes/resistencias y R:R)
+            context = LazyContext(
+                relative_strength=lambda: self._calculate_relative_strength(features),
+                volume_data=lambda: self._analyze_volume(features),
+                risk_reward_data=lambda: self._calculate_stop_loss_take_profit_silent(features, current_price)
+            )
+            rejected = self.price_action_filters.first_rejection(context)
+            if rejected:
+                return None, rejection(rejected.reason)
+            
+            relative_strength = context['relative_strength']
+            volume_data = context['volume_data']
+            risk_reward_data = context['risk_reward_data']
             
             # Análisis base
-            momentum_data = self._analyze_momentum(df)
-            breakout_data = self._analyze_breakout_potential(df)
-            volume_data = self._analyze_volume(df)
-            quality_score = self._calculate_quality_score(df)
+            momentum_data = self._analyze_momentum(features)
+            breakout_data = self._analyze_breakout_potential(features)
+            quality_score = self._calculate_quality_score(features)
             
             # Nuevos factores
-            relative_strength = self._calculate_relative_strength(df)
             relative_strength_score = self._calculate_relative_strength_score(relative_strength)
             setup_type = self._determine_setup_type(momentum_data, breakout_data)
             setup_score = self._calculate_setup_type_score(setup_type, momentum_data, breakout_data)
-            proximity_score = self._calculate_breakout_proximity_score(df, current_price)
-            acceleration_score = self._calculate_momentum_acceleration_score(df)
-            
-            # Risk/Reward calculation ANTES del scoring
-            risk_reward_data = self._calculate_stop_loss_take_profit_silent(df, current_price)
-            
-            # 🔥 FILTRO ESTRICTO: Stop Loss máximo -10%
-            if risk_reward_data['stop_loss']['loss_percentage'] < -10:
-                return {'passes_all_filters': False, 'filter_reasons': ['Stop loss > 10%']}
+            proximity_score = self._calculate_breakout_proximity_score(features, current_price)
+            acceleration_score = self._calculate_momentum_acceleration_score(features)
             
             # 🔥 NUEVO: Profit Potential Score (prioriza ganancias rápidas)
             profit_potential_score = self._calculate_profit_potential_score(
@@ -324,168 +541,160 @@ class OptimizedSpeculativeSwingScreener:
                 volume_data
             )
             
-            # 🔥 SCORING REOPTIMIZADO PARA GANANCIAS RÁPIDAS
-            weights = {
-                'profit_potential': 0.30,    # 🔥 NUEVO: Mayor peso
-                'momentum': 0.20,            # Reducido
-                'relative_strength': 0.15,   # Reducido
-                'volume': 0.15,              # Reducido
-                'setup_type': 0.10,          # Reducido
-                'breakout_proximity': 0.05,  # Reducido
-                'acceleration': 0.03,        # Reducido
-                'quality': 0.02              # Reducido
-            }
-            
-            base_score = (
-                profit_potential_score * weights['profit_potential'] +
-                momentum_data['score'] * weights['momentum'] +
-                relative_strength_score * weights['relative_strength'] +
-                volume_data['score'] * weights['volume'] +
-                setup_score * weights['setup_type'] +
-                proximity_score * weights['breakout_proximity'] +
-                acceleration_score * weights['acceleration'] +
-                quality_score * weights['quality']
-            ) * 2
-            
-            # Filtros adicionales optimizados
-            if relative_strength and relative_strength < -2:
-                return {'passes_all_filters': False, 'filter_reasons': ['Underperform SPY significativo']}
-            
-            # 🔥 Filtro más estricto de R:R para ganancias rápidas
-            if risk_reward_data['risk_reward_ratio_numeric'] < 2.0:
-                return {'passes_all_filters': False, 'filter_reasons': ['R:R < 2:1']}
-            
-            if volume_data['score'] < 15:
-                return {'passes_all_filters': False, 'filter_reasons': ['Volume insuficiente']}
+            # 🔥 SCORING REOPTIMIZADO PARA GANANCIAS RÁPIDAS (pesos del perfil de scoring)
+            base_score = self.scoring.base_score({
+                'profit_potential': profit_potential_score,
+                'momentum': momentum_data['score'],
+                'relative_strength': relative_strength_score,
+                'volume': volume_data['score'],
+                'setup_type': setup_score,
+                'breakout_proximity': proximity_score,
+                'acceleration': acceleration_score,
+                'quality': quality_score
+            })
             
             # Entry signals
             entry_signals = self._generate_optimized_entry_signals(
-                df, momentum_data, breakout_data, volume_data, 
+                features, momentum_data, breakout_data, volume_data, 
                 relative_strength, setup_type, proximity_score,
                 risk_reward_data  # 🔥 Añadido para incluir info de profit
             )
             
+            # 🔥 NUEVO: Expected gain speed (días estimados para alcanzar target)
+            expected_days_to_target = self._estimate_days_to_target(features, momentum_data, acceleration_score)
+            
+            return {
+                'current_price': current_price,
+                'base_score': base_score,
+                'profit_potential_score': profit_potential_score,
+                'momentum_data': momentum_data,
+                'breakout_data': breakout_data,
+                'volume_data': volume_data,
+                'quality_score': quality_score,
+                'relative_strength': relative_strength,
+                'relative_strength_score': relative_strength_score,
+                'setup_type': setup_type,
+                'setup_score': setup_score,
+                'proximity_score': proximity_score,
+                'acceleration_score': acceleration_score,
+                'risk_reward_data': risk_reward_data,
+                'entry_signals': entry_signals,
+                'expected_days_to_target': expected_days_to_target,
+                'atr_pct': round((features.atr(20) / current_price) * 100, 1)
+            }, None
+            
+        except Exception as e:
+            return None, rejection(f'Error análisis: {type(e).__name__}')
+    
+    def _price_action_filters(self):
+        """Filtros estrictos de STAGE 3 en su orden original (stop loss, relative strength, R:R, volumen)"""
+        return [
+            # 🔥 FILTRO ESTRICTO: Stop Loss máximo -10%
+            CascadeFilter('stop_loss', lambda context: not context['risk_reward_data']['stop_loss']['loss_percentage'] < -10,
+                          'Stop loss > 10%', uses=('risk_reward_data',)),
+            CascadeFilter('relative_strength', lambda context: not (context['relative_strength'] and context['relative_strength'] < -2),
+                          'Underperform SPY significativo', uses=('relative_strength',)),
+            # 🔥 Filtro más estricto de R:R para ganancias rápidas
+            CascadeFilter('risk_reward', lambda context: not context['risk_reward_data']['risk_reward_ratio_numeric'] < 2.0,
+                          'R:R < 2:1', uses=('risk_reward_data',)),
+            CascadeFilter('volume_score', lambda context: not context['volume_data']['score'] < 15, 'Volume insuficiente',
+                          uses=('volume_data',))
+        ]
+    
+    def retune_filters(self):
+        """Reordena las cascadas con las mediciones acumuladas (entre lotes, no durante)"""
+        return [cascade.stage for cascade in (self.price_filters, self.price_action_filters) if cascade.retune()]
+    
+    def _build_result(self, analysis, ticker_info, symbol):
+        """Combina el análisis de precio con los metadatos en el registro final del candidato"""
+        try:
+            current_price = analysis['current_price']
+            momentum_data = analysis['momentum_data']
+            breakout_data = analysis['breakout_data']
+            volume_data = analysis['volume_data']
+            risk_reward_data = analysis['risk_reward_data']
+            entry_signals = analysis['entry_signals']
+            expected_days_to_target = analysis['expected_days_to_target']
+            proximity_score = analysis['proximity_score']
+            
             # Datos básicos
             company_name = ticker_info.get('longName', ticker_info.get('shortName', symbol))
             sector = ticker_info.get('sector', 'N/A')
             market_cap = ticker_info.get('marketCap', 0)
             
-            # 🔥 NUEVO: Expected gain speed (días estimados para alcanzar target)
-            expected_days_to_target = self._estimate_days_to_target(df, momentum_data, acceleration_score)
-            
-            return {
+            return CandidateRecord(
                 # Datos básicos
-                'symbol': symbol,
-                'company_name': company_name[:40] if company_name else symbol,
-                'sector': sector,
-                'current_price': round(current_price, 2),
-                'market_cap_millions': round(market_cap / 1000000, 0) if market_cap else 0,
+                symbol=symbol,
+                company_name=company_name[:40] if company_name else symbol,
+                sector=sector,
+                current_price=round(current_price, 2),
+                market_cap_millions=round(market_cap / 1000000, 0) if market_cap else 0,
                 
                 # Scores
-                'total_score': round(base_score, 1),
-                'profit_potential_score': profit_potential_score,  # 🔥 NUEVO
-                'momentum_score': momentum_data['score'],
-                'relative_strength_score': relative_strength_score,
-                'volume_score': volume_data['score'],
-                'setup_score': setup_score,
-                'proximity_score': proximity_score,
-                'acceleration_score': acceleration_score,
-                'quality_score': quality_score,
-                'breakout_score': breakout_data['score'],
+                total_score=round(analysis['base_score'], 1),
+                profit_potential_score=analysis['profit_potential_score'],  # 🔥 NUEVO
+                momentum_score=momentum_data['score'],
+                relative_strength_score=analysis['relative_strength_score'],
+                volume_score=volume_data['score'],
+                setup_score=analysis['setup_score'],
+                proximity_score=proximity_score,
+                acceleration_score=analysis['acceleration_score'],
+                quality_score=analysis['quality_score'],
+                breakout_score=breakout_data['score'],
                 
                 # Stop Loss - CAMPOS SEPARADOS
-                'stop_loss_price': round(risk_reward_data['stop_loss']['price'], 2),
-                'stop_loss_percentage': round(risk_reward_data['stop_loss']['loss_percentage'], 1),
-                'stop_loss_method': risk_reward_data['stop_loss']['method'],
+                stop_loss_price=round(risk_reward_data['stop_loss']['price'], 2),
+                stop_loss_percentage=round(risk_reward_data['stop_loss']['loss_percentage'], 1),
+                stop_loss_method=risk_reward_data['stop_loss']['method'],
                 
                 # Take Profit - CAMPOS SEPARADOS
-                'take_profit_price': round(risk_reward_data['take_profit']['price'], 2),
-                'take_profit_percentage': round(risk_reward_data['take_profit']['gain_percentage'], 1),
-                'take_profit_method': risk_reward_data['take_profit']['method'],
+                take_profit_price=round(risk_reward_data['take_profit']['price'], 2),
+                take_profit_percentage=round(risk_reward_data['take_profit']['gain_percentage'], 1),
+                take_profit_method=risk_reward_data['take_profit']['method'],
                 
                 # Risk/Reward
-                'risk_reward_ratio': risk_reward_data['risk_reward_ratio'],
-                'risk_reward_ratio_numeric': risk_reward_data['risk_reward_ratio_numeric'],
+                risk_reward_ratio=risk_reward_data['risk_reward_ratio'],
+                risk_reward_ratio_numeric=risk_reward_data['risk_reward_ratio_numeric'],
                 
                 # 🔥 NUEVO: Métricas de ganancia rápida
-                'expected_days_to_target': expected_days_to_target,
-                'expected_gain_per_day': round(risk_reward_data['take_profit']['gain_percentage'] / expected_days_to_target, 2) if expected_days_to_target > 0 else 0,
+                expected_days_to_target=expected_days_to_target,
+                expected_gain_per_day=round(risk_reward_data['take_profit']['gain_percentage'] / expected_days_to_target, 2) if expected_days_to_target > 0 else 0,
                 
                 # Datos técnicos
-                'relative_strength_5d': relative_strength,
-                'setup_type': setup_type,
-                'rsi': momentum_data['rsi'],
-                'pullback_pct': breakout_data['pullback_from_high'],
-                'volume_spike': volume_data['recent_volume_ratio'],
-                'atr_pct': round((self._calculate_atr(df, 20) / current_price) * 100, 1),
-                'breakout_proximity_pct': round(proximity_score, 1),
+                relative_strength_5d=analysis['relative_strength'],
+                setup_type=analysis['setup_type'],
+                rsi=momentum_data['rsi'],
+                pullback_pct=breakout_data['pullback_from_high'],
+                volume_spike=volume_data['recent_volume_ratio'],
+                atr_pct=analysis['atr_pct'],
+                breakout_proximity_pct=round(proximity_score, 1),
                 
                 # Entry signals como JSON string
-                'entry_signals': json.dumps(entry_signals[:3]) if entry_signals else json.dumps(["Setup técnico"]),
-                
-                'passes_all_filters': True
-            }
+                entry_signals=json.dumps(entry_signals[:3]) if entry_signals else json.dumps(["Setup técnico"])
+            )
             
         except Exception as e:
-            return {'passes_all_filters': False, 'filter_reasons': [f'Error análisis: {type(e).__name__}']}
+            return rejection(f'Error análisis: {type(e).__name__}')
     
     # === 🔥 NUEVAS FUNCIONES PARA MAXIMIZAR GANANCIAS ===
     
     def _calculate_profit_potential_score(self, risk_reward_data, momentum_data, 
                                         acceleration_score, proximity_score, volume_data):
-        """Score que prioriza el potencial de ganancia rápida"""
-        
-        # Componente 1: Take Profit percentage (40% del score)
-        take_profit_pct = risk_reward_data['take_profit']['gain_percentage']
-        if take_profit_pct >= 20:
-            tp_score = 100
-        elif take_profit_pct >= 15:
-            tp_score = 85
-        elif take_profit_pct >= 12:
-            tp_score = 70
-        elif take_profit_pct >= 10:
-            tp_score = 55
-        else:
-            tp_score = 30
-        
-        # Componente 2: Risk/Reward ratio (30% del score)
-        rr_numeric = risk_reward_data['risk_reward_ratio_numeric']
-        if rr_numeric >= 3.0:
-            rr_score = 100
-        elif rr_numeric >= 2.5:
-            rr_score = 85
-        elif rr_numeric >= 2.0:
-            rr_score = 70
-        elif rr_numeric >= 1.5:
-            rr_score = 50
-        else:
-            rr_score = 20
-        
-        # Componente 3: Velocidad esperada (30% del score)
-        # Basado en momentum, aceleración y proximidad a breakout
-        speed_indicators = (
-            acceleration_score * 0.4 +
-            proximity_score * 0.3 +
-            volume_data.get('recent_volume_ratio', 1) * 15 +  # Volume spike indica movimiento inminente
-            (100 if momentum_data['rsi'] > 60 else 50) * 0.15
-        )
-        speed_score = min(speed_indicators, 100)
-        
-        # Score total ponderado
-        profit_potential_score = (
-            tp_score * 0.40 +
-            rr_score * 0.30 +
-            speed_score * 0.30
-        )
-        
-        return round(profit_potential_score, 1)
+        """Score que prioriza el potencial de ganancia rápida (take profit, R:R y velocidad esperada)"""
+        return self.scoring.profit_potential_score(
+            risk_reward_data['take_profit']['gain_percentage'],
+            risk_reward_data['risk_reward_ratio_numeric'],
+            acceleration_score,
+            proximity_score,
+            volume_data.get('recent_volume_ratio', 1),  # Volume spike indica movimiento inminente
+            momentum_data['rsi']
+        ).item()
     
     def _estimate_days_to_target(self, df, momentum_data, acceleration_score):
         """Estima días para alcanzar el target basado en momentum actual"""
         try:
             # Calcular velocidad promedio de movimiento reciente
-            returns_5d = df['Close'].pct_change().tail(5)
-            avg_daily_move = abs(returns_5d.mean()) * 100
+            avg_daily_move = abs(SymbolFeatures.of(df).returns_mean(5)) * 100
             
             # Factor de aceleración
             acceleration_factor = 1.0
@@ -554,60 +763,20 @@ class OptimizedSpeculativeSwingScreener:
     def _calculate_relative_strength_score(self, relative_strength):
         """Score basado en relative strength vs SPY"""
         if not relative_strength:
-            return 50
+            return self.scoring.spec['relative_strength_neutral']
         
-        if relative_strength > 10:
-            return 100
-        elif relative_strength > 5:
-            return 85
-        elif relative_strength > 2:
-            return 70
-        elif relative_strength > 0:
-            return 55
-        elif relative_strength > -2:
-            return 40
-        else:
-            return 0
+        return self.scoring.tables['relative_strength'].apply(relative_strength).item()
     
     def _calculate_setup_type_score(self, setup_type, momentum_data, breakout_data):
         """Score basado en tipo de setup"""
-        base_scores = {
-            "Breakout Anticipation": 90,
-            "Momentum Pullback": 80,
-            "Mixed Setup": 60,
-            "Oversold Bounce": 30
-        }
-        
-        base_score = base_scores.get(setup_type, 50)
-        
-        if setup_type == "Breakout Anticipation":
-            pullback = breakout_data.get('pullback_from_high', 0)
-            if -3 <= pullback <= 1:
-                base_score += 10
-        
-        elif setup_type == "Momentum Pullback":
-            pullback = breakout_data.get('pullback_from_high', 0)
-            if -8 <= pullback <= -3:
-                base_score += 10
-        
-        return min(base_score, 100)
+        return self.scoring.setup_score(setup_type, breakout_data.get('pullback_from_high', 0)).item()
     
     def _calculate_breakout_proximity_score(self, df, current_price):
         """Score basado en proximidad a breakout"""
         try:
-            high_20d = df['High'].tail(20).max()
+            high_20d = SymbolFeatures.of(df).high_max(20)
             distance_to_high = ((high_20d - current_price) / current_price) * 100
-            
-            if distance_to_high <= 2:
-                return 100
-            elif distance_to_high <= 5:
-                return 80
-            elif distance_to_high <= 8:
-                return 60
-            elif distance_to_high <= 12:
-                return 40
-            else:
-                return 20
+            return self.scoring.proximity_score(distance_to_high).item()
                 
         except Exception:
             return 50
@@ -615,20 +784,10 @@ class OptimizedSpeculativeSwingScreener:
     def _calculate_momentum_acceleration_score(self, df):
         """Score basado en aceleración del momentum"""
         try:
-            returns_5d = df['Close'].pct_change().tail(5)
-            returns_10d = df['Close'].pct_change().tail(10)
-            
-            recent_avg = returns_5d.mean()
-            longer_avg = returns_10d.mean()
-            
-            if recent_avg > longer_avg * 1.5:
-                return 100
-            elif recent_avg > longer_avg * 1.2:
-                return 80
-            elif recent_avg > longer_avg:
-                return 60
-            else:
-                return 30
+            features = SymbolFeatures.of(df)
+            recent_avg = features.returns_mean(5)
+            longer_avg = features.returns_mean(10)
+            return self.scoring.acceleration_score(recent_avg, longer_avg).item()
                 
         except Exception:
             return 50
@@ -636,38 +795,18 @@ class OptimizedSpeculativeSwingScreener:
     def _analyze_momentum(self, df):
         """Análisis de momentum con RSI y MAs"""
         try:
-            current_price = df['Close'].iloc[-1]
+            features = SymbolFeatures.of(df)
+            current_price = features.current_price
             
-            rsi = self._calculate_rsi(df['Close'], 14)
-            rsi_current = rsi.iloc[-1] if not rsi.empty else 50
+            rsi_current = features.rsi(14)
             
-            ma21 = df['Close'].rolling(21).mean().iloc[-1]
-            ma50 = df['Close'].rolling(50).mean().iloc[-1]
-            
-            if 45 <= rsi_current <= 65:
-                rsi_score = 30
-            elif 40 <= rsi_current <= 70:
-                rsi_score = 20
-            else:
-                rsi_score = 5
+            ma21 = features.ma21
+            ma50 = features.ma50
             
             price_vs_ma21 = ((current_price - ma21) / ma21) * 100
-            if -5 <= price_vs_ma21 <= 3:
-                ma_score = 25
-            elif 0 <= price_vs_ma21 <= 8:
-                ma_score = 15
-            else:
-                ma_score = 5
-            
             ma21_vs_ma50 = ((ma21 - ma50) / ma50) * 100
-            if ma21_vs_ma50 > 2:
-                trend_score = 25
-            elif ma21_vs_ma50 > 0:
-                trend_score = 15
-            else:
-                trend_score = 0
             
-            total_momentum_score = rsi_score + ma_score + trend_score
+            total_momentum_score = self.scoring.momentum_score(rsi_current, price_vs_ma21, ma21_vs_ma50).item()
             
             return {
                 'score': total_momentum_score,
@@ -682,27 +821,14 @@ class OptimizedSpeculativeSwingScreener:
     def _analyze_breakout_potential(self, df):
         """Análisis de potencial de breakout"""
         try:
-            current_price = df['Close'].iloc[-1]
+            features = SymbolFeatures.of(df)
+            current_price = features.current_price
             
-            high_20d = df['High'].tail(20).max()
+            high_20d = features.high_max(20)
             pullback_from_high = ((current_price - high_20d) / high_20d) * 100
+            range_15d = ((features.high_max(15) - features.low_min(15)) / current_price) * 100
             
-            if -8 <= pullback_from_high <= -2:
-                pullback_score = 30
-            elif -12 <= pullback_from_high <= 0:
-                pullback_score = 20
-            else:
-                pullback_score = 5
-            
-            range_15d = ((df['High'].tail(15).max() - df['Low'].tail(15).min()) / current_price) * 100
-            if range_15d < 12:
-                consolidation_score = 20
-            elif range_15d < 20:
-                consolidation_score = 10
-            else:
-                consolidation_score = 0
-            
-            total_breakout_score = pullback_score + consolidation_score
+            total_breakout_score = self.scoring.breakout_score(pullback_from_high, range_15d).item()
             
             return {
                 'score': total_breakout_score,
@@ -716,17 +842,12 @@ class OptimizedSpeculativeSwingScreener:
     def _analyze_volume(self, df):
         """Análisis de volumen"""
         try:
-            volume_50d = df['Volume'].tail(50).mean()
-            volume_5d = df['Volume'].tail(5).mean()
+            features = SymbolFeatures.of(df)
+            volume_50d = features.volume_mean(50)
+            volume_5d = features.volume_mean(5)
             
             recent_volume_ratio = volume_5d / volume_50d if volume_50d > 0 else 1
-            
-            if recent_volume_ratio > 1.5:
-                volume_score = 30
-            elif recent_volume_ratio > 1.2:
-                volume_score = 20
-            else:
-                volume_score = 10
+            volume_score = self.scoring.volume_score(recent_volume_ratio).item()
             
             return {
                 'score': volume_score,
@@ -741,13 +862,14 @@ class OptimizedSpeculativeSwingScreener:
         """Calcula stop loss y take profit técnicos"""
         try:
             # STOP LOSS TÉCNICO - MÁXIMO -10%
-            technical_support = self._detect_support_level(df, lookback=30)
-            atr_20 = self._calculate_atr(df, 20)
+            features = SymbolFeatures.of(df)
+            technical_support = self._detect_support_level(features, lookback=30)
+            atr_20 = features.atr(20)
             atr_multiplier = 2.0
             atr_stop = current_price - (atr_20 * atr_multiplier) if atr_20 else None
             
-            ma21 = df['Close'].rolling(21).mean().iloc[-1]
-            ma50 = df['Close'].rolling(50).mean().iloc[-1]
+            ma21 = features.ma21
+            ma50 = features.ma50
             
             ma_support = None
             if ma21 < current_price and ma21 > current_price * 0.90:
@@ -785,7 +907,7 @@ class OptimizedSpeculativeSwingScreener:
             stop_loss_percentage = round(((stop_loss_price - current_price) / current_price) * 100, 1)
             
             # TAKE PROFIT TÉCNICO - Optimizado para ganancias mayores
-            technical_resistance = self._detect_resistance_level(df, lookback=30)
+            technical_resistance = self._detect_resistance_level(features, lookback=30)
             atr_target_multiplier = 3.5  # Aumentado de 3.0 para targets más ambiciosos
             atr_target = current_price + (atr_20 * atr_target_multiplier) if atr_20 else None
             
@@ -867,11 +989,12 @@ class OptimizedSpeculativeSwingScreener:
     def _calculate_relative_strength(self, df):
         """Calcula relative strength vs SPY"""
         try:
-            if self.spy_return_5d is None or len(df) < 6:
+            features = SymbolFeatures.of(df)
+            if self.spy_return_5d is None or features.length < 6:
                 return None
                 
-            current_price = df['Close'].iloc[-1]
-            price_5d_ago = df['Close'].iloc[-6]
+            current_price = features.current_price
+            price_5d_ago = features.close_ago(5)
             stock_return_5d = ((current_price / price_5d_ago) - 1) * 100
             
             relative_strength = stock_return_5d - self.spy_return_5d
@@ -883,17 +1006,11 @@ class OptimizedSpeculativeSwingScreener:
     def _calculate_quality_score(self, df):
         """Score de calidad técnica general"""
         try:
-            volume_consistency = 1 - (df['Volume'].tail(20).std() / df['Volume'].tail(20).mean())
+            features = SymbolFeatures.of(df)
+            volume_consistency = features.volume_consistency(20)
             volume_score = min(volume_consistency * 15, 15)
             
-            price_gaps = []
-            for i in range(1, min(11, len(df))):
-                prev_close = df['Close'].iloc[-i-1]
-                curr_open = df['Open'].iloc[-i]
-                gap = abs((curr_open - prev_close) / prev_close) * 100
-                price_gaps.append(gap)
-            
-            avg_gap = np.mean(price_gaps) if price_gaps else 0
+            avg_gap = features.gap_mean(10)
             gap_score = max(15 - avg_gap, 0)
             
             return round(volume_score + gap_score, 1)
@@ -903,74 +1020,31 @@ class OptimizedSpeculativeSwingScreener:
     
     def _determine_setup_type(self, momentum_data, breakout_data):
         """Determina el tipo de setup"""
-        pullback = breakout_data['pullback_from_high']
-        rsi = momentum_data['rsi']
-        
-        if -8 <= pullback <= -2 and 50 <= rsi <= 65:
-            return "Momentum Pullback"
-        elif -3 <= pullback <= 1 and rsi > 60:
-            return "Breakout Anticipation"
-        elif pullback < -8 and rsi < 50:
-            return "Oversold Bounce"
-        else:
-            return "Mixed Setup"
+        return ScoringProfile.setup_type(breakout_data['pullback_from_high'], momentum_data['rsi']).item()
     
     # FUNCIONES AUXILIARES
-    def _calculate_rsi(self, prices, period=14):
-        """Calcula RSI"""
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi
-    
     def _calculate_atr(self, df, period=20):
         """Calcula Average True Range"""
         try:
-            if len(df) < period + 1:
-                return None
-                
-            if not all(col in df.columns for col in ['High', 'Low', 'Close']):
-                return None
-            
-            high_low = df['High'] - df['Low']
-            high_close_prev = np.abs(df['High'] - df['Close'].shift())
-            low_close_prev = np.abs(df['Low'] - df['Close'].shift())
-            
-            if high_low.isna().all() or high_close_prev.isna().all() or low_close_prev.isna().all():
-                return None
-            
-            true_range = np.maximum(high_low, np.maximum(high_close_prev, low_close_prev))
-            atr = true_range.rolling(window=period).mean().iloc[-1]
-            
-            if pd.isna(atr) or atr <= 0:
-                return None
-                
-            return atr
-            
+            return SymbolFeatures.of(df).atr(period)
         except Exception:
             return None
     
     def _detect_support_level(self, df, lookback=20):
         """Detecta nivel de soporte técnico"""
         try:
-            current_price = df['Close'].iloc[-1]
+            features = SymbolFeatures.of(df)
+            current_price = features.current_price
             
-            recent_swing_lows = []
-            for i in range(max(0, len(df) - 40), len(df) - 2):
-                if (i >= 2 and i < len(df) - 2 and
-                    df['Low'].iloc[i] < df['Low'].iloc[i-1] and 
-                    df['Low'].iloc[i] < df['Low'].iloc[i+1]):
-                    recent_swing_lows.append(df['Low'].iloc[i])
+            recent_swing_lows = features.swing_lows(40)
             
-            ma21 = df['Close'].rolling(21).mean().iloc[-1]
-            ma50 = df['Close'].rolling(50).mean().iloc[-1]
+            ma21 = features.ma21
+            ma50 = features.ma50
             
             support_candidates = []
             
-            if recent_swing_lows:
-                support_candidates.extend([max(recent_swing_lows)])
+            if len(recent_swing_lows):
+                support_candidates.append(recent_swing_lows.max())
             
             if ma21 < current_price and ma21 > current_price * 0.90:
                 support_candidates.append(ma21)
@@ -987,29 +1061,25 @@ class OptimizedSpeculativeSwingScreener:
                 return current_price * 0.92
                 
         except Exception:
-            current_price = df['Close'].iloc[-1]
+            current_price = SymbolFeatures.of(df).current_price
             return current_price * 0.92
     
     def _detect_resistance_level(self, df, lookback=20):
         """Detecta nivel de resistencia técnico"""
         try:
-            current_price = df['Close'].iloc[-1]
+            features = SymbolFeatures.of(df)
+            current_price = features.current_price
             
-            recent_swing_highs = []
-            for i in range(max(0, len(df) - 40), len(df) - 2):
-                if (i >= 2 and i < len(df) - 2 and
-                    df['High'].iloc[i] > df['High'].iloc[i-1] and 
-                    df['High'].iloc[i] > df['High'].iloc[i+1]):
-                    recent_swing_highs.append(df['High'].iloc[i])
+            recent_swing_highs = features.swing_highs(40)
             
-            recent_high_20d = df['High'].tail(20).max()
+            recent_high_20d = features.high_max(20)
             
             resistance_candidates = []
             
-            if recent_swing_highs:
-                valid_highs = [h for h in recent_swing_highs if h > current_price * 1.02]
-                if valid_highs:
-                    resistance_candidates.append(min(valid_highs))
+            if len(recent_swing_highs):
+                valid_highs = recent_swing_highs[recent_swing_highs > current_price * 1.02]
+                if len(valid_highs):
+                    resistance_candidates.append(valid_highs.min())
             
             if recent_high_20d > current_price * 1.02:
                 resistance_candidates.append(recent_high_20d)
@@ -1026,107 +1096,26 @@ class OptimizedSpeculativeSwingScreener:
                 return current_price * 1.18
                 
         except Exception:
-            current_price = df['Close'].iloc[-1]
+            current_price = SymbolFeatures.of(df).current_price
             return current_price * 1.18
 
-def main():
-    """Función principal optimizada para MÁXIMAS GANANCIAS RÁPIDAS"""
-    print("=== 🚀 SCREENER OPTIMIZADO PARA MÁXIMAS GANANCIAS RÁPIDAS ===")
-    print("🎯 Stop Loss máximo: -10% | R:R mínimo: 2:1 | Prioridad: Profit Potential")
-    
-    # 1. CONSTRUIR UNIVERSO DINÁMICO
-    print("\n🔍 Construyendo universo dinámico...")
-    universe_builder = DynamicUniverseBuilder()
-    all_stocks = universe_builder.get_all_tradeable_stocks()
-    
-    if not all_stocks:
-        print("❌ No se pudieron obtener tickers")
-        exit(1)
-    
-    print(f"📊 Iniciando filtros en cascada sobre {len(all_stocks)} acciones...")
-    
-    # 2. SCREENER OPTIMIZADO
-    screener = OptimizedSpeculativeSwingScreener()
-    spy_return = screener.calculate_spy_return_5d()
-    
-    candidates = []
-    stage1_passed = 0
-    processed = 0
-    errors = 0
-    
-    total_stocks = len(all_stocks)
-    batch_size = 100
-    total_batches = (total_stocks + batch_size - 1) // batch_size
-    
-    print(f"🔥 Scoring REOPTIMIZADO: Profit Potential(30%) + Momentum(20%) + RelStr(15%) + Volume(15%)")
-    print(f"📦 Procesando en {total_batches} lotes de {batch_size} acciones c/u")
-    print()
-    
-    for batch_num in range(total_batches):
-        start_idx = batch_num * batch_size
-        end_idx = min(start_idx + batch_size, total_stocks)
-        batch_stocks = all_stocks[start_idx:end_idx]
-        
-        print(f"📦 Lote {batch_num + 1}/{total_batches} ({start_idx + 1}-{end_idx})")
-        
-        for i, stock in enumerate(batch_stocks, start_idx + 1):
-            # STAGE 1: Filtros rápidos
-            if not screener.quick_filters(stock):
-                continue
-            
-            stage1_passed += 1
-            
-            # STAGE 2 & 3: Análisis optimizado
-            try:
-                result = screener.analyze_stock_optimized(stock['symbol'])
-                processed += 1
-                
-                if result and result.get('passes_all_filters'):
-                    candidates.append(result)
-                    
-                    # LOG RESUMIDO con nueva info
-                    symbol = stock['symbol']
-                    score = result.get('total_score', 0)
-                    price = result.get('current_price', 0)
-                    target_pct = result.get('take_profit_percentage', 0)
-                    rr = result.get('risk_reward_ratio', '')
-                    profit_score = result.get('profit_potential_score', 0)
-                    
-                    print(f"✅ {symbol:6s} ${price:6.2f} Score:{score:5.1f} Target:+{target_pct:4.1f}% R:R{rr:6s} ProfitScore:{profit_score:5.1f} #{len(candidates):2d}")
-                
-                # Progreso cada 25 acciones
-                if processed % 25 == 0:
-                    candidates_rate = (len(candidates) / processed * 100) if processed > 0 else 0
-                    print(f"   📊 {processed:4d}/{total_stocks} | Stage1:{stage1_passed:4d} | Candidatos:{len(candidates):2d} ({candidates_rate:.1f}%)")
-                
-            except Exception as e:
-                errors += 1
-                if errors <= 3:
-                    print(f"❌ {stock['symbol']:6s}: {str(e)[:25]}...")
-        
-        # Pausa reducida
-        if batch_num < total_batches - 1:
-            print(f"   ⏸️  Pausa 3s...")
-            time.sleep(3)
-    
-    # RESUMEN FINAL
-    print(f"\n{'='*70}")
-    final_rate = (len(candidates) / total_stocks * 100) if total_stocks > 0 else 0
-    print(f"📊 RESUMEN: {total_stocks} total | {stage1_passed} stage1 | {processed} analizadas | {len(candidates)} candidatos ({final_rate:.2f}%) | {errors} errores")
-    
-    if spy_return:
-        print(f"📈 SPY 5d: {spy_return:+.2f}% (benchmark para relative strength)")
+# 🔥 NUEVO CRITERIO DE ORDENACIÓN: Combinar profit potential con score total
+def profit_optimized_sort_key(candidate):
+    # 60% profit potential score + 40% total score
+    profit_score = candidate.get('profit_potential_score', 0)
+    total_score = candidate.get('total_score', 0)
+    return (profit_score * 0.6 + total_score * 0.4)
+
+def save_screening_results(candidates, runs_dir="data/runs", archive_dir="data/run_archive"):
+    """Muestra el TOP 10 y guarda los CSV, el manifiesto con los resultados en columnas y el histórico"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # Ranking completo como índices de fila: el manifiesto lo guarda junto a las columnas
+    ranking = sorted(range(len(candidates)), key=lambda row: profit_optimized_sort_key(candidates[row]), reverse=True)
+    files = {}
     
     # 🔥 TOP 10 OPTIMIZADO PARA MÁXIMAS GANANCIAS
     if candidates:
-        # 🔥 NUEVO CRITERIO DE ORDENACIÓN: Combinar profit potential con score total
-        def profit_optimized_sort_key(candidate):
-            # 60% profit potential score + 40% total score
-            profit_score = candidate.get('profit_potential_score', 0)
-            total_score = candidate.get('total_score', 0)
-            return (profit_score * 0.6 + total_score * 0.4)
-        
-        top_candidates = sorted(candidates, key=profit_optimized_sort_key, reverse=True)[:20]
+        top_candidates = [candidates[row] for row in ranking[:20]]
         
         print(f"\n🔥 TOP 10 PARA MÁXIMAS GANANCIAS RÁPIDAS (Stop ≤ -10%, R:R ≥ 2:1):")
         print(f"{'#':>2} {'SYMBOL':>6} {'PRICE':>8} {'STOP$':>7} {'STOP%':>6} {'TARG$':>7} {'TARG%':>6} {'R:R':>6} {'DAYS':>4} {'P.SCORE':>7}")
@@ -1161,20 +1150,16 @@ def main():
             print(f"   🎭 Setup: {setup}")
             print(f"   💼 Stop: {candidate['stop_loss_percentage']:.1f}% | R:R: {candidate['risk_reward_ratio']}")
         
-        # Guardar resultados
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
         # Archivo completo
-        all_df = pd.DataFrame(candidates)
         all_filename = f"speculative_screening_results_{timestamp}.csv"
-        all_df.to_csv(all_filename, index=False)
+        write_candidates_csv(all_filename, candidates)
         print(f"\n💾 Resultados completos: {all_filename}")
         
         # Top 10 para dashboard
-        top_10_df = pd.DataFrame(top_candidates[:10])
         top_filename = f"speculative_top10_{timestamp}.csv"
-        top_10_df.to_csv(top_filename, index=False)
+        write_candidates_csv(top_filename, top_candidates[:10])
         print(f"💾 Top 10 guardado: {top_filename}")
+        files = {'results_csv': all_filename, 'top10_csv': top_filename}
         
         # Estadísticas de ganancia potencial
         avg_target = sum(c['take_profit_percentage'] for c in top_candidates[:10]) / 10
@@ -1190,6 +1175,434 @@ def main():
     else:
         print("❌ Sin candidatos - Filtros muy selectivos (Stop ≤ -10%, R:R ≥ 2:1)")
         print("💡 Esto es normal en mercados laterales o bajistas")
+    
+    # También sin candidatos: el dashboard debe ver la ejecución de hoy, no la anterior
+    try:
+        RunManifest(runs_dir).write(timestamp, candidates, ranking, files)
+        print(f"💾 Manifiesto de la ejecución: {runs_dir}/{timestamp}/manifest.json")
+    except Exception as e:
+        print(f"⚠️ No se pudo escribir el manifiesto de la ejecución: {e}")
+    
+    try:
+        archive = RunArchive(archive_dir)
+        archive.append(timestamp, candidates, ranking)
+        print(f"🗄️ Histórico: {len(archive.index()['dates'])} fechas, {len(archive.index()['symbols'])} símbolos ({archive_dir})")
+    except Exception as e:
+        print(f"⚠️ No se pudo archivar la ejecución: {e}")
+
+def parse_shard(value):
+    """Convierte 'i/N' en (i, N) con 0 <= i < N"""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError("formato esperado i/N, p. ej. 0/4")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError("se requiere 0 <= i < N")
+    return index, count
+
+def shard_universe(stocks, shard_index, shard_count):
+    """Partición determinista del universo por hash estable del símbolo"""
+    return [stock for stock in stocks
+            if zlib.crc32(stock['symbol'].encode('utf-8')) % shard_count == shard_index]
+
+def universe_fingerprint(symbols):
+    """Identificador de la ejecución compartido por todos sus shards: hash del universo completo en orden"""
+    return hashlib.sha256("\n".join(symbols).encode('utf-8')).hexdigest()[:16]
+
+def save_shard_results(shard, candidates, universe_position, counters, spy_return, universe_size, retry_stats):
+    """Guarda los candidatos parciales de un shard para el paso de merge"""
+    shard_index, shard_count = shard
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"speculative_shard_{shard_index}of{shard_count}_{timestamp}.json"
+    
+    partial = {
+        'shard': [shard_index, shard_count],
+        'run_id': universe_fingerprint(universe_position),
+        'timestamp': timestamp,
+        'universe_size': universe_size,
+        'spy_return_5d': spy_return,
+        'counters': counters,
+        'retry_stats': retry_stats,
+        'positions': [universe_position.get(candidate['symbol']) for candidate in candidates],
+        'candidates': candidates
+    }
+    
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(partial, f, default=json_default, ensure_ascii=False)
+    
+    print(f"\n💾 Shard {shard_index}/{shard_count}: {len(candidates)} candidatos parciales en {filename}")
+    print(f"💡 Al terminar todos los shards: python speculative_screener_automated.py --merge")
+    return filename
+
+def merge_shard_results(paths=None, runs_dir="data/runs", archive_dir="data/run_archive"):
+    """Une los resultados parciales de los shards y hace el ranking global"""
+    paths = paths or glob.glob("speculative_shard_*of*_*.json")
+    
+    partials = []
+    for path in sorted(paths):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                partial = json.load(f)
+            partials.append((path, tuple(partial['shard']), (partial.get('run_id'), partial.get('spy_return_5d')), partial))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"⚠️ Parcial ignorado {path}: {str(e)[:30]}...")
+    
+    if not partials:
+        print("❌ No hay resultados parciales de shards para unir")
+        return []
+    
+    # Solo parciales de la misma ejecución (mismo universo y mismo SPY): la que aporta más shards, y si empatan la más reciente
+    runs = {}
+    for path, shard, run, partial in partials:
+        runs.setdefault(run, set()).add(shard)
+    newest = {run: max(partial.get('timestamp', '') for _, _, other, partial in partials if other == run) for run in runs}
+    run = max(runs, key=lambda run: (len(runs[run]), newest[run]))
+    
+    # Por cada (i, N) quedarse con el parcial más reciente (timestamp en el nombre)
+    latest = {}
+    for path, shard, other, partial in partials:
+        if other != run:
+            print(f"⚠️ Parcial de otra ejecución excluido {path} (universo {other[0]}, SPY {other[1]})")
+            continue
+        latest[shard] = partial
+    
+    shard_count = max(count for _, count in latest)
+    found = sorted(index for index, count in latest if count == shard_count)
+    missing = [index for index in range(shard_count) if index not in found]
+    
+    print(f"=== 🔗 MERGE DE {len(found)}/{shard_count} SHARDS ===")
+    if missing:
+        print(f"⚠️ Faltan shards {missing}: el ranking solo cubre los disponibles")
+    
+    positioned = []
+    counters = {'stage1_passed': 0, 'processed': 0, 'errors': 0}
+    for index in found:
+        partial = latest[(index, shard_count)]
+        for key in counters:
+            counters[key] += partial['counters'].get(key, 0)
+        positioned.extend(zip(partial['positions'], map(CandidateRecord.from_mapping, partial['candidates'])))
+    
+    # Mismo orden que una ejecución sin shards: posición en el universo completo
+    positioned.sort(key=lambda item: item[0] if item[0] is not None else float('inf'))
+    candidates = [candidate for _, candidate in positioned]
+    
+    universe_size = max(partial['universe_size'] for partial in latest.values())
+    spy_return = run[1]
+    
+    final_rate = (len(candidates) / universe_size * 100) if universe_size > 0 else 0
+    print(f"📊 RESUMEN: {universe_size} total | {counters['stage1_passed']} stage1 | {counters['processed']} analizadas | {len(candidates)} candidatos ({final_rate:.2f}%) | {counters['errors']} errores")
+    if spy_return:
+        print(f"📈 SPY 5d: {spy_return:+.2f}% (benchmark para relative strength)")
+    
+    save_screening_results(candidates, runs_dir, archive_dir)
+    return candidates
+
+def parse_args(argv=None):
+    """Argumentos de línea de comandos"""
+    parser = argparse.ArgumentParser(description="Screener especulativo de swing trading")
+    parser.add_argument('--workers', type=int, default=DEFAULT_MAX_WORKERS,
+                        help=f"Análisis concurrentes por lote (1 = serie, por defecto {DEFAULT_MAX_WORKERS})")
+    parser.add_argument('--panel', action='store_true',
+                        help="Filtros de precio de cada lote en un barrido vectorizado símbolos × días (mismos resultados)")
+    parser.add_argument('--scoring-profile', default=None, metavar='JSON',
+                        help="Perfil de scoring (tablas de umbrales y pesos) que sobrescribe el por defecto")
+    parser.add_argument('--filter-stats', default="data/filter_stats.json",
+                        help="Fichero con coste y tasa de rechazo medidos de cada filtro (orden de la cascada)")
+    parser.add_argument('--fixed-filter-order', action='store_true',
+                        help="Evaluar los filtros siempre en su orden original (sin reordenar por coste/selectividad)")
+    parser.add_argument('--kernels', choices=('auto',) + kernels.BACKENDS, default='auto',
+                        help="Backend de los kernels de indicadores (auto = numba si está instalado, si no NumPy)")
+    parser.add_argument('--shard', type=parse_shard, default=None, metavar='i/N',
+                        help="Procesar solo la partición i (0..N-1) del universo por hash estable del símbolo")
+    parser.add_argument('--merge', nargs='*', default=None, metavar='PARCIAL',
+                        help="Unir resultados parciales de shards (por defecto speculative_shard_*.json) y guardar top 10 + resultados completos")
+    parser.add_argument('--resume', action='store_true',
+                        help="Reanudar la última ejecución a medias desde su diario (si es reciente)")
+    parser.add_argument('--runs-dir', default="data/runs",
+                        help="Directorio de ejecuciones: resultados en columnas, manifiesto y puntero latest.json")
+    parser.add_argument('--archive-dir', default="data/run_archive",
+                        help="Histórico de ejecuciones: candidatos y scores por fecha con índice por símbolo")
+    parser.add_argument('--candidate-log', default=None,
+                        help="Log JSONL de candidatos (por defecto data/candidate_log[_shard].jsonl)")
+    parser.add_argument('--from-log', action='store_true',
+                        help="Generar CSVs, manifiesto e histórico desde el log de candidatos (ejecución cortada) y salir")
+    parser.add_argument('--journal', default=None,
+                        help="Fichero del diario de checkpoint por lote (por defecto data/run_journal[_shard].json)")
+    parser.add_argument('--resume-max-age-hours', type=float, default=12,
+                        help="Antigüedad máxima de un diario para reanudarlo")
+    parser.add_argument('--price-store', default="data/price_store",
+                        help="Directorio del almacén local de OHLCV (actualización incremental)")
+    parser.add_argument('--price-store-months', type=int, default=None,
+                        help="Meses de histórico que conserva cada símbolo del almacén (por defecto 7: ventana de 6 + margen)")
+    parser.add_argument('--price-store-max-age-days', type=int, default=30,
+                        help="Borrar del almacén los símbolos no pedidos en N días (0 = no purgar)")
+    parser.add_argument('--no-price-store', action='store_true',
+                        help="Descargar 6 meses completos por símbolo sin usar el almacén local")
+    parser.add_argument('--max-rate', type=float, default=25.0,
+                        help="Techo de peticiones por segundo del limitador compartido (NASDAQ + Yahoo)")
+    parser.add_argument('--metadata-cache', default="data/metadata_cache.json",
+                        help="Fichero de la caché de ticker.info (beta, sector, marketCap, nombres)")
+    parser.add_argument('--metadata-refresh', choices=REFRESH_POLICIES, default='auto',
+                        help="auto = refrescar campos caducados, force = siempre red, never = solo caché")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Función principal optimizada para MÁXIMAS GANANCIAS RÁPIDAS"""
+    args = parse_args(argv)
+    
+    if args.merge is not None:
+        merge_shard_results(args.merge, args.runs_dir, args.archive_dir)
+        return
+    
+    shard = args.shard
+    journal_path = args.journal
+    if journal_path is None:
+        journal_path = f"data/run_journal_shard{shard[0]}of{shard[1]}.json" if shard else "data/run_journal.json"
+    candidate_log = CandidateLog(args.candidate_log or
+                                 (f"data/candidate_log_shard{shard[0]}of{shard[1]}.jsonl" if shard else "data/candidate_log.jsonl"))
+    
+    if args.from_log:
+        # Resultados de lo que haya en el log (p.ej. una ejecución cortada por timeout)
+        candidates = candidate_log.candidates()
+        print(f"📜 {len(candidates)} candidatos en {candidate_log.path}")
+        save_screening_results(candidates, args.runs_dir, args.archive_dir)
+        return
+    
+    print("=== 🚀 SCREENER OPTIMIZADO PARA MÁXIMAS GANANCIAS RÁPIDAS ===")
+    print("🎯 Stop Loss máximo: -10% | R:R mínimo: 2:1 | Prioridad: Profit Potential")
+    
+    kernels.set_backend(None if args.kernels == 'auto' else args.kernels)
+    print(f"⚙️ Kernels de indicadores: {kernels.describe()}")
+    
+    rate_limiter = AdaptiveRateLimiter(concurrency=args.workers, max_concurrency=args.workers,
+                                       max_rate=args.max_rate)
+    journal = RunJournal(journal_path)
+    resume_state = journal.load_resumable(args.resume_max_age_hours) if args.resume else None
+    if resume_state and not candidate_log.can_resume(resume_state['candidate_log']['offset']):
+        print(f"\n⚠️ {candidate_log.path} no conserva los candidatos del diario: empezando de cero")
+        resume_state = None
+    
+    # 1. CONSTRUIR UNIVERSO DINÁMICO (o recuperar el del diario al reanudar)
+    if resume_state:
+        universe = resume_state['universe']
+        print(f"\n♻️ Reanudando ejecución iniciada {resume_state['started_at']} ({resume_state['completed_batches']} lotes completados)")
+    else:
+        if args.resume:
+            print("\nℹ️ Sin ejecución reciente a medias: empezando de cero")
+        print("\n🔍 Construyendo universo dinámico...")
+        universe_builder = DynamicUniverseBuilder(rate_limiter=rate_limiter)
+        universe = universe_builder.get_all_tradeable_stocks()
+    
+    if not universe:
+        print("❌ No se pudieron obtener tickers")
+        exit(1)
+    
+    # Posición en el universo completo: orden determinista de candidatos (también entre shards)
+    universe_position = {stock['symbol']: idx for idx, stock in enumerate(universe)}
+    all_stocks = universe
+    if shard:
+        all_stocks = shard_universe(universe, *shard)
+        print(f"🧩 Shard {shard[0]}/{shard[1]}: {len(all_stocks)} de {len(universe)} acciones")
+    
+    print(f"📊 Iniciando filtros en cascada sobre {len(all_stocks)} acciones...")
+    
+    # 2. SCREENER OPTIMIZADO
+    metadata_cache = MetadataCache(args.metadata_cache, refresh_policy=args.metadata_refresh)
+    scoring_profile = ScoringProfile.from_json(args.scoring_profile) if args.scoring_profile else None
+    screener = OptimizedSpeculativeSwingScreener(max_workers=args.workers, metadata_cache=metadata_cache,
+                                                 rate_limiter=rate_limiter, panel_mode=args.panel,
+                                                 scoring_profile=scoring_profile,
+                                                 adaptive_filters=not args.fixed_filter_order)
+    filter_cascades = (screener.price_filters, screener.price_action_filters)
+    filter_stats = FilterStatsStore(args.filter_stats)
+    if not args.fixed_filter_order:
+        filter_stats.load(filter_cascades)
+    print(f"🎚️ Perfil de scoring: {screener.scoring.name}")
+    if resume_state:
+        spy_return = resume_state['spy_return_5d']
+        screener.spy_return_5d = spy_return
+    else:
+        spy_return = screener.calculate_spy_return_5d()
+    price_downloader = BatchPriceDownloader(period="6mo", rate_limiter=rate_limiter)
+    price_store = None if args.no_price_store else PriceStore(args.price_store, retention_months=args.price_store_months,
+                                                               max_age_days=args.price_store_max_age_days)
+    
+    counters = {'stage1_passed': 0, 'processed': 0, 'errors': 0}
+    retry_queue = DeferredRetryQueue()
+    started_at = datetime.now().isoformat()
+    start_batch = 0
+    
+    if resume_state:
+        # Lo añadido al log después del último checkpoint se vuelve a analizar: se descarta
+        candidate_log.open(**resume_state['candidate_log'])
+        counters.update(resume_state['counters'])
+        retry_queue.restore(resume_state['retry_queue'], payload_from_json=lambda stock: (stock, None))
+        started_at = resume_state['started_at']
+        start_batch = resume_state['completed_batches']
+    else:
+        candidate_log.open()
+    
+    total_stocks = len(all_stocks)
+    batch_size = 100
+    total_batches = (total_stocks + batch_size - 1) // batch_size
+    
+    def record_outcome(stock, result, error, hist=None):
+        """Contabiliza un resultado; los fallos transitorios van a la cola de reintentos"""
+        symbol = stock['symbol']
+        
+        if error:
+            counters['errors'] += 1
+            if counters['errors'] <= 3:
+                print(f"❌ {symbol:6s}: {str(error)[:25]}...")
+            return
+        
+        if result and result.get('retryable'):
+            if retry_queue.push(symbol, (stock, hist)):
+                return
+        else:
+            retry_queue.resolve(symbol)
+        
+        counters['processed'] += 1
+        processed = counters['processed']
+        
+        if result and result.get('passes_all_filters'):
+            # Al log en cuanto pasa: en memoria solo queda el contador
+            candidate_log.append(result, universe_position.get(symbol, total_stocks))
+            
+            # LOG RESUMIDO con nueva info
+            score = result.get('total_score', 0)
+            price = result.get('current_price', 0)
+            target_pct = result.get('take_profit_percentage', 0)
+            rr = result.get('risk_reward_ratio', '')
+            profit_score = result.get('profit_potential_score', 0)
+            
+            print(f"✅ {symbol:6s} ${price:6.2f} Score:{score:5.1f} Target:+{target_pct:4.1f}% R:R{rr:6s} ProfitScore:{profit_score:5.1f} #{candidate_log.count:2d}")
+        
+        # Progreso cada 25 acciones
+        if processed % 25 == 0:
+            candidates_rate = (candidate_log.count / processed * 100) if processed > 0 else 0
+            print(f"   📊 {processed:4d}/{total_stocks} | Stage1:{counters['stage1_passed']:4d} | Candidatos:{candidate_log.count:2d} ({candidates_rate:.1f}%)")
+    
+    def drain_retry_queue(wait):
+        """Reintenta los símbolos diferidos; sin wait solo si el limitador tiene capacidad libre"""
+        while len(retry_queue):
+            if not wait and not rate_limiter.has_spare_capacity():
+                return
+            
+            ready = retry_queue.pop_ready()
+            if not ready:
+                if not wait:
+                    return
+                time.sleep(retry_queue.seconds_until_next())
+                continue
+            
+            print(f"   ♻️ Reintentando {len(ready)} símbolos diferidos...")
+            symbols = [symbol for symbol, _ in ready]
+            price_data = {symbol: hist for symbol, (_, hist) in ready if hist is not None}
+            outcomes = screener.analyze_stocks_concurrently(symbols, price_data=price_data)
+            
+            for (symbol, (stock, hist)), (result, error) in zip(ready, outcomes):
+                record_outcome(stock, result, error, hist)
+    
+    def save_checkpoint(completed_batches):
+        """Escribe el diario de la ejecución (se llama tras cada lote)"""
+        journal.save({
+            'started_at': started_at,
+            'universe': universe,
+            'spy_return_5d': spy_return,
+            'completed_batches': completed_batches,
+            'counters': counters,
+            'candidate_log': {'offset': candidate_log.offset, 'count': candidate_log.count},
+            'retry_queue': retry_queue.snapshot(payload_to_json=lambda payload: payload[0])
+        })
+    
+    if not resume_state:
+        save_checkpoint(0)
+    
+    print(f"🔥 Scoring REOPTIMIZADO: Profit Potential(30%) + Momentum(20%) + RelStr(15%) + Volume(15%)")
+    print(f"📦 Procesando en {total_batches} lotes de {batch_size} acciones c/u ({screener.max_workers} workers)")
+    print()
+    
+    for batch_num in range(start_batch, total_batches):
+        start_idx = batch_num * batch_size
+        end_idx = min(start_idx + batch_size, total_stocks)
+        batch_stocks = all_stocks[start_idx:end_idx]
+        
+        print(f"📦 Lote {batch_num + 1}/{total_batches} ({start_idx + 1}-{end_idx})")
+        
+        # STAGE 1: Filtros rápidos
+        stage1_stocks = [stock for stock in batch_stocks if screener.quick_filters(stock)]
+        counters['stage1_passed'] += len(stage1_stocks)
+        
+        stage1_symbols = [stock['symbol'] for stock in stage1_stocks]
+        
+        # Históricos del lote: almacén local + solo barras nuevas, o descarga multi-ticker completa
+        # (los símbolos que falten se piden individualmente)
+        if not stage1_symbols:
+            price_data = {}
+        elif price_store:
+            price_data = price_store.update(stage1_symbols, price_downloader)
+        else:
+            price_data = price_downloader.download(stage1_symbols)
+        
+        # STAGE 2 & 3: Análisis optimizado concurrente (resultados en orden del lote)
+        outcomes = screener.analyze_stocks_concurrently(stage1_symbols, price_data=price_data)
+        
+        for stock, (result, error) in zip(stage1_stocks, outcomes):
+            record_outcome(stock, result, error, price_data.get(stock['symbol']))
+        
+        # Reintentos diferidos cuyo backoff ya venció, si sobra capacidad
+        drain_retry_queue(wait=False)
+        
+        # Cascada de filtros: nuevo orden con las mediciones de este lote (solo entre lotes)
+        screener.retune_filters()
+        
+        # Persistir metadatos nuevos y checkpoint por si la ejecución se corta
+        metadata_cache.save()
+        save_checkpoint(batch_num + 1)
+    
+    # Vaciar la cola de reintentos antes de cerrar la ejecución
+    if len(retry_queue):
+        print(f"\n♻️ Vaciando cola de reintentos ({len(retry_queue)} pendientes)...")
+        drain_retry_queue(wait=True)
+        save_checkpoint(total_batches)
+    
+    # Resultados finales desde el log; los recuperados en reintentos vuelven a su posición del universo
+    candidate_log.close()
+    candidates = candidate_log.candidates()
+    
+    # RESUMEN FINAL
+    print(f"\n{'='*70}")
+    final_rate = (len(candidates) / total_stocks * 100) if total_stocks > 0 else 0
+    print(f"📊 RESUMEN: {total_stocks} total | {counters['stage1_passed']} stage1 | {counters['processed']} analizadas | {len(candidates)} candidatos ({final_rate:.2f}%) | {counters['errors']} errores")
+    
+    retry_stats = retry_queue.stats
+    print(f"♻️ Reintentos: {retry_stats['deferred']} diferidos | {retry_stats['recovered']} recuperados | {retry_stats['lost']} perdidos definitivamente")
+    
+    if spy_return:
+        print(f"📈 SPY 5d: {spy_return:+.2f}% (benchmark para relative strength)")
+    
+    print(f"🚦 Rate limiter: {rate_limiter.summary()}")
+    
+    metadata_stats = metadata_cache.stats
+    print(f"🗂️ Metadata cache: {metadata_stats['hits']} aciertos | {metadata_stats['refreshes']} refrescos | {metadata_stats['stale_fallbacks']} caducados usados | {metadata_stats['misses']} sin datos")
+    
+    if price_store:
+        store_stats = price_store.stats
+        print(f"💾 Price store: {store_stats['appended']} actualizados | {store_stats['full_downloads']} descargas completas | {store_stats['adjusted']} re-descargados por split/ajuste | {store_stats['trimmed']} recortados | {store_stats['evicted']} purgados")
+    
+    for cascade in filter_cascades:
+        print(f"🧪 Cascada {cascade.stage} ({cascade.reorders} reordenaciones): {cascade.summary()}")
+    filter_stats.save(filter_cascades)
+    
+    if shard:
+        # Modo shard: solo resultados parciales; el ranking global lo hace --merge
+        save_shard_results(shard, candidates, universe_position, counters, spy_return, len(universe), retry_queue.stats)
+    else:
+        save_screening_results(candidates, args.runs_dir, args.archive_dir)
+    
+    # Ejecución terminada: el diario ya no debe reanudarse
+    journal.mark_completed()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
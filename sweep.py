@@ -0,0 +1,182 @@
+# sweep.py - BARRIDO PARALELO DE PESOS DE SCORING Y UMBRALES DE FILTROS
+# Features del backtest calculadas una vez (columnas .npy mapeadas por todos los procesos); cada configuración solo re-puntúa y re-ordena
+import os
+import json
+import time
+import random
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from scoring import ScoringProfile
+from backtest import FeatureHistory, DEFAULT_THRESHOLDS, run_backtest, load_history_frames, add_history_arguments
+
+# Parámetros con clave 'weights.<componente>' (pesos del score final) o 'thresholds.<umbral>' (filtros del screener)
+DEFAULT_GRID = {
+    'weights.profit_potential': [0.20, 0.30, 0.40],
+    'weights.momentum': [0.10, 0.20, 0.30],
+    'thresholds.max_loss_pct': [8.0, 10.0, 12.0],
+    'thresholds.min_risk_reward': [1.5, 2.0, 2.5],
+    'thresholds.max_atr_pct': [6.0, 8.0, 10.0]
+}
+
+# Rangos [mínimo, máximo] para el muestreo aleatorio
+DEFAULT_RANGES = {
+    'weights.profit_potential': [0.10, 0.50],
+    'weights.momentum': [0.05, 0.35],
+    'weights.relative_strength': [0.0, 0.30],
+    'weights.volume': [0.0, 0.30],
+    'weights.setup_type': [0.0, 0.20],
+    'thresholds.max_loss_pct': [6.0, 14.0],
+    'thresholds.min_risk_reward': [1.5, 3.0],
+    'thresholds.max_atr_pct': [5.0, 12.0]
+}
+
+METRICS = ('avg_return_pct', 'median_return_pct', 'win_rate', 'profit_factor')
+
+def grid_configurations(grid):
+    """Producto cartesiano de los valores de cada parámetro"""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+def random_configurations(ranges, samples, seed=42):
+    """`samples` configuraciones uniformes dentro de cada rango (reproducibles con `seed`)"""
+    rng = random.Random(seed)
+    return [{key: round(rng.uniform(low, high), 3) for key, (low, high) in ranges.items()} for _ in range(samples)]
+
+def split_params(params):
+    """(perfil de scoring parcial, umbrales) de una configuración plana"""
+    spec, thresholds = {}, {}
+    for key, value in params.items():
+        group, _, name = key.partition('.')
+        if group == 'weights':
+            if name not in ScoringProfile().weights:
+                raise ValueError(f"Peso desconocido: {name}")
+            spec.setdefault('weights', {})[name] = value
+        elif group == 'thresholds':
+            if name not in DEFAULT_THRESHOLDS:
+                raise ValueError(f"Umbral desconocido: {name}")
+            thresholds[name] = value
+        else:
+            raise ValueError(f"Parámetro desconocido: {key} (usa 'weights.<nombre>' o 'thresholds.<nombre>')")
+    return spec, thresholds
+
+def evaluate(history, params, options):
+    """Resumen del backtest de una configuración (las features no se recalculan)"""
+    spec, thresholds = split_params(params)
+    _, summary = run_backtest(history, ScoringProfile(spec, name='sweep'), thresholds, **options)
+    exits = summary.pop('exits')
+    return {**params, **summary, **{f"exits_{reason}": count for reason, count in exits.items()}}
+
+# Estado de cada proceso del pool: features mapeadas desde disco (solo lectura, páginas compartidas)
+_worker = {}
+
+def _init_worker(features_dir, options):
+    _worker['history'] = FeatureHistory.load(features_dir, mmap=True)
+    _worker['options'] = options
+
+def _evaluate_in_worker(params):
+    return evaluate(_worker['history'], params, _worker['options'])
+
+def run_sweep(features_dir, configurations, options, workers=None):
+    """Evalúa las configuraciones en un pool de procesos -> DataFrame (una fila por configuración, en orden)"""
+    workers = max(1, min(workers or os.cpu_count() or 1, len(configurations) or 1))
+    if workers == 1:
+        _init_worker(features_dir, options)
+        results = [_evaluate_in_worker(params) for params in configurations]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(features_dir, options)) as executor:
+            results = list(executor.map(_evaluate_in_worker, configurations,
+                                        chunksize=max(1, len(configurations) // (workers * 4))))
+    results = pd.DataFrame(results)
+    params = list(dict.fromkeys(key for configuration in configurations for key in configuration))
+    return results[params + [column for column in results.columns if column not in params]]
+
+def rank_results(results, metric='avg_return_pct', min_trades=30):
+    """Configuraciones de mejor a peor según `metric`; las de menos de `min_trades` cerradas van al final"""
+    if metric not in METRICS:
+        raise ValueError(f"Métrica desconocida: {metric} (opciones: {', '.join(METRICS)})")
+    enough = results['closed'] >= min_trades
+    ranked = results.assign(_enough=enough, _metric=results[metric].fillna(float('-inf')))
+    ranked = ranked.sort_values(['_enough', '_metric'], ascending=False, kind='stable')
+    return ranked.drop(columns=['_enough', '_metric'])
+
+def load_search_space(path):
+    """{'grid': {...}} o {'ranges': {...}, 'samples': N} desde un JSON"""
+    with open(path, 'r', encoding='utf-8') as f:
+        space = json.load(f)
+    if 'grid' not in space and 'ranges' not in space:
+        raise ValueError(f"{path}: el espacio de búsqueda necesita 'grid' o 'ranges'")
+    return space
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Barrido paralelo de pesos de scoring y umbrales de filtros sobre el backtest")
+    add_history_arguments(parser)
+    parser.add_argument('--space', default=None, metavar='JSON',
+                        help="Espacio de búsqueda ({'grid': {...}} o {'ranges': {...}, 'samples': N}); por defecto DEFAULT_GRID")
+    parser.add_argument('--random', type=int, default=0, metavar='N',
+                        help="N configuraciones aleatorias dentro de los rangos en lugar de la rejilla")
+    parser.add_argument('--seed', type=int, default=42, help="Semilla del muestreo aleatorio")
+    parser.add_argument('--workers', type=int, default=None, help="Procesos del pool (por defecto uno por CPU)")
+    parser.add_argument('--metric', default='avg_return_pct', choices=METRICS, help="Métrica para ordenar las configuraciones")
+    parser.add_argument('--min-trades', type=int, default=30, help="Operaciones cerradas mínimas para entrar en el ranking")
+    parser.add_argument('--report', type=int, default=10, help="Mejores configuraciones a mostrar")
+    parser.add_argument('--features', default='data/backtest/features', metavar='DIR',
+                        help="Directorio de las features compartidas por los procesos")
+    parser.add_argument('--reuse-features', action='store_true',
+                        help="Usar las features ya guardadas en --features sin recalcularlas")
+    parser.add_argument('--output', default='data/backtest', help="Directorio del resultado del barrido")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    started = time.perf_counter()
+
+    space = load_search_space(args.space) if args.space else {'grid': DEFAULT_GRID, 'ranges': DEFAULT_RANGES}
+    if args.random or 'grid' not in space:
+        configurations = random_configurations(space.get('ranges', DEFAULT_RANGES), args.random or space.get('samples', 50), args.seed)
+    else:
+        configurations = grid_configurations(space['grid'])
+    # La configuración actual del screener siempre se evalúa como referencia
+    configurations = [{}] + configurations
+    for params in configurations:
+        split_params(params)
+
+    if args.reuse_features and os.path.exists(os.path.join(args.features, 'meta.json')):
+        print(f"♻️ Features reutilizadas de {args.features}")
+    else:
+        frames, spy = load_history_frames(args)
+        if not frames:
+            print("❌ Sin históricos para el barrido")
+            return 1
+        if spy is None:
+            print("⚠️ Sin histórico de SPY: relative strength neutro")
+        history = FeatureHistory.from_frames(frames, spy=spy)
+        history.save(args.features)
+        print(f"📊 Features: {len(history)} símbolos x {len(history.dates)} días en {time.perf_counter() - started:.1f}s")
+
+    options = {'top': args.top, 'max_hold': args.max_hold, 'start': args.start, 'end': args.end}
+    sweep_started = time.perf_counter()
+    results = run_sweep(args.features, configurations, options, args.workers)
+    elapsed = time.perf_counter() - sweep_started
+    print(f"⏱️ {len(configurations)} configuraciones en {elapsed:.1f}s ({elapsed / len(configurations):.2f}s cada una)")
+
+    baseline = results.iloc[0]
+    ranked = rank_results(results, args.metric, args.min_trades)
+    os.makedirs(args.output, exist_ok=True)
+    ranked.to_csv(os.path.join(args.output, 'sweep_results.csv'), index=False)
+
+    param_columns = [column for column in ranked.columns if '.' in column]
+    print(f"=== 🏆 MEJORES CONFIGURACIONES ({args.metric}, mín. {args.min_trades} operaciones) ===")
+    print(f"   Actual: {args.metric}={baseline[args.metric]} | acierto {baseline['win_rate']}% | "
+          f"{int(baseline['closed'])} operaciones")
+    for position, (_, row) in enumerate(ranked.head(args.report).iterrows(), 1):
+        params = ", ".join(f"{column}={row[column]}" for column in param_columns if pd.notna(row[column])) or "actual"
+        print(f"{position:2d}. {args.metric}={row[args.metric]} | acierto {row['win_rate']}% | "
+              f"PF {row['profit_factor']} | {int(row['closed'])} operaciones | {params}")
+    print(f"💾 Resultados en {args.output}/sweep_results.csv")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,203 @@
+# symbol_features.py - FEATURES POR SÍMBOLO EN UNA SOLA PASADA
+# Extrae OHLCV a arrays NumPy una vez y calcula cada indicador (MAs, ATR, RSI, retornos...) una sola vez
+import numpy as np
+import kernels
+
+class SymbolFeatures:
+    """Arrays OHLCV de un símbolo con indicadores memorizados, misma semántica que las versiones pandas"""
+
+    COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+    def __init__(self, open_, high, low, close, volume, columns=COLUMNS):
+        self.open, self.high, self.low, self.close, self.volume = open_, high, low, close, volume
+        self.length = len(close)
+        self.columns = set(columns)
+        self.has_ohlcv = all(col in self.columns for col in self.COLUMNS)
+        self._cache = {}
+
+    @classmethod
+    def from_frame(cls, df):
+        """Extrae las columnas OHLCV de un DataFrame a arrays float64"""
+        # Columnas ausentes como NaN: los filtros básicos las rechazan igual que antes
+        arrays = (df[col].to_numpy(dtype=np.float64) if col in df.columns else np.full(len(df), np.nan)
+                  for col in cls.COLUMNS)
+        return cls(*arrays, columns=df.columns)
+
+    @classmethod
+    def of(cls, data):
+        """Acepta un DataFrame o un SymbolFeatures ya construido"""
+        return data if isinstance(data, cls) else cls.from_frame(data)
+
+    def seed(self, values):
+        """Precarga indicadores ya calculados en otro sitio (p.ej. el panel vectorizado)"""
+        for key, value in values.items():
+            self._cache.setdefault(key, value)
+        return self
+
+    @property
+    def current_price(self):
+        """Último cierre"""
+        return self.close[-1]
+
+    def close_ago(self, bars):
+        """Cierre de hace `bars` barras (equivale a iloc[-bars-1])"""
+        return self.close[-bars - 1]
+
+    def sma(self, period):
+        """Última media móvil simple del cierre (NaN si falta algún dato de la ventana)"""
+        return self._memo(('sma', period), lambda: self._window_mean(self.close, period))
+
+    @property
+    def ma21(self):
+        return self.sma(21)
+
+    @property
+    def ma50(self):
+        return self.sma(50)
+
+    def atr(self, period=20):
+        """Average True Range; None si no hay datos suficientes o no es positivo"""
+        return self._memo(('atr', period), lambda: self._compute_atr(period))
+
+    def rsi(self, period=14):
+        """Último RSI (medias simples de ganancias y pérdidas), NaN si faltan barras"""
+        return self._memo(('rsi', period), lambda: self._compute_rsi(period))
+
+    @property
+    def returns(self):
+        """Retornos diarios como pct_change() (cierres rellenados hacia delante)"""
+        return self._memo('returns', self._compute_returns)
+
+    def returns_mean(self, bars):
+        """Media de los últimos retornos ignorando NaN"""
+        return self._memo(('returns_mean', bars), lambda: self._nanmean(self.returns[-bars:]))
+
+    def volume_mean(self, bars):
+        """Volumen medio de las últimas barras ignorando NaN"""
+        return self._memo(('volume_mean', bars), lambda: self._nanmean(self.volume[-bars:]))
+
+    def volume_std(self, bars):
+        """Desviación típica muestral del volumen de las últimas barras ignorando NaN"""
+        return self._memo(('volume_std', bars), lambda: self._nanstd(self.volume[-bars:]))
+
+    def high_max(self, bars):
+        """Máximo de los últimos highs ignorando NaN"""
+        return self._memo(('high_max', bars), lambda: self._tail_extreme(self.high, bars, True))
+
+    def low_min(self, bars):
+        """Mínimo de los últimos lows ignorando NaN"""
+        return self._memo(('low_min', bars), lambda: self._tail_extreme(self.low, bars, False))
+
+    def swing_lows(self, lookback=40):
+        """Mínimos locales (low menor que sus dos vecinos) de las últimas barras, en orden cronológico"""
+        return self._memo(('swing_lows', lookback), lambda: self._local_extrema(self.low, lookback, False))
+
+    def swing_highs(self, lookback=40):
+        """Máximos locales (high mayor que sus dos vecinos) de las últimas barras, en orden cronológico"""
+        return self._memo(('swing_highs', lookback), lambda: self._local_extrema(self.high, lookback, True))
+
+    def volume_consistency(self, bars=20):
+        """1 - coeficiente de variación del volumen de las últimas barras"""
+        return self._memo(('volume_consistency', bars), lambda: 1 - (self.volume_std(bars) / self.volume_mean(bars)))
+
+    def gaps(self, bars=10):
+        """Gaps (%) |apertura - cierre previo| de las últimas barras, de la más reciente hacia atrás"""
+        return self._memo(('gaps', bars), lambda: self._compute_gaps(bars))
+
+    def gap_mean(self, bars=10):
+        """Gap medio (%) apertura vs cierre previo en las últimas barras (0 si no hay ninguno)"""
+        return self._memo(('gap_mean', bars), lambda: np.mean(self.gaps(bars)) if len(self.gaps(bars)) else 0)
+
+    def _memo(self, key, compute):
+        """Calcula cada indicador una sola vez por símbolo"""
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def _compute_atr(self, period):
+        if self.length < period + 1 or not {'High', 'Low', 'Close'} <= self.columns:
+            return None
+
+        # El true range es NaN donde falta cualquier componente: una columna vacía deja el ATR en NaN
+        true_range = kernels.true_range(self.high[None, :], self.low[None, :], self.close[None, :])[0]
+        atr = self._window_mean(true_range, period)
+
+        if np.isnan(atr) or atr <= 0:
+            return None
+        return atr
+
+    def _compute_rsi(self, period):
+        if self.length < period:
+            return np.nan
+
+        # Como delta.where(delta > 0, 0): el NaN inicial (o cualquier NaN) cuenta como 0
+        delta = np.diff(self.close[-period - 1:]) if self.length > period else np.diff(self.close, prepend=np.nan)
+        gain = np.where(delta > 0, delta, 0.0).mean()
+        loss = -np.where(delta < 0, delta, 0.0).mean()
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = np.float64(gain) / np.float64(loss)
+            return 100 - (100 / (1 + rs))
+
+    def _compute_returns(self):
+        close = self.close
+        if self.length == 0:
+            return close
+
+        # Forward fill como pct_change(fill_method='pad'); los NaN iniciales se mantienen
+        last_valid = np.maximum.accumulate(np.where(np.isnan(close), 0, np.arange(self.length)))
+        filled = close[last_valid]
+
+        returns = np.empty(self.length)
+        returns[0] = np.nan
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns[1:] = filled[1:] / filled[:-1] - 1
+        return returns
+
+    def _compute_gaps(self, bars):
+        bars = min(bars, self.length - 1)
+        if bars <= 0:
+            return np.empty(0)
+
+        # Mismo orden que el bucle original (de la última barra hacia atrás)
+        opens = self.open[-bars:][::-1]
+        prev_closes = self.close[-bars - 1:-1][::-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.abs((opens - prev_closes) / prev_closes) * 100
+
+    def _local_extrema(self, values, lookback, find_max):
+        """Barras i en [max(2, n - lookback), n - 3] con values[i] estrictamente más extremo que i-1 e i+1"""
+        mask = kernels.swing_mask(values[None, :], lookback, np.zeros(1, dtype=np.int64), find_max)[0]
+        return values[mask]
+
+    @staticmethod
+    def _tail_extreme(values, bars, find_max):
+        """max/min de las últimas barras ignorando NaN (NaN si no hay datos)"""
+        return kernels.tail_extreme(values[None, :], bars, find_max)[0]
+
+    @staticmethod
+    def _window_mean(values, period):
+        """Última ventana de rolling(period).mean(): NaN si faltan barras o hay algún NaN"""
+        if len(values) < period:
+            return np.nan
+        return values[-period:].mean()
+
+    @staticmethod
+    def _nanmean(values):
+        """Media ignorando NaN como Series.mean() (NaN si no hay datos)"""
+        mask = np.isnan(values)
+        count = len(values) - mask.sum()
+        if count == 0:
+            return np.nan
+        return np.where(mask, 0.0, values).sum() / count
+
+    @staticmethod
+    def _nanstd(values):
+        """Desviación típica con ddof=1 ignorando NaN como Series.std()"""
+        mask = np.isnan(values)
+        count = len(values) - mask.sum()
+        if count < 2:
+            return np.nan
+        mean = np.where(mask, 0.0, values).sum() / count
+        squares = np.where(mask, 0.0, (values - mean) ** 2)
+        return np.sqrt(squares.sum() / (count - 1))
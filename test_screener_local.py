@@ -2,11 +2,36 @@
 import yfinance as yf
 import pandas as pd
 import numpy as np
+import os
 import time
+import glob
+import json
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
 from datetime import datetime
 
 # IMPORTAR CLASES CON NOMBRES ACTUALIZADOS
-from speculative_screener_automated import OptimizedSpeculativeSwingScreener, DynamicUniverseBuilder
+from speculative_screener_automated import OptimizedSpeculativeSwingScreener, DynamicUniverseBuilder, BatchPriceDownloader, profit_optimized_sort_key, main
+from speculative_screener_automated import shard_universe, merge_shard_results
+from retry_queue import DeferredRetryQueue
+from rate_limiter import AdaptiveRateLimiter, is_rate_limit_error
+from symbol_features import SymbolFeatures
+from panel_engine import PricePanel
+import kernels
+from benchmark_screener import make_synthetic_frames
+from scoring import ScoringProfile
+from result_records import CandidateRecord, CANDIDATE_FIELDS, write_candidates_csv, rejection
+from filter_cascade import CascadeFilter, FilterCascade, LazyContext
+from run_journal import json_default
+from run_manifest import RunManifest
+from dashboard_assets import publish_dashboard
+from run_archive import RunArchive
+from candidate_log import CandidateLog
+from metadata_cache import MetadataCache
+from price_store import PriceStore
+from backtest import FeatureHistory, screen, simulate_exits, run_backtest
+from sweep import grid_configurations, evaluate, run_sweep, rank_results
 
 def test_with_sample_stocks():
     """Test del screener optimizado con acciones de muestra"""
@@ -244,6 +269,1036 @@ def test_universe_builder():
     except Exception as e:
         print(f"❌ Error en test de universe builder: {e}")
 
+def _loop_swing_points(df):
+    """Referencia: bucle original de _detect_support_level / _detect_resistance_level"""
+    swing_lows, swing_highs = [], []
+    for i in range(max(0, len(df) - 40), len(df) - 2):
+        if i >= 2 and i < len(df) - 2:
+            if df['Low'].iloc[i] < df['Low'].iloc[i-1] and df['Low'].iloc[i] < df['Low'].iloc[i+1]:
+                swing_lows.append(df['Low'].iloc[i])
+            if df['High'].iloc[i] > df['High'].iloc[i-1] and df['High'].iloc[i] > df['High'].iloc[i+1]:
+                swing_highs.append(df['High'].iloc[i])
+    return swing_lows, swing_highs
+
+def _synthetic_test_frames():
+    """Históricos sintéticos (sin red) con huecos NaN, mesetas y longitudes cortas"""
+    frames = make_synthetic_frames(symbols=120, bars=126, seed=7)
+    for k, (symbol, df) in enumerate(frames.items()):
+        if k % 4 == 1:
+            df.iloc[-25::6, [1, 2]] = np.nan
+        elif k % 4 == 2:
+            df.iloc[-12:, 1:3] = 20.0
+        elif k % 4 == 3:
+            frames[symbol] = df.tail([3, 4, 5, 30, 41, 43][k % 6])
+    return frames
+
+def test_swing_detection_equivalence():
+    """Swing highs/lows vectorizados (por símbolo y en lote) == bucle original"""
+    
+    print("\n=== TEST EQUIVALENCIA SWING HIGHS/LOWS ===")
+    
+    frames = _synthetic_test_frames()
+    panel = PricePanel.from_frames(frames)
+    support = panel.swing_low_max()
+    resistance = panel.swing_high_min_above(panel.current_price * 1.02)
+    
+    mismatches = []
+    for row, (symbol, df) in enumerate(frames.items()):
+        loop_lows, loop_highs = _loop_swing_points(df)
+        features = SymbolFeatures.from_frame(df)
+        batched = panel.features(symbol)
+        
+        same_points = (list(features.swing_lows()) == loop_lows and list(features.swing_highs()) == loop_highs and
+                       list(batched.swing_lows()) == loop_lows and list(batched.swing_highs()) == loop_highs)
+        
+        current_price = df['Close'].iloc[-1]
+        valid_highs = [h for h in loop_highs if h > current_price * 1.02]
+        expected_support = max(loop_lows) if loop_lows else np.nan
+        expected_resistance = min(valid_highs) if valid_highs else np.nan
+        same_levels = (np.array_equal([support[row], resistance[row]], [expected_support, expected_resistance], equal_nan=True))
+        
+        if not (same_points and same_levels):
+            mismatches.append(symbol)
+    
+    print(f"🔍 {len(frames)} símbolos: {len(frames) - len(mismatches)} idénticos, {len(mismatches)} diferencias {mismatches[:5]}")
+    assert not mismatches
+
+def _loop_quality_score(df):
+    """Referencia: _calculate_quality_score original (pandas + bucle de gaps con iloc)"""
+    volume_consistency = 1 - (df['Volume'].tail(20).std() / df['Volume'].tail(20).mean())
+    volume_score = min(volume_consistency * 15, 15)
+    
+    price_gaps = []
+    for i in range(1, min(11, len(df))):
+        prev_close = df['Close'].iloc[-i-1]
+        curr_open = df['Open'].iloc[-i]
+        price_gaps.append(abs((curr_open - prev_close) / prev_close) * 100)
+    
+    avg_gap = np.mean(price_gaps) if price_gaps else 0
+    gap_score = max(15 - avg_gap, 0)
+    return round(volume_score + gap_score, 1)
+
+def test_quality_score_equivalence():
+    """Quality score y gaps vectorizados (por símbolo y en lote) == versión pandas con bucle"""
+    
+    print("\n=== TEST EQUIVALENCIA QUALITY SCORE ===")
+    
+    frames = _synthetic_test_frames()
+    screener = OptimizedSpeculativeSwingScreener()
+    panel = PricePanel.from_frames(frames)
+    batched = panel.quality_score()
+    
+    mismatches = []
+    for row, (symbol, df) in enumerate(frames.items()):
+        expected = _loop_quality_score(df)
+        per_symbol = screener._calculate_quality_score(df)
+        if not np.array_equal([per_symbol, batched[row]], [expected, expected], equal_nan=True):
+            mismatches.append(symbol)
+    
+    print(f"🔍 {len(frames)} símbolos: {len(frames) - len(mismatches)} idénticos, {len(mismatches)} diferencias {mismatches[:5]}")
+    assert not mismatches
+
+def _chain_scores(rsi, price_vs_ma21, ma21_vs_ma50, distance, take_profit, rr, acceleration, proximity, volume_ratio, relative_strength):
+    """Scores con las cadenas if/elif originales (referencia para las tablas)"""
+    momentum = (30 if 45 <= rsi <= 65 else 20 if 40 <= rsi <= 70 else 5) + \
+               (25 if -5 <= price_vs_ma21 <= 3 else 15 if 0 <= price_vs_ma21 <= 8 else 5) + \
+               (25 if ma21_vs_ma50 > 2 else 15 if ma21_vs_ma50 > 0 else 0)
+    proximity_score = 100 if distance <= 2 else 80 if distance <= 5 else 60 if distance <= 8 else 40 if distance <= 12 else 20
+    tp_score = 100 if take_profit >= 20 else 85 if take_profit >= 15 else 70 if take_profit >= 12 else 55 if take_profit >= 10 else 30
+    rr_score = 100 if rr >= 3.0 else 85 if rr >= 2.5 else 70 if rr >= 2.0 else 50 if rr >= 1.5 else 20
+    speed = min(acceleration * 0.4 + proximity * 0.3 + volume_ratio * 15 + (100 if rsi > 60 else 50) * 0.15, 100)
+    profit = round(tp_score * 0.40 + rr_score * 0.30 + speed * 0.30, 1)
+    if not relative_strength:
+        rs_score = 50
+    else:
+        rs_score = 100 if relative_strength > 10 else 85 if relative_strength > 5 else 70 if relative_strength > 2 else \
+                   55 if relative_strength > 0 else 40 if relative_strength > -2 else 0
+    return momentum, proximity_score, profit, rs_score
+
+def test_scoring_tables_equivalence():
+    """Tablas de scoring (searchsorted/select, en lote) == cadenas if/elif por símbolo, incluidos los umbrales exactos"""
+    
+    print("\n=== TEST EQUIVALENCIA TABLAS DE SCORING ===")
+    
+    rng = np.random.default_rng(5)
+    size = 5000
+    # Mitad aleatorio continuo, mitad valores redondeados que caen justo en los umbrales
+    def column(low, high, decimals):
+        values = rng.uniform(low, high, size)
+        values[::2] = np.round(values[::2], decimals)
+        values[::97] = np.nan
+        return values
+    
+    columns = {
+        'rsi': column(20, 90, 0), 'price_vs_ma21': column(-10, 12, 0), 'ma21_vs_ma50': column(-4, 5, 0),
+        'distance_to_high': column(0, 15, 0), 'take_profit_pct': column(5, 25, 0), 'risk_reward': column(1, 4, 1),
+        'acceleration': rng.choice([30, 60, 80, 100], size), 'proximity': rng.choice([20, 40, 60, 80, 100], size),
+        'volume_ratio': np.round(column(0.5, 3, 2), 2), 'relative_strength': column(-5, 15, 0)
+    }
+    columns['volume_ratio'][np.isnan(columns['volume_ratio'])] = 1
+    
+    profile = ScoringProfile()
+    momentum = profile.momentum_score(columns['rsi'], columns['price_vs_ma21'], columns['ma21_vs_ma50'])
+    proximity = profile.proximity_score(columns['distance_to_high'])
+    profit = profile.profit_potential_score(columns['take_profit_pct'], columns['risk_reward'], columns['acceleration'],
+                                            columns['proximity'], columns['volume_ratio'], columns['rsi'])
+    relative_strength = profile.relative_strength_score(columns['relative_strength'])
+    
+    mismatches = []
+    for row in range(size):
+        values = [columns[key][row] for key in ('rsi', 'price_vs_ma21', 'ma21_vs_ma50', 'distance_to_high', 'take_profit_pct',
+                                                'risk_reward', 'acceleration', 'proximity', 'volume_ratio', 'relative_strength')]
+        if np.isnan(values[-1]):
+            values[-1] = None
+        expected = _chain_scores(*values)
+        if not np.array_equal(expected, (momentum[row], proximity[row], profit[row], relative_strength[row]), equal_nan=True):
+            mismatches.append(row)
+    
+    print(f"🔍 {size} candidatos: {size - len(mismatches)} idénticos, {len(mismatches)} diferencias {mismatches[:5]}")
+    assert not mismatches
+    
+    # Un perfil alternativo solo cambia lo indicado
+    aggressive = ScoringProfile({'weights': {'profit_potential': 0.5}, 'tables': {'volume_ratio': {'thresholds': [2.0, 1.5]}}})
+    assert aggressive.weights['momentum'] == profile.weights['momentum']
+    assert aggressive.volume_score([1.6, 2.5]).tolist() == [20, 30]
+
+def test_filter_cascade_order_invariance():
+    """Cualquier orden válido de la cascada da el mismo pasa/no pasa y el mismo análisis; el ajuste respeta `requires`"""
+    
+    print("\n=== TEST CASCADA DE FILTROS ===")
+    
+    frames = _synthetic_test_frames()
+    canonical = OptimizedSpeculativeSwingScreener(adaptive_filters=False)
+    reordered = OptimizedSpeculativeSwingScreener(adaptive_filters=False)
+    for screener in (canonical, reordered):
+        screener.spy_return_5d = 0.5
+    reordered.price_filters.order = ['volume', 'mas', 'trend', 'atr', 'price', 'atr_pct', 'ohlcv', 'history']
+    reordered.price_action_filters.order = ['volume_score', 'risk_reward', 'relative_strength', 'stop_loss']
+    
+    mismatches = []
+    for symbol, df in frames.items():
+        outcomes = []
+        for screener in (canonical, reordered):
+            features = SymbolFeatures.from_frame(df)
+            passes = screener._passes_price_basics(features)
+            analysis, rejection = screener._analyze_price_action(features) if passes else (None, None)
+            outcomes.append((passes, analysis, rejection is None))
+        if outcomes[0] != outcomes[1]:
+            mismatches.append(symbol)
+    
+    # Con mediciones, el filtro barato y selectivo pasa delante, pero nunca antes de sus dependencias
+    cascade = OptimizedSpeculativeSwingScreener().price_filters
+    for name, stats in cascade.stats.items():
+        stats.update(calls=100, passed=100, timed=99, seconds=99e-6)
+    cascade.stats['atr_pct'].update(passed=10, seconds=1e-6)
+    cascade.stats['trend'].update(passed=50, seconds=2e-6)
+    cascade.retune()
+    order = cascade.order
+    
+    print(f"🔍 {len(frames)} símbolos: {len(mismatches)} diferencias entre órdenes | orden ajustado: {' → '.join(order)}")
+    assert not mismatches
+    assert order.index('atr_pct') > max(order.index('price'), order.index('atr'))
+    assert order[:3] == ['price', 'atr', 'atr_pct'] and order.index('trend') == order.index('mas') + 1
+
+def test_filter_cascade_shared_context_cost():
+    """El coste de un valor compartido del contexto se reparte entre sus filtros: con carga fija el orden aprendido no cambia"""
+    
+    print("\n=== TEST COSTE COMPARTIDO DE LA CASCADA ===")
+    
+    clock = [0.0]
+    def spend(seconds, result=True):
+        clock[0] += seconds
+        return result
+    
+    # 'stop' y 'ratio' leen el mismo valor caro (100µs); 'strength' tiene coste propio de 20µs
+    cascade = FilterCascade('shared', [
+        CascadeFilter('stop', lambda context: spend(1e-6, context['levels'] % 5 != 0), 'stop', uses=('levels',)),
+        CascadeFilter('ratio', lambda context: spend(1e-6, context['levels'] % 10 not in (1, 2, 3)), 'ratio', uses=('levels',)),
+        CascadeFilter('strength', lambda context: spend(20e-6, context['levels'] % 4 != 3), 'strength')
+    ])
+    
+    orders = []
+    with mock.patch('filter_cascade.time', SimpleNamespace(thread_time=lambda: clock[0])):
+        for _ in range(6):
+            for position in range(200):
+                cascade.first_rejection(LazyContext(levels=lambda position=position: spend(100e-6, position)))
+            cascade.retune()
+            orders.append(list(cascade.order))
+    
+    own_cost = {name: stats['seconds'] / stats['timed'] for name, stats in cascade.stats.items()}
+    context = cascade.context_stats['levels']
+    print(f"🔍 Órdenes por ronda: {[' → '.join(order) for order in orders]} | {cascade.summary()}")
+    assert all(order == orders[0] for order in orders) and cascade.reorders == 1
+    assert orders[0] == ['strength', 'ratio', 'stop']
+    assert abs(own_cost['stop'] - 1e-6) < 1e-9 and abs(own_cost['ratio'] - 1e-6) < 1e-9
+    assert abs(context['seconds'] / context['timed'] - 100e-6) < 1e-9
+
+def _synthetic_results():
+    """Resultados completos (candidatos y rechazos) del screener sobre históricos sintéticos"""
+    screener = OptimizedSpeculativeSwingScreener()
+    screener.spy_return_5d = -5.0
+    ticker_info = {'marketCap': 2_000_000_000, 'sector': 'Technology', 'longName': 'Synthetic Corp', 'beta': 1.5}
+    return [screener._complete_analysis_optimized_for_quick_gains(df, ticker_info, symbol)
+            for symbol, df in make_synthetic_frames(symbols=200, bars=126, seed=7).items()]
+
+def _run_main_offline(workdir, universe, analyze, argv=()):
+    """main() sin red en `workdir`: universo y análisis falsos, esperas de la cola de reintentos simuladas -> cola usada"""
+    clock = [0.0]
+    def sleep(seconds):
+        clock[0] += seconds
+    
+    queues = []
+    def make_queue(*args, **kwargs):
+        queues.append(DeferredRetryQueue(*args, **kwargs))
+        return queues[-1]
+    
+    cwd = os.getcwd()
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    try:
+        with mock.patch.object(DynamicUniverseBuilder, 'get_all_tradeable_stocks', lambda self: [dict(stock) for stock in universe]), \
+             mock.patch.object(OptimizedSpeculativeSwingScreener, 'calculate_spy_return_5d', lambda self: 0.5), \
+             mock.patch.object(OptimizedSpeculativeSwingScreener, 'analyze_stock_optimized',
+                               lambda self, symbol, hist=None, features=None: analyze(symbol)), \
+             mock.patch.object(BatchPriceDownloader, 'download', lambda self, symbols, start=None: {}), \
+             mock.patch('speculative_screener_automated.DeferredRetryQueue', make_queue), \
+             mock.patch('speculative_screener_automated.time', SimpleNamespace(sleep=sleep)), \
+             mock.patch('retry_queue.time', SimpleNamespace(monotonic=lambda: clock[0])):
+            main(['--no-price-store', '--workers', '1', *argv])
+    finally:
+        os.chdir(cwd)
+    return queues[0]
+
+def _synthetic_universe(symbols):
+    """Universo con `symbols` que pasa STAGE 1"""
+    return [{'symbol': symbol, 'price': 20.0, 'market_cap': 2_000_000_000, 'sector': 'Technology'} for symbol in symbols]
+
+def test_deferred_retry_queue():
+    """Cola de reintentos: tope de intentos, estadísticas y candidatos recuperados en su posición del universo"""
+    
+    print("\n=== TEST COLA DE REINTENTOS ===")
+    
+    # Unidad: backoff creciente con el reloj simulado y símbolo perdido al superar max_attempts
+    clock = [0.0]
+    with mock.patch('retry_queue.time', SimpleNamespace(monotonic=lambda: clock[0])):
+        queue = DeferredRetryQueue(max_attempts=4, base_delay=5.0, jitter=0.0)
+        delays = []
+        for _ in range(4):
+            assert queue.push('AAA', 'payload')
+            delays.append(queue.seconds_until_next())
+            assert queue.pop_ready() == []
+            clock[0] += delays[-1]
+            assert queue.pop_ready() == [('AAA', 'payload')]
+        assert not queue.push('AAA') and not len(queue)
+    assert delays == [5.0, 10.0, 20.0, 40.0] and queue.stats == {'deferred': 1, 'recovered': 0, 'lost': 1}
+    
+    # main(): analizador falso que falla N veces por símbolo antes de responder
+    symbols = list(make_synthetic_frames(symbols=200, bars=126, seed=7))
+    by_symbol = dict(zip(symbols, _synthetic_results()))
+    passing = [symbol for symbol in symbols if by_symbol[symbol]['passes_all_filters']]
+    rejected = [symbol for symbol in symbols if not by_symbol[symbol]['passes_all_filters']]
+    failures = {passing[0]: 2, passing[2]: 4, passing[5]: 99, rejected[0]: 1}
+    calls = {}
+    def analyze(symbol):
+        calls[symbol] = calls.get(symbol, 0) + 1
+        if calls[symbol] <= failures.get(symbol, 0):
+            return rejection('Rate limit', retryable=True)
+        return by_symbol[symbol]
+    
+    workdir = tempfile.mkdtemp()
+    captured = []
+    with mock.patch('speculative_screener_automated.save_screening_results',
+                    lambda candidates, *args: captured.extend(candidates)):
+        queue = _run_main_offline(workdir, _synthetic_universe(symbols), analyze)
+    final = [candidate['symbol'] for candidate in captured]
+    
+    print(f"🔍 Llamadas por símbolo con fallos: {[calls[symbol] for symbol in failures]} | stats: {queue.stats} | {len(final)} candidatos")
+    assert [calls[symbol] for symbol in failures] == [3, 5, 5, 2]
+    assert queue.stats == {'deferred': 4, 'recovered': 3, 'lost': 1} and not len(queue)
+    assert final == [symbol for symbol in passing if symbol != passing[5]]
+    assert all(calls[symbol] == 1 for symbol in symbols if symbol not in failures)
+
+def test_shard_merge_equivalence():
+    """3 shards + --merge: partición exacta del universo, contadores sumados, parciales de otra ejecución excluidos y mismos CSVs que sin shards"""
+    
+    print("\n=== TEST SHARDS + MERGE ===")
+    
+    symbols = list(make_synthetic_frames(symbols=200, bars=126, seed=7))
+    by_symbol = dict(zip(symbols, _synthetic_results()))
+    universe = _synthetic_universe(symbols)
+    for stock in universe[::9]:
+        stock['price'] = 500.0  # no pasa STAGE 1
+    def analyze(symbol):
+        if symbol in symbols[5::40]:  # 5 símbolos; uno de ellos ya cae en STAGE 1
+            raise ValueError("respuesta corrupta")
+        return by_symbol[symbol]
+    
+    shards = [shard_universe(universe, index, 3) for index in range(3)]
+    sharded_symbols = [stock['symbol'] for shard in shards for stock in shard]
+    assert sorted(sharded_symbols) == sorted(symbols) and len(set(sharded_symbols)) == len(symbols)
+    
+    single_dir, shard_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+    _run_main_offline(single_dir, universe, analyze)
+    for index in range(3):
+        _run_main_offline(shard_dir, universe, analyze, ['--shard', f'{index}/3'])
+    
+    cwd = os.getcwd()
+    os.chdir(shard_dir)
+    try:
+        paths = sorted(glob.glob('speculative_shard_*of3_*.json'))
+        partials = []
+        for path in paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                partials.append(json.load(f))
+        
+        # Parciales de otra ejecución (otro universo / SPY de ayer), más recientes por nombre: se excluyen
+        stale_paths = []
+        for index, run_id, spy_return in ((1, 'otro-universo', partials[1]['spy_return_5d']), (2, partials[2]['run_id'], 1.25)):
+            stale_paths.append(f'speculative_shard_{index}of3_29991231_00000{index}.json')
+            with open(stale_paths[-1], 'w', encoding='utf-8') as f:
+                json.dump(dict(partials[index], run_id=run_id, spy_return_5d=spy_return, candidates=[], positions=[]), f)
+        merged = merge_shard_results()
+        
+        # Sin el shard 2 de hoy, el de ayer no lo sustituye: el merge solo cubre los shards 0 y 1
+        os.chdir(tempfile.mkdtemp())
+        partial_merge = merge_shard_results([os.path.join(shard_dir, path) for path in paths[:2] + stale_paths[1:]])
+    finally:
+        os.chdir(cwd)
+    
+    with open(os.path.join(single_dir, 'data', 'run_journal.json'), 'r', encoding='utf-8') as f:
+        single_counters = json.load(f)['counters']
+    summed = {key: sum(partial['counters'][key] for partial in partials) for key in single_counters}
+    for partial, shard in zip(partials, shards):
+        shard_symbols = {stock['symbol'] for stock in shard}
+        assert {candidate['symbol'] for candidate in partial['candidates']} <= shard_symbols
+    
+    def read_csv(directory, prefix):
+        paths = glob.glob(os.path.join(directory, f'{prefix}_*.csv'))
+        assert len(paths) == 1
+        with open(paths[0], 'rb') as f:
+            return f.read()
+    
+    print(f"🔍 Shards: {[len(shard) for shard in shards]} símbolos | contadores {summed} vs {single_counters} | {len(merged)} candidatos")
+    assert summed == single_counters and single_counters['errors'] == 4
+    assert [partial['shard'] for partial in partials] == [[0, 3], [1, 3], [2, 3]]
+    assert len({partial['run_id'] for partial in partials}) == 1
+    assert [candidate['symbol'] for candidate in partial_merge] == \
+           [candidate['symbol'] for candidate in merged if candidate['symbol'] not in {stock['symbol'] for stock in shards[2]}]
+    for prefix in ('speculative_screening_results', 'speculative_top10'):
+        assert read_csv(single_dir, prefix) == read_csv(shard_dir, prefix)
+
+def test_adaptive_rate_limiter():
+    """Limitador AIMD con reloj inyectado: mitad ante 429, cooldown creciente, subida aditiva, deuda por lotes y qué cuenta como 429"""
+    
+    print("\n=== TEST LIMITADOR ADAPTATIVO ===")
+    
+    clock = [0.0]
+    limiter = AdaptiveRateLimiter(rate=8.0, burst=10, concurrency=8, max_concurrency=8,
+                                  success_window=20, base_cooldown=2.0, max_cooldown=60.0, clock=lambda: clock[0])
+    
+    def call(throttled=False, latency=0.1, cost=1):
+        ticket = limiter.acquire(cost)
+        ticket.throttled = throttled
+        clock[0] += latency
+        limiter.release(ticket, None if throttled else latency)
+    
+    # 429: ritmo y concurrencia a la mitad, bucket vacío y cooldown base; los seguidos doblan el cooldown
+    call(throttled=True)
+    assert (limiter.rate, limiter.concurrency) == (4.0, 4)
+    cooldowns = [round(limiter._cooldown_until - clock[0], 6)]
+    for _ in range(6):
+        clock[0] = limiter._cooldown_until
+        call(throttled=True)
+        cooldowns.append(round(limiter._cooldown_until - clock[0], 6))
+    assert cooldowns == [2.0, 4.0, 8.0, 16.0, 32.0, 60.0, 60.0]
+    assert (limiter.rate, limiter.concurrency) == (0.5, 1) and limiter.stats['throttled'] == 7
+    clock[0] = limiter._cooldown_until - 0.01
+    assert not limiter.has_spare_capacity()
+    
+    # Additive increase: +0.5 req/s y +1 de concurrencia cada `success_window` éxitos rápidos
+    clock[0] = limiter._cooldown_until + 2.0
+    for _ in range(19):
+        clock[0] += 2.0
+        call()
+    assert (limiter.rate, limiter.concurrency) == (0.5, 1)
+    clock[0] += 2.0
+    call()
+    assert (limiter.rate, limiter.concurrency) == (1.0, 2)
+    
+    # Un éxito reinicia la racha de 429: el siguiente cooldown vuelve al base
+    clock[0] += 10.0
+    call(throttled=True)
+    assert round(limiter._cooldown_until - clock[0], 6) == 2.0 and limiter.rate == 0.5
+    
+    # Lote más caro que el burst: se concede con el bucket lleno y queda en deuda hasta recargar
+    limiter.rate = 5.0
+    clock[0] = limiter._cooldown_until + 10.0
+    assert limiter.has_spare_capacity()
+    ticket = limiter.acquire(25)
+    assert limiter._tokens == -15.0
+    limiter.release(ticket, None)
+    clock[0] += 15.0 / 5.0 + 0.1  # deuda pagada, pero aún sin un token entero
+    assert not limiter.has_spare_capacity()
+    clock[0] += 0.2
+    assert limiter.has_spare_capacity()
+    
+    # Solo 429 / "Too Many Requests" / YFRateLimitError cuentan como rate limit (no cualquier "rate" en el mensaje)
+    assert is_rate_limit_error(Exception("429 Client Error: Too Many Requests for url"))
+    assert is_rate_limit_error("YFRateLimitError('Too Many Requests. Rate limited. Try after a while.')")
+    assert not any(is_rate_limit_error(Exception(message)) for message in
+                   ("could not generate an accurate quote", "exchange rate unavailable", "SYM4290: No data found"))
+    throttled = limiter.stats['throttled']
+    try:
+        with limiter.request():
+            raise ValueError("could not generate an accurate quote")
+    except ValueError:
+        pass
+    assert limiter.stats['throttled'] == throttled
+    
+    print(f"🔍 Cooldowns: {cooldowns} | {limiter.summary()}")
+
+def test_batch_download_split():
+    """Frame combinado de yf.download(group_by='ticker'): vistas por símbolo sin filas vacías; ausentes y vacíos fuera"""
+    
+    print("\n=== TEST DESCARGA MULTI-TICKER ===")
+    
+    frames = make_synthetic_frames(symbols=4, bars=60, seed=11)
+    full, ragged, empty, partial = frames
+    source = {
+        full: frames[full],
+        ragged: frames[ragged].iloc[25:],  # cotiza desde hace poco: NaN al principio del índice combinado
+        empty: frames[empty] * np.nan,  # yfinance deja columnas NaN para los símbolos fallidos
+        partial: frames[partial].drop(columns=['Volume'])
+    }
+    combined = pd.concat(source, axis=1)
+    downloader = BatchPriceDownloader()
+    split = downloader._split_frame(combined, [full, ragged, empty, partial, 'MISSING'])
+    
+    print(f"🔍 Columnas combinadas: {combined.shape} | símbolos separados: {sorted(split)}")
+    assert list(split) == [full, ragged]
+    for symbol in split:
+        expected = source[symbol]
+        assert list(split[symbol].columns) == BatchPriceDownloader.OHLCV_COLUMNS
+        assert split[symbol].index.equals(expected.index)
+        np.testing.assert_array_equal(split[symbol].to_numpy(), expected.to_numpy())
+    
+    # Un solo ticker sin MultiIndex: el frame es del símbolo; con varios no se puede atribuir
+    single = downloader._split_frame(frames[full], [full])
+    assert list(single) == [full] and single[full].equals(frames[full])
+    assert downloader._split_frame(frames[full], [full, ragged]) == {}
+    assert downloader._split_frame(combined.iloc[:0], [full]) == {} and downloader._split_frame(None, [full]) == {}
+
+def test_panel_prescreen_equivalence():
+    """--panel: mismos rechazos y candidatos que el análisis por símbolo, también con NaN e históricos cortos"""
+    
+    print("\n=== TEST PANEL VS POR SÍMBOLO ===")
+    
+    frames = {}
+    for k, (symbol, df) in enumerate(make_synthetic_frames(symbols=180, bars=126, seed=7).items()):
+        mode = k % 6
+        if mode == 1:  # celdas NaN sueltas
+            df = df.mask(np.random.default_rng(k).random(df.shape) < 0.05)
+        elif mode == 2:  # última barra incompleta
+            df.iloc[-1, k % 5] = np.nan
+        elif mode == 3:  # históricos cortos alrededor del mínimo de 50 barras
+            df = df.tail([0, 20, 49, 50, 51, 60][k // 6 % 6])
+        elif mode == 4:  # volumen NaN en el tramo reciente
+            df.iloc[-15:, 4] = np.nan
+        elif mode == 5 and k % 4 == 1:  # sin una columna OHLCV
+            df = df.drop(columns=['Open'])
+        frames[symbol] = df
+    symbols = list(frames)
+    ticker_info = {'marketCap': 2_000_000_000, 'sector': 'Technology', 'longName': 'Synthetic Corp', 'beta': 1.5}
+    
+    def outcome_key(outcome):
+        result, error = outcome
+        assert error is None
+        if result['passes_all_filters']:
+            return json.dumps(dict(result), default=json_default, sort_keys=True)
+        return result['filter_reasons']
+    
+    outcomes = {}
+    with mock.patch.object(OptimizedSpeculativeSwingScreener, '_get_ticker_info', lambda self, ticker, symbol: dict(ticker_info)):
+        for panel_mode in (False, True):
+            screener = OptimizedSpeculativeSwingScreener(max_workers=1, panel_mode=panel_mode, adaptive_filters=False)
+            screener.spy_return_5d = -5.0
+            outcomes[panel_mode] = [outcome_key(outcome) for outcome in
+                                    screener.analyze_stocks_concurrently(symbols, price_data=frames)]
+    
+    prescreened, _ = screener._prescreen_panel(symbols, frames)
+    mismatches = [symbol for symbol, single, panel in zip(symbols, outcomes[False], outcomes[True]) if single != panel]
+    passed = sum(isinstance(key, str) for key in outcomes[True])
+    print(f"🔍 {len(symbols)} símbolos: {len(prescreened)} descartados por el panel | {passed} candidatos | "
+          f"{len(mismatches)} diferencias panel vs por símbolo {mismatches[:5]}")
+    assert not mismatches and passed > 0 and prescreened
+    assert outcomes[True][3] == outcomes[False][3] == ['Datos insuficientes']  # histórico vacío
+
+def test_kernel_backend_parity():
+    """kernels: el backend numba devuelve exactamente lo mismo que NumPy con NaN e históricos desiguales (se salta sin numba)"""
+    
+    print("\n=== TEST KERNELS NUMBA VS NUMPY ===")
+    
+    if 'numba' not in kernels.available_backends():
+        print("ℹ️ numba no está instalado: paridad de kernels omitida")
+        return
+    
+    frames = {}
+    for k, (symbol, df) in enumerate(make_synthetic_frames(symbols=60, bars=126, seed=11).items()):
+        if k % 3 == 1:  # celdas NaN sueltas
+            df = df.mask(np.random.default_rng(k).random(df.shape) < 0.05)
+        elif k % 3 == 2:  # históricos desiguales, incluidos vacíos y más cortos que las ventanas
+            df = df.tail([0, 1, 3, 14, 15, 20, 40, 60][k // 3 % 8])
+        frames[symbol] = df
+    panel = PricePanel.from_frames(frames)
+    delta = np.diff(panel.close, axis=1, prepend=np.nan)
+    gains = np.where(delta > 0, delta, 0.0)
+    first_bar = panel.bars - panel.lengths
+    
+    calls = {
+        'true_range': lambda backend: backend.true_range(panel.high, panel.low, panel.close),
+        'wilder_average': lambda backend: backend.wilder_average(gains, first_bar + 14, 14),
+        'tail_extreme max': lambda backend: backend.tail_extreme(panel.high, 20, True),
+        'tail_extreme min': lambda backend: backend.tail_extreme(panel.low, 5, False),
+        'tail_extreme > barras': lambda backend: backend.tail_extreme(panel.close, panel.bars + 10, True),
+        'swing_mask min': lambda backend: backend.swing_mask(panel.low, 40, first_bar, False),
+        'swing_mask max': lambda backend: backend.swing_mask(panel.high, 40, first_bar, True),
+        'swing_mask corto': lambda backend: backend.swing_mask(panel.high[:, :4], 40, np.zeros(panel.high.shape[0], dtype=np.int64), True)
+    }
+    mismatches = [name for name, call in calls.items()
+                  if not np.array_equal(call(kernels.NumpyKernels), call(kernels.NumbaKernels), equal_nan=True)]
+    
+    # Extremo a extremo: mismo resultado del screener con cada backend activo
+    ticker_info = {'marketCap': 2_000_000_000, 'sector': 'Technology', 'longName': 'Synthetic Corp', 'beta': 1.5}
+    outcomes = {}
+    original = kernels.get_backend()
+    try:
+        with mock.patch.object(OptimizedSpeculativeSwingScreener, '_get_ticker_info', lambda self, ticker, symbol: dict(ticker_info)):
+            for name in ('numpy', 'numba'):
+                kernels.set_backend(name)
+                screener = OptimizedSpeculativeSwingScreener(max_workers=1, panel_mode=True, adaptive_filters=False)
+                screener.spy_return_5d = -5.0
+                outcomes[name] = [json.dumps(result if error is None else str(error), default=json_default, sort_keys=True)
+                                  for result, error in screener.analyze_stocks_concurrently(list(frames), price_data=frames)]
+    finally:
+        kernels.set_backend(original)
+    
+    differing = sum(a != b for a, b in zip(outcomes['numpy'], outcomes['numba']))
+    print(f"🔍 {len(calls)} llamadas de kernels: {'idénticas' if not mismatches else f'diferencias en {mismatches}'} | "
+          f"screener con panel: {differing} símbolos distintos entre backends")
+    assert not mismatches and differing == 0
+    assert len(outcomes['numpy']) == len(frames)
+
+def test_metadata_cache_ttl():
+    """Caché de ticker.info: TTL por campo, políticas never/force, respuestas vacías sin guardar y caducados como respaldo"""
+    
+    print("\n=== TEST CACHÉ DE METADATOS ===")
+    
+    day = 86400
+    clock = [1_000 * day]
+    responses = []
+    def fetcher():
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+    info = {'beta': 1.4, 'sector': 'Technology', 'marketCap': 2_000_000_000, 'longName': 'Alpha Corp', 'shortName': 'Alpha'}
+    path = os.path.join(tempfile.mkdtemp(), 'metadata_cache.json')
+    
+    with mock.patch('metadata_cache.time', SimpleNamespace(time=lambda: clock[0])):
+        cache = MetadataCache(path)
+        # Sin entrada y respuesta vacía: nada guardado, el llamador recibe {} como sin caché
+        responses.append({})
+        assert cache.get('AAA', fetcher) == {} and cache.stats['misses'] == 1
+        responses.append(dict(info))
+        assert cache.get('AAA', fetcher) == info
+        clock[0] += 6 * day
+        assert cache.get('AAA', fetcher) == info and cache.stats['hits'] == 1
+        
+        # marketCap caduca a los 7 días: nueva petición con todos los campos; beta ausente conserva el valor vigente
+        clock[0] += 2 * day
+        responses.append(dict(info, marketCap=2_500_000_000, beta=None))
+        assert cache.get('AAA', fetcher) == dict(info, marketCap=2_500_000_000)
+        
+        # Caducado + Yahoo vacío o caído: valores anteriores (beta incluido) y la entrada no se toca
+        clock[0] += 15 * day
+        responses.extend([{}, ConnectionError("timeout")])
+        assert cache.get('AAA', fetcher) == cache.get('AAA', fetcher) == dict(info, marketCap=2_500_000_000)
+        assert cache.stats['stale_fallbacks'] == 2 and not responses
+        responses.append(ConnectionError("timeout"))
+        try:
+            cache.get('BBB', fetcher)
+            raise AssertionError("sin entrada el fallo debe propagarse")
+        except ConnectionError:
+            pass
+        cache.save()
+        
+        # never: solo caché aunque esté caducada; force: siempre red
+        never = MetadataCache(path, refresh_policy='never')
+        assert never.get('AAA', fetcher) == dict(info, marketCap=2_500_000_000) and never.stats['hits'] == 1
+        force = MetadataCache(path, refresh_policy='force')
+        responses.append(dict(info, sector='Healthcare'))
+        assert force.get('AAA', fetcher)['sector'] == 'Healthcare' and force.stats['refreshes'] == 1 and not responses
+    
+    print(f"🔍 Stats: {cache.stats} | never {never.stats} | force {force.stats}")
+    assert cache.stats == {'hits': 1, 'refreshes': 2, 'stale_fallbacks': 2, 'misses': 1}
+
+def test_resume_after_cancel():
+    """--resume tras cortar la ejecución en el lote 2: mismos contadores y CSVs que una ejecución sin cortes"""
+    
+    print("\n=== TEST CHECKPOINT + RESUME ===")
+    
+    class Cancelled(BaseException):
+        """Cancelación del job (no la captura el manejo de errores por símbolo)"""
+    
+    symbols = list(make_synthetic_frames(symbols=200, bars=126, seed=7))
+    by_symbol = dict(zip(symbols, _synthetic_results()))
+    passing = [symbol for symbol in symbols if by_symbol[symbol]['passes_all_filters']]
+    # Un candidato del lote 1 sigue en la cola de reintentos en el checkpoint; otro símbolo falla del todo
+    failures = {passing[0]: 3, passing[-1]: 1}
+    cut_at = symbols[150]
+    
+    def make_analyzer(calls, cancel=False):
+        """Analizador falso; `calls` acumula entre ejecuciones (el proveedor sigue fallando igual tras reanudar)"""
+        run_calls = []
+        def analyze(symbol):
+            run_calls.append(symbol)
+            calls[symbol] = calls.get(symbol, 0) + 1
+            if cancel and symbol == cut_at:
+                raise Cancelled()
+            if symbol == symbols[7]:
+                raise ValueError("respuesta corrupta")
+            if calls[symbol] <= failures.get(symbol, 0):
+                return rejection('Rate limit', retryable=True)
+            return by_symbol[symbol]
+        return analyze, run_calls
+    
+    universe = _synthetic_universe(symbols)
+    single_dir, resumed_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+    analyze, _ = make_analyzer({})
+    single_queue = _run_main_offline(single_dir, universe, analyze)
+    
+    calls = {}
+    analyze, _ = make_analyzer(calls, cancel=True)
+    try:
+        _run_main_offline(resumed_dir, universe, analyze)
+        raise AssertionError("la ejecución debía cortarse")
+    except Cancelled:
+        pass
+    with open(os.path.join(resumed_dir, 'data', 'run_journal.json'), 'r', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    
+    analyze, resume_calls = make_analyzer(calls)
+    resumed_queue = _run_main_offline(resumed_dir, universe, analyze, ['--resume'])
+    
+    def read_run(directory):
+        with open(os.path.join(directory, 'data', 'run_journal.json'), 'r', encoding='utf-8') as f:
+            journal = json.load(f)
+        csvs = {}
+        for prefix in ('speculative_screening_results', 'speculative_top10'):
+            paths = glob.glob(os.path.join(directory, f'{prefix}_*.csv'))
+            assert len(paths) == 1
+            with open(paths[0], 'rb') as f:
+                csvs[prefix] = f.read()
+        return journal, csvs
+    
+    single_journal, single_csvs = read_run(single_dir)
+    resumed_journal, resumed_csvs = read_run(resumed_dir)
+    reanalyzed = sorted({symbol for symbol in resume_calls if symbols.index(symbol) < 100})
+    
+    print(f"🔍 Corte tras {checkpoint['completed_batches']} lote(s), {len(checkpoint['retry_queue']['pending'])} reintento(s) pendiente(s) | "
+          f"contadores {resumed_journal['counters']} vs {single_journal['counters']} | lote 1 reanalizado: {reanalyzed}")
+    assert checkpoint['completed_batches'] == 1 and [symbol for symbol, _ in checkpoint['retry_queue']['pending']] == [passing[0]]
+    assert reanalyzed == [passing[0]]
+    assert resumed_journal['counters'] == single_journal['counters'] and resumed_journal['completed']
+    assert resumed_queue.stats == single_queue.stats
+    assert resumed_csvs == single_csvs
+
+def test_result_records_csv():
+    """Registros compactos: CSV idéntico al de DataFrame.to_csv y rechazos compartidos por motivo"""
+    
+    print("\n=== TEST REGISTROS DE RESULTADOS ===")
+    
+    results = _synthetic_results()
+    candidates = [result for result in results if result['passes_all_filters']]
+    rejections = {}
+    for result in results:
+        if not result['passes_all_filters']:
+            rejections.setdefault(result['filter_reasons'][0], set()).add(id(result))
+    
+    path = tempfile.mktemp(suffix='.csv')
+    write_candidates_csv(path, candidates)
+    with open(path, 'r', encoding='utf-8') as f:
+        written = f.read()
+    expected = pd.DataFrame([candidate.to_dict() for candidate in candidates]).to_csv(index=False)
+    
+    print(f"🔍 {len(candidates)} candidatos | rechazos por motivo: {dict((reason, len(ids)) for reason, ids in rejections.items())}")
+    assert candidates and all(isinstance(candidate, CandidateRecord) for candidate in candidates)
+    assert list(candidates[0]) == list(CANDIDATE_FIELDS) and not hasattr(candidates[0], '__dict__')
+    assert written == expected
+    assert all(len(ids) == 1 for ids in rejections.values())
+
+def test_run_manifest_roundtrip():
+    """Columnas del manifiesto == candidatos originales, con el TOP en el orden del ranking"""
+    
+    print("\n=== TEST MANIFIESTO DE EJECUCIÓN ===")
+    
+    candidates = [result for result in _synthetic_results() if result['passes_all_filters']]
+    ranking = sorted(range(len(candidates)), key=lambda row: profit_optimized_sort_key(candidates[row]), reverse=True)
+    runs = RunManifest(tempfile.mkdtemp())
+    runs.write('20240102_010000', candidates[:3], [0, 1, 2])
+    runs.write('20240103_010000', candidates, ranking)
+    
+    manifest = runs.latest()
+    columns = runs.load_columns(manifest)
+    mismatches = []
+    for row, candidate in enumerate(candidates):
+        for field, values in columns.items():
+            expected = json.loads(candidate[field]) if field == 'entry_signals' else candidate[field]
+            stored = [signal for signal in values[row] if signal] if field == 'entry_signals' else values[row]
+            if stored != expected:
+                mismatches.append((candidate['symbol'], field))
+    top = [str(columns['symbol'][row]) for row in runs.load_ranking(manifest)[:10]]
+    expected_top = [candidate['symbol'] for candidate in sorted(candidates, key=profit_optimized_sort_key, reverse=True)[:10]]
+    
+    print(f"🔍 Última ejecución {manifest['run_id']}: {manifest['rows']} filas, {len(mismatches)} diferencias {mismatches[:5]}")
+    assert manifest['run_id'] == '20240103_010000' and manifest['rows'] == len(candidates)
+    assert not mismatches and top == expected_top
+    assert columns['total_score'].dtype == np.float64 and columns['momentum_score'].dtype == np.int64
+
+def test_dashboard_assets():
+    """Resumen + detalle == documento completo; sin variantes precomprimidas; se conserva solo la versión anterior"""
+    
+    print("\n=== TEST DOCUMENTOS DEL DASHBOARD ===")
+    
+    docs_dir = tempfile.mkdtemp()
+    picks = [{'rank': rank, 'symbol': f"S{rank:03d}", 'entry_signals': ['Breakout 🚀']} for rank in range(1, 11)]
+    data = {'timestamp': '2024-01-03T01:00:00', 'market_date': '2024-01-03', 'summary': {'top_picks_count': 10},
+            'screening_criteria': {'stop_loss_max': '-10%'}, 'top_picks': picks, 'statistics': {'avg_score': 120.5}}
+    oldest = publish_dashboard(dict(data, top_picks=picks[:3]), docs_dir)
+    previous = publish_dashboard(dict(data, top_picks=picks[:6]), docs_dir)
+    published = publish_dashboard(data, docs_dir)
+    
+    def read(filename, opener=open):
+        with opener(os.path.join(docs_dir, filename), 'rb') as f:
+            return json.loads(f.read().decode('utf-8'))
+    
+    entry = read('dashboard.json')
+    summary, details = read(entry['summary']), read(entry['picks'])
+    hashed = sorted(filename for filename in os.listdir(docs_dir) if filename.startswith(('summary.', 'picks.')))
+    
+    print(f"🔍 {entry['summary']} ({published['sizes'][entry['summary']]}) + {entry['picks']} ({published['sizes'][entry['picks']]})")
+    assert {**summary, **details} == data == read('data.json') and 'top_picks' not in summary
+    assert not any(filename.endswith(('.gz', '.br')) for filename in os.listdir(docs_dir))
+    assert hashed == sorted({entry['summary'], entry['picks'], previous['picks']})
+    assert oldest['picks'] not in hashed and read(previous['picks'])['top_picks'] == picks[:6]
+    assert publish_dashboard(data, docs_dir)['picks'] == entry['picks']
+
+def test_candidate_pages():
+    """Páginas de cada criterio: tamaño fijo y, concatenadas, el listado completo en orden descendente"""
+    
+    print("\n=== TEST PÁGINAS DE CANDIDATOS ===")
+    
+    candidates = pd.DataFrame([result.to_dict() for result in _synthetic_results() if result['passes_all_filters']])
+    docs_dir = tempfile.mkdtemp()
+    index = publish_dashboard({'timestamp': '2024-01-03T01:00:00'}, docs_dir, candidates=candidates, page_size=4)['candidates']
+    
+    mismatches = []
+    for key, sort in index['sorts'].items():
+        rows = []
+        for filename in sort['pages']:
+            with open(os.path.join(docs_dir, filename), 'r', encoding='utf-8') as f:
+                page = json.load(f)
+            assert page['offset'] == len(rows) and 0 < len(page['rows']) <= 4
+            rows += [dict(zip(page['columns'], row)) for row in page['rows']]
+        expected = sorted(candidates.to_dict('records'), key=lambda candidate: -candidate[key])
+        if [row['symbol'] for row in rows] != [candidate['symbol'] for candidate in expected]:
+            mismatches.append(key)
+    
+    print(f"🔍 {index['total']} candidatos x {len(index['sorts'])} criterios en páginas de {index['page_size']}: {len(mismatches)} diferencias {mismatches}")
+    assert index['total'] == len(candidates) and set(index['sorts']) == {'total_score', 'profit_potential_score', 'risk_reward_ratio_numeric', 'expected_gain_per_day'}
+    assert not mismatches
+
+def test_run_archive_queries():
+    """Histórico por fecha: historial y frecuencia en el TOP == recorrido directo de las ejecuciones archivadas"""
+    
+    print("\n=== TEST HISTÓRICO DE EJECUCIONES ===")
+    
+    candidates = [result for result in _synthetic_results() if result['passes_all_filters']]
+    archive = RunArchive(tempfile.mkdtemp())
+    rng = np.random.default_rng(3)
+    runs = {}
+    for day in range(1, 121, 3):
+        run_candidates = [candidates[i] for i in sorted(rng.choice(len(candidates), size=10, replace=False))]
+        ranking = rng.permutation(len(run_candidates)).tolist()
+        run_id = (datetime(2024, 1, 1) + pd.Timedelta(days=day)).strftime("%Y%m%d_010000")
+        archive.append(run_id, run_candidates, ranking)
+        runs[run_id[:8]] = {run_candidates[row]['symbol']: (position + 1, run_candidates[row]['total_score'])
+                            for position, row in enumerate(ranking)}
+    # Reejecución del último día: sustituye la partición en vez de duplicarla
+    archive.append(run_id, run_candidates, ranking)
+    
+    reopened = RunArchive(archive.root)
+    symbol = candidates[0]['symbol']
+    started = time.perf_counter()
+    history = reopened.history(symbol, days=90)
+    top_picks, candidate_runs, archived_runs = reopened.top_pick_count(symbol, top=5, days=90)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    
+    window_start = (datetime.strptime(run_id[:8], "%Y%m%d") - pd.Timedelta(days=89)).strftime("%Y%m%d")
+    window = [day for day in sorted(runs) if day >= window_start]
+    expected = [(f"{day[:4]}-{day[4:6]}-{day[6:]}", *runs[day][symbol]) for day in window if symbol in runs[day]]
+    
+    print(f"🔍 {symbol}: {len(history)} apariciones en 90 días, TOP 5 {top_picks}/{archived_runs} ({elapsed_ms:.1f} ms)")
+    assert [(entry['date'], entry['rank'], entry['total_score']) for entry in history] == expected
+    assert candidate_runs == len(expected) and top_picks == sum(rank <= 5 for _, rank, _ in expected)
+    assert archived_runs == len(window) and len(reopened.dates()) == len(runs)
+
+def test_candidate_log_resume():
+    """Log de candidatos: lo escrito tras el checkpoint se descarta al reabrir y una línea cortada se ignora"""
+    
+    print("\n=== TEST LOG DE CANDIDATOS ===")
+    
+    candidates = [result for result in _synthetic_results() if result['passes_all_filters']]
+    log = CandidateLog(os.path.join(tempfile.mkdtemp(), 'candidate_log.jsonl'))
+    log.open()
+    # Posiciones del universo en orden inverso: el orden final no depende del orden de llegada
+    for position, candidate in reversed(list(enumerate(candidates[:6]))):
+        log.append(candidate, position)
+    checkpoint = {'offset': log.offset, 'count': log.count}
+    for position, candidate in enumerate(candidates[6:9], 6):
+        log.append(candidate, position)
+    log.close()
+    with open(log.path, 'ab') as f:
+        f.write(b'{"position": 99, "candid')
+    
+    partial = log.candidates()
+    resumed = CandidateLog(log.path)
+    resumed.open(**checkpoint)
+    for position, candidate in enumerate(candidates[6:], 6):
+        resumed.append(candidate, position)
+    resumed.close()
+    final = resumed.candidates()
+    
+    print(f"🔍 Ejecución cortada: {len(partial)} candidatos legibles | reanudada: {len(final)} ({resumed.count} contados)")
+    assert [candidate['symbol'] for candidate in partial] == [candidate['symbol'] for candidate in candidates[:9]]
+    assert final == candidates and resumed.count == len(candidates)
+    assert all(isinstance(candidate, CandidateRecord) for candidate in final)
+
+def test_price_store_stale_fallback():
+    """Almacén de precios: una descarga incremental vacía o sin la última sesión no deja el histórico de ayer"""
+    
+    print("\n=== TEST ALMACÉN DE PRECIOS INCREMENTAL ===")
+    
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize() - pd.Timedelta(days=1), periods=100)
+    frames = {symbol: df.set_axis(index) for symbol, df in make_synthetic_frames(symbols=4, bars=100, seed=3).items()}
+    fresh, empty, stale, lost = frames
+    
+    class FakeDownloader:
+        def __init__(self):
+            self.calls = []
+        
+        def download(self, symbols, start=None):
+            self.calls.append((list(symbols), start))
+            if start is None:
+                # Descarga completa: el símbolo perdido tampoco llega aquí
+                return {symbol: frames[symbol] for symbol in symbols if symbol != lost}
+            since = frames[fresh].index >= start
+            return {fresh: frames[fresh][since], empty: frames[empty].iloc[:0],
+                    stale: frames[stale][since].iloc[:-3]}
+    
+    store = PriceStore(tempfile.mkdtemp())
+    for symbol, df in frames.items():
+        store.save(symbol, df.iloc[:-3])
+    downloader = FakeDownloader()
+    price_data = store.update(list(frames), downloader)
+    
+    print(f"🔍 Llamadas: {downloader.calls} | stats: {store.stats}")
+    assert sorted(downloader.calls[-1][0]) == sorted([empty, stale, lost]) and downloader.calls[-1][1] is None
+    assert lost not in price_data
+    for symbol in (fresh, empty, stale):
+        assert price_data[symbol].index[-1] == index[-1]
+        np.testing.assert_array_equal(price_data[symbol]['Close'].to_numpy(),
+                                      store._analysis_window(frames[symbol])['Close'].to_numpy())
+    assert store.stats == {'appended': 1, 'full_downloads': 2, 'adjusted': 0, 'trimmed': 0, 'evicted': 0}
+
+def test_price_store_retention():
+    """Almacén de precios: recorte a la ventana de retención y purga de símbolos no pedidos en N días"""
+    
+    print("\n=== TEST RETENCIÓN DEL ALMACÉN DE PRECIOS ===")
+    
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize() - pd.Timedelta(days=1), periods=400)
+    frames = {symbol: df.set_axis(index) for symbol, df in make_synthetic_frames(symbols=3, bars=400, seed=5).items()}
+    requested, idle, recent = frames
+    
+    class FakeDownloader:
+        def download(self, symbols, start=None):
+            return {symbol: frames[symbol][frames[symbol].index >= (start or index[0])] for symbol in symbols}
+    
+    store = PriceStore(tempfile.mkdtemp(), max_age_days=30)
+    for symbol, df in frames.items():
+        store.save(symbol, df)
+    retained = store.load(requested)
+    assert store.stats['trimmed'] == 3
+    assert retained.index[0] >= pd.Timestamp.today().normalize() - pd.DateOffset(months=7)
+    assert len(retained) < len(index) and retained.index[-1] == index[-1]
+    
+    # Los tres llevan 40 días sin tocarse; solo se pide uno y otro tiene uso reciente
+    old = time.time() - 40 * 86400
+    for symbol in (requested, idle):
+        os.utime(store.path(symbol), (old, old))
+    price_data = store.update([requested], FakeDownloader())
+    
+    remaining = sorted(name[:-4] for name in os.listdir(store.root))
+    print(f"🔍 {len(index)} barras -> {len(retained)} guardadas | en disco: {remaining} | stats: {store.stats}")
+    assert remaining == sorted([requested, recent]) and store.stats['evicted'] == 1
+    np.testing.assert_array_equal(price_data[requested]['Close'].to_numpy(),
+                                  store._analysis_window(frames[requested])['Close'].to_numpy())
+    
+    # max_age_days=0 desactiva la purga
+    store = PriceStore(store.root, max_age_days=0)
+    os.utime(store.path(recent), (old, old))
+    store.evict_unseen()
+    assert os.path.exists(store.path(recent)) and store.stats['evicted'] == 0
+
+def test_backtest_walk_forward_equivalence():
+    """Backtest: candidatos y scores de cada día idénticos al screener con el histórico hasta ese día"""
+    
+    print("\n=== TEST BACKTEST WALK-FORWARD ===")
+    
+    frames = make_synthetic_frames(60, 220, seed=11)
+    # Históricos que empiezan en fechas distintas
+    frames = {symbol: (df.iloc[(k * 7) % 90:] if k % 3 else df) for k, (symbol, df) in enumerate(frames.items())}
+    spy = make_synthetic_frames(1, 220, seed=1)['SYN0000']['Close']
+    history = FeatureHistory.from_frames(frames, spy=spy)
+    candidates = screen(history)
+    found = {(day, row): index for index, (day, row) in enumerate(zip(candidates['day'].tolist(), candidates['row'].tolist()))}
+    
+    screener = OptimizedSpeculativeSwingScreener(adaptive_filters=False)
+    compared = 0
+    for day in range(60, len(history.dates), 8):
+        spy_return = history.spy_return_5d[day]
+        screener.spy_return_5d = None if np.isnan(spy_return) else spy_return
+        for row, symbol in enumerate(history.symbols):
+            df = frames[symbol].loc[:history.dates[day]].iloc[-126:]
+            analysis = None
+            if len(df) and df.index[-1] == history.dates[day]:
+                features = SymbolFeatures.from_frame(df)
+                if screener._passes_price_basics(features) and 5 <= features.current_price <= 150:
+                    analysis, rejected = screener._analyze_price_action(features)
+            assert (analysis is not None) == ((day, row) in found), (history.dates[day], symbol)
+            if analysis is not None:
+                index = found[(day, row)]
+                assert round(analysis['base_score'], 1) == candidates['total_score'][index]
+                assert analysis['profit_potential_score'] == candidates['profit_potential_score'][index]
+                assert analysis['risk_reward_data']['stop_loss']['price'] == candidates['stop_loss_price'][index]
+                assert analysis['risk_reward_data']['take_profit']['price'] == candidates['take_profit_price'][index]
+                compared += 1
+    
+    trades, summary = run_backtest(history, top=10, max_hold=15)
+    print(f"🔍 {compared} candidatos comparados con el screener | {summary['trades']} operaciones: {summary['exits']}")
+    assert compared > 0 and summary['trades'] > 0
+    assert trades.groupby('date')['rank'].max().max() <= 10
+    closed = trades[trades['exit_reason'] != 'open']
+    assert (closed['holding_days'].between(1, 15)).all()
+    
+    # Salidas: si la barra toca stop y target cuenta el stop; una apertura por debajo del stop sale a la apertura
+    low, high, open_ = history['low'][0, 101], history['high'][0, 101], history['open'][0, 101]
+    exits = simulate_exits(history, np.array([0, 0]), np.array([100, 100]),
+                           np.array([low + 1e-6, open_ * 1.001]), np.array([high - 1e-6, open_ * 2]), max_hold=3)
+    assert exits['exit_reason'].tolist() == [0, 0] and exits['exit_day'].tolist() == [101, 101]
+    assert exits['exit_price'].tolist() == [low + 1e-6, open_] and exits['return_pct'][1] == 0
+
+def test_parameter_sweep():
+    """Barrido: features guardadas y compartidas por el pool dan lo mismo que el backtest en serie"""
+    
+    print("\n=== TEST BARRIDO DE PARÁMETROS ===")
+    
+    frames = make_synthetic_frames(40, 200, seed=5)
+    spy = make_synthetic_frames(1, 200, seed=1)['SYN0000']['Close']
+    history = FeatureHistory.from_frames(frames, spy=spy)
+    features_dir = os.path.join(tempfile.mkdtemp(), 'features')
+    history.save(features_dir)
+    loaded = FeatureHistory.load(features_dir)
+    assert loaded.symbols == history.symbols and loaded.dates.equals(history.dates)
+    assert all(np.array_equal(loaded[field], history[field], equal_nan=True) for field in history.columns)
+    
+    configurations = [{}] + grid_configurations({'weights.momentum': [0.1, 0.3], 'thresholds.min_risk_reward': [1.5, 2.5]})
+    options = {'top': 5, 'max_hold': 10, 'start': None, 'end': None}
+    results = run_sweep(features_dir, configurations, options, workers=2)
+    
+    print(f"🔍 {len(results)} configuraciones | actual: {results.iloc[0]['closed']} operaciones, "
+          f"retorno medio {results.iloc[0]['avg_return_pct']}%")
+    assert list(results.columns[:2]) == ['weights.momentum', 'thresholds.min_risk_reward']
+    _, baseline = run_backtest(history, top=5, max_hold=10)
+    assert results.iloc[0]['trades'] == baseline['trades'] and results.iloc[0]['avg_return_pct'] == baseline['avg_return_pct']
+    for row, params in enumerate(configurations):
+        expected = evaluate(history, params, options)
+        assert all(results.iloc[row][key] == value or (value is None and pd.isna(results.iloc[row][key]))
+                   for key, value in expected.items())
+    
+    ranked = rank_results(results, 'avg_return_pct', min_trades=1)
+    assert ranked['avg_return_pct'].is_monotonic_decreasing
+
 if __name__ == "__main__":
     print("🎯 SPECULATIVE SWING SCREENER OPTIMIZADO - TEST LOCAL")
     print("=" * 70)
@@ -259,6 +1314,31 @@ if __name__ == "__main__":
     # Test 2: Screener optimizado con muestra
     test_with_sample_stocks()
     
+    # Test 3: Equivalencia de los cálculos vectorizados (sin red)
+    test_swing_detection_equivalence()
+    test_quality_score_equivalence()
+    test_scoring_tables_equivalence()
+    test_panel_prescreen_equivalence()
+    test_kernel_backend_parity()
+    test_filter_cascade_order_invariance()
+    test_filter_cascade_shared_context_cost()
+    test_result_records_csv()
+    test_run_manifest_roundtrip()
+    test_dashboard_assets()
+    test_candidate_pages()
+    test_run_archive_queries()
+    test_candidate_log_resume()
+    test_batch_download_split()
+    test_adaptive_rate_limiter()
+    test_metadata_cache_ttl()
+    test_deferred_retry_queue()
+    test_shard_merge_equivalence()
+    test_resume_after_cancel()
+    test_price_store_stale_fallback()
+    test_price_store_retention()
+    test_backtest_walk_forward_equivalence()
+    test_parameter_sweep()
+    
     print("\n" + "=" * 70)
     print("✅ Test local del sistema optimizado completado!")
     print("💡 Para ejecutar el screener completo: python speculative_screener_automated.py")